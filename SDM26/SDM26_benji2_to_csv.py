@@ -3,9 +3,12 @@
 from __future__ import annotations
 
 import argparse
+from dataclasses import replace
 from pathlib import Path
 
-from conversion_pipeline import convert_benji2_inputs_to_csv
+from conversion_pipeline import convert_benji2_inputs_to_csv, follow_benji2_file
+from imu_displacement import DEFAULT_IMU_SETTINGS
+from shocks import DEFAULT_SHOCK_SETTINGS
 
 
 def parseBenji2File(input_path: str, output_dir: str, session: str):
@@ -13,6 +16,13 @@ def parseBenji2File(input_path: str, output_dir: str, session: str):
     return convert_benji2_inputs_to_csv(input_path, csv_output_dir, logger=print)
 
 
+def positive_int(text: str) -> int:
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
 def main():
     parser = argparse.ArgumentParser(description="Convert BENJI2 file(s) to CSV")
     parser.add_argument("input_path", help="Path to a .benji2 file or a folder containing .benji2 files")
@@ -22,14 +32,139 @@ def main():
         default=None,
         help="Optional session folder name. Defaults to processed_<input name>",
     )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Files to convert in parallel (0 for one per CPU core but one)",
+    )
+    parser.add_argument(
+        "--chunk-records",
+        type=positive_int,
+        default=None,
+        help="Decode in blocks of this many records to bound memory on very long logs",
+    )
+    parser.add_argument(
+        "--channels",
+        nargs="+",
+        metavar="NAME",
+        default=None,
+        help="Only write these channels, recorded or derived (e.g. FRONT_SHOCK_VEL FLW_SPEED); TS is always kept",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reconvert every file, even ones whose CSV is already up to date",
+    )
+    parser.add_argument(
+        "--no-shocks",
+        action="store_true",
+        help="Leave out the derived shock displacement and velocity channels",
+    )
+    parser.add_argument(
+        "--shock-smoothing",
+        type=int,
+        default=DEFAULT_SHOCK_SETTINGS.smoothing,
+        help="Average shock displacement over this many samples either side before taking the velocity",
+    )
+    parser.add_argument(
+        "--no-cg",
+        action="store_true",
+        help="Leave out the derived CG acceleration channels",
+    )
+    parser.add_argument(
+        "--lever-arm",
+        type=float,
+        nargs=3,
+        metavar=("X", "Y", "Z"),
+        default=DEFAULT_IMU_SETTINGS.lever_arm,
+        help="IMU position relative to the CG in metres (x forward, y left, z up)",
+    )
+    parser.add_argument(
+        "--level-imu",
+        action="store_true",
+        help="Remove the IMU mounting roll and pitch, taken from gravity while the car is at rest",
+    )
+    parser.add_argument(
+        "--follow",
+        "-f",
+        action="store_true",
+        help="Keep converting a single .benji2 file while the logger is still writing it (Ctrl+C to stop)",
+    )
+    parser.add_argument(
+        "--ld",
+        action="store_true",
+        help="With --follow, also keep a MoTeC .ld file next to the CSV up to date",
+    )
+    parser.add_argument(
+        "--derived",
+        action="store_true",
+        help="With --follow, also add the derived channels (output then starts several seconds late)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.2,
+        help="With --follow, seconds between checks for new records",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=None,
+        help="With --follow, stop after this many seconds without new records",
+    )
     args = parser.parse_args()
 
     input_path = Path(args.input_path)
-    default_session = f"processed_{input_path.stem if input_path.is_file() else input_path.name}"
+    # A followed file may not exist yet, so go by its suffix rather than the file system.
+    is_file = input_path.is_file() or (args.follow and input_path.suffix.lower() == ".benji2")
+    default_session = f"processed_{input_path.stem if is_file else input_path.name}"
     session = args.session or default_session
     csv_output_dir = Path(args.output_dir) / session
+    shocks = None if args.no_shocks else replace(DEFAULT_SHOCK_SETTINGS, smoothing=args.shock_smoothing)
+    imu = None if args.no_cg else replace(DEFAULT_IMU_SETTINGS, lever_arm=tuple(args.lever_arm), level=args.level_imu)
+
+    if args.channels is not None and args.chunk_records is not None:
+        parser.error("--channels needs whole-file decoding and cannot be combined with --chunk-records")
 
-    outputs = convert_benji2_inputs_to_csv(args.input_path, csv_output_dir, logger=print)
+    if args.follow:
+        if not is_file:
+            parser.error("--follow needs a single .benji2 file")
+        if args.channels is not None:
+            parser.error("--channels is not supported with --follow")
+        csv_path = csv_output_dir / f"{input_path.stem}.csv"
+        ld_path = csv_output_dir / f"{input_path.stem}.ld" if args.ld else None
+        try:
+            follow_benji2_file(
+                input_path,
+                csv_path,
+                ld_path,
+                poll_interval=args.poll_interval,
+                idle_timeout=args.idle_timeout,
+                logger=print,
+                derived=args.derived,
+                shocks=shocks,
+                imu=imu,
+            )
+        except KeyboardInterrupt:
+            print("Stopped.")
+        print(f"\nCSV output: {csv_path}")
+        if ld_path is not None:
+            print(f"LD output: {ld_path}")
+        return
+
+    outputs = convert_benji2_inputs_to_csv(
+        args.input_path,
+        csv_output_dir,
+        logger=print,
+        jobs=args.jobs or None,
+        chunk_records=args.chunk_records,
+        incremental=not args.force,
+        shocks=shocks,
+        imu=imu,
+        channels=args.channels,
+    )
 
     print("\nDONE!")
     print(f"CSV output directory: {csv_output_dir}")
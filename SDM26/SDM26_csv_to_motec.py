@@ -29,6 +29,34 @@ def main():
         default=None,
         help="Max samples to convert per file (default: all)",
     )
+    parser.add_argument(
+        "--float32",
+        action="store_true",
+        help="Store every channel as 4-byte float instead of the most compact exact type",
+    )
+    parser.add_argument(
+        "--max-error",
+        type=float,
+        default=None,
+        help="Allowed quantization error for compact channels (default: half the sensor resolution)",
+    )
+    parser.add_argument(
+        "--full-rate",
+        action="store_true",
+        help="Write every channel at the logger rate instead of each channel's native update rate",
+    )
+    parser.add_argument(
+        "--resample",
+        action="store_true",
+        help="Re-time every channel onto a uniform grid at the detected rate (removes logger jitter and gaps)",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Files to convert in parallel (0 for one per CPU core but one)",
+    )
     args = parser.parse_args()
 
     output_dir = Path(args.output_dir)
@@ -37,6 +65,11 @@ def main():
         output_dir,
         max_samples=args.samples,
         logger=print,
+        compact=not args.float32,
+        max_error=args.max_error,
+        native_rates=not args.full_rate,
+        jobs=args.jobs or None,
+        resample=args.resample,
     )
 
     print("\nDONE!")
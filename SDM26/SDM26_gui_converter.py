@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import multiprocessing
 import queue
 import threading
 import traceback
@@ -10,7 +11,7 @@ from pathlib import Path
 from tkinter import filedialog, messagebox, ttk
 from tkinter.scrolledtext import ScrolledText
 
-from conversion_pipeline import build_output_layout, convert_benji2_inputs_to_outputs
+from conversion_pipeline import build_output_layout, convert_benji2_inputs_to_outputs, resolve_jobs
 
 
 class ConversionApp(tk.Tk):
@@ -22,6 +23,10 @@ class ConversionApp(tk.Tk):
 
         self.input_path_var = tk.StringVar()
         self.output_dir_var = tk.StringVar()
+        self.write_csv_var = tk.BooleanVar(value=True)
+        self.incremental_var = tk.BooleanVar(value=True)
+        self.resample_var = tk.BooleanVar(value=False)
+        self.jobs_var = tk.IntVar(value=resolve_jobs(None))
         self.output_preview_var = tk.StringVar(value="Select an input path and output directory.")
         self.status_var = tk.StringVar(value="Idle")
 
@@ -59,12 +64,28 @@ class ConversionApp(tk.Tk):
         ttk.Button(output_frame, text="Select Output", command=self._select_output_dir).grid(
             row=0, column=1, padx=(0, 8), pady=8
         )
+        ttk.Checkbutton(
+            output_frame,
+            text="Also write CSV files",
+            variable=self.write_csv_var,
+            command=self._update_output_preview,
+        ).grid(row=1, column=0, columnspan=2, padx=8, pady=(0, 4), sticky="w")
+        ttk.Checkbutton(
+            output_frame,
+            text="Skip files that are already converted and unchanged",
+            variable=self.incremental_var,
+        ).grid(row=2, column=0, columnspan=2, padx=8, pady=(0, 4), sticky="w")
+        ttk.Checkbutton(
+            output_frame,
+            text="Resample MoTeC channels to a uniform timebase (corrects logger timing jitter)",
+            variable=self.resample_var,
+        ).grid(row=3, column=0, columnspan=2, padx=8, pady=(0, 4), sticky="w")
         ttk.Label(
             output_frame,
             textvariable=self.output_preview_var,
             justify="left",
             wraplength=820,
-        ).grid(row=1, column=0, columnspan=2, padx=8, pady=(0, 8), sticky="w")
+        ).grid(row=4, column=0, columnspan=2, padx=8, pady=(0, 8), sticky="w")
 
         action_frame = ttk.Frame(self)
         action_frame.grid(row=2, column=0, padx=12, pady=6, sticky="ew")
@@ -73,6 +94,14 @@ class ConversionApp(tk.Tk):
         self.start_button = ttk.Button(action_frame, text="Start Conversion", command=self._start_conversion)
         self.start_button.grid(row=0, column=0, padx=(0, 8))
         ttk.Button(action_frame, text="Clear Log", command=self._clear_log).grid(row=0, column=1, sticky="w")
+        ttk.Label(action_frame, text="Parallel jobs").grid(row=0, column=2, padx=(8, 4))
+        ttk.Spinbox(
+            action_frame,
+            from_=1,
+            to=multiprocessing.cpu_count(),
+            width=4,
+            textvariable=self.jobs_var,
+        ).grid(row=0, column=3)
 
         progress_frame = ttk.LabelFrame(self, text="Progress")
         progress_frame.grid(row=3, column=0, padx=12, pady=6, sticky="nsew")
@@ -117,10 +146,8 @@ class ConversionApp(tk.Tk):
             return
 
         layout = build_output_layout(output_dir, input_path)
-        self.output_preview_var.set(
-            f"CSV files: {layout.csv_dir}\n"
-            f"MoTeC files: {layout.ld_dir}"
-        )
+        csv_preview = f"CSV files: {layout.csv_dir}\n" if self.write_csv_var.get() else ""
+        self.output_preview_var.set(f"{csv_preview}MoTeC files: {layout.ld_dir}")
 
     def _set_running(self, is_running: bool):
         state = "disabled" if is_running else "normal"
@@ -152,6 +179,12 @@ class ConversionApp(tk.Tk):
         if self._worker and self._worker.is_alive():
             return
 
+        try:
+            jobs = resolve_jobs(self.jobs_var.get())
+        except (tk.TclError, ValueError):
+            messagebox.showerror("Invalid Jobs", "Parallel jobs must be a whole number.")
+            return
+
         self._clear_log()
         self._append_log(f"Input: {input_path}")
         self._append_log(f"Output base: {output_dir}")
@@ -162,12 +195,27 @@ class ConversionApp(tk.Tk):
 
         self._worker = threading.Thread(
             target=self._run_conversion_worker,
-            args=(input_path, output_dir),
+            args=(
+                input_path,
+                output_dir,
+                self.write_csv_var.get(),
+                jobs,
+                self.incremental_var.get(),
+                self.resample_var.get(),
+            ),
             daemon=True,
         )
         self._worker.start()
 
-    def _run_conversion_worker(self, input_path: str, output_dir: str):
+    def _run_conversion_worker(
+        self,
+        input_path: str,
+        output_dir: str,
+        write_csv: bool,
+        jobs: int,
+        incremental: bool,
+        resample: bool,
+    ):
         def log(message: str):
             self._queue.put(("log", message))
 
@@ -180,6 +228,10 @@ class ConversionApp(tk.Tk):
                 output_dir,
                 logger=log,
                 progress_callback=progress,
+                write_csv=write_csv,
+                jobs=jobs,
+                incremental=incremental,
+                resample=resample,
             )
             self._queue.put(("done", (layout, results)))
         except Exception as exc:
@@ -218,6 +270,8 @@ class ConversionApp(tk.Tk):
 
 
 def main():
+    # Conversion workers are separate processes; required when the GUI is frozen into an executable.
+    multiprocessing.freeze_support()
     app = ConversionApp()
     app.mainloop()
 
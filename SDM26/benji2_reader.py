@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
+
+import numpy as np
+
+from devices import configure_devices, create_devices, device_data
+
+# The logger stops writing a record at the channel count marker; anything listed after it in the
+# header never appears in the payload.
+RECORD_END_CHANNEL = "CH_COUNT"
+
+_NATIVE_SIZES = (1, 2, 4, 8)
+
+# Below this many records per range the thread hand-off costs more than it saves.
+MIN_RANGE_RECORDS = 1 << 16
+
+
+class EmptyBenji2FileError(ValueError):
+    """Raised when a BENJI2 file has no readable log payload."""
+
+
+def filter_duplicate_headers(header_str: str) -> tuple[str, list[int]]:
+    """
+    Collapse the per-byte header names (``TS,TS1,TS2,TS3``) into one name per device.
+    Returns the filtered header and the byte size of each device.
+    """
+    headers = [header.strip() for header in header_str.split(",")]
+    base_counts: dict[str, int] = {}
+    filtered: list[str] = []
+
+    for header in headers:
+        header = header.strip("\x00")
+        base = header.rstrip("0123456789").strip()
+        if base not in base_counts:
+            filtered.append(base)
+            base_counts[base] = 1
+        else:
+            base_counts[base] += 1
+
+    counts = [base_counts[base] for base in filtered]
+    return ",".join(filtered), counts
+
+
+def record_devices(devices: list[device_data]) -> list[device_data]:
+    """Return the devices that are actually stored in each payload record, in file order."""
+    stored: list[device_data] = []
+    for device in devices:
+        if device.name == RECORD_END_CHANNEL:
+            break
+        stored.append(device)
+    return stored
+
+
+def field_name(device: device_data) -> str:
+    return device.name if device.name else f"_column{device.column_index}"
+
+
+def _field_format(device: device_data) -> np.dtype | tuple[np.dtype, int]:
+    if device.byte_size in _NATIVE_SIZES:
+        order = "<" if device.byte_order == "little" else ">"
+        kind = "i" if device.signed else "u"
+        return np.dtype(f"{order}{kind}{device.byte_size}")
+    # Odd widths (e.g. 3 byte counters) have no native NumPy type, keep the raw bytes instead.
+    return (np.dtype(np.uint8), device.byte_size)
+
+
+def build_record_dtype(devices: list[device_data]) -> np.dtype:
+    """Build one structured dtype describing a full payload record."""
+    names: list[str] = []
+    formats: list[np.dtype | tuple[np.dtype, int]] = []
+    offsets: list[int] = []
+    offset = 0
+
+    for device in record_devices(devices):
+        names.append(field_name(device))
+        formats.append(_field_format(device))
+        offsets.append(offset)
+        offset += device.byte_size
+
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": offset})
+
+
+def raw_field(records: np.ndarray, device: device_data) -> np.ndarray:
+    """Return the integer values of one device from an array of structured records."""
+    raw = records[field_name(device)]
+    if device.byte_size in _NATIVE_SIZES:
+        return raw
+
+    weights = 256 ** np.arange(device.byte_size, dtype=np.int64)
+    if device.byte_order != "little":
+        weights = weights[::-1]
+    values = raw.astype(np.int64) @ weights
+    if device.signed:
+        limit = 1 << (8 * device.byte_size)
+        values = np.where(values >= limit // 2, values - limit, values)
+    return values
+
+
+def apply_conversion(device: device_data, raw: np.ndarray) -> np.ndarray:
+    """Vectorized equivalent of ``device_data.getData`` for a whole column of raw integers."""
+    if raw.dtype.itemsize < 8:
+        # Widen first so calibration arithmetic cannot wrap around in the narrow logger type.
+        raw = raw.astype(np.int64)
+
+    factor = device.conversion_factor
+    if not callable(factor):
+        return raw * factor
+
+    try:
+        values = factor(raw)
+    except (TypeError, ValueError):
+        values = None
+
+    if not isinstance(values, np.ndarray) or values.shape != raw.shape:
+        # Conversions with Python control flow only work on scalars.
+        values = np.array([factor(value) for value in raw.tolist()])
+    return values
+
+
+def record_ranges(record_count: int, parts: int, min_records: int = MIN_RANGE_RECORDS) -> list[tuple[int, int]]:
+    """Split ``record_count`` records into at most ``parts`` contiguous ``(start, stop)`` ranges."""
+    parts = max(1, min(parts, record_count // max(min_records, 1)))
+    bounds = [record_count * part // parts for part in range(parts + 1)]
+    return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+
+def decode_records(payload: bytes | memoryview, devices: list[device_data]) -> dict[str, np.ndarray]:
+    """
+    Decode every complete record in ``payload`` with a single ``np.frombuffer`` call.
+    Returns one calibrated array per stored device, keyed by device name. A trailing partial
+    record is ignored, the same as the reference decoder.
+    """
+    dtype = build_record_dtype(devices)
+    count = len(payload) // dtype.itemsize if dtype.itemsize else 0
+    records = np.frombuffer(payload, dtype=dtype, count=count)
+    return {device.name: apply_conversion(device, raw_field(records, device)) for device in record_devices(devices)}
+
+
+def decode_records_reference(benji_file: BinaryIO, devices: list[device_data]) -> dict[str, list]:
+    """
+    Reference per-field decoder: one ``read`` and one ``getData`` call per value.
+    Kept to check ``decode_records`` against; far too slow for real logs.
+    """
+    stored = record_devices(devices)
+    columns: dict[str, list] = {device.name: [] for device in stored}
+    if not stored:
+        return columns
+
+    while True:
+        row = []
+        for device in stored:
+            raw_data = benji_file.read(device.byte_size)
+            if len(raw_data) != device.byte_size:
+                return columns
+            row.append(device.getData(raw_data))
+
+        for device, value in zip(stored, row):
+            columns[device.name].append(value)
+
+
+class Benji2File:
+    """
+    Memory-mapped BENJI2 reader.
+
+    The header is parsed once on open. The payload is exposed as a structured array over the
+    mapping, so ``raw(name)`` is a strided zero-copy view of one channel and nothing is read
+    from disk until a channel is actually used. Use as a context manager, or call ``close``.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        configure: Callable[[list[device_data]], None] = configure_devices,
+    ):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._mmap: mmap.mmap | None = None
+        try:
+            self._parse(configure)
+        except BaseException:
+            self.close()
+            raise
+
+    def _parse(self, configure: Callable[[list[device_data]], None]) -> None:
+        name = self.path.name
+        file_size = self.path.stat().st_size
+        if file_size == 0:
+            raise EmptyBenji2FileError(f"Skipping empty BENJI2 file: {name}")
+        if file_size < 4:
+            raise ValueError(f"Missing BENJI2 header length in {name}")
+
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        header_length = int.from_bytes(self._mmap[:4], "little", signed=False) - 1
+        if header_length <= 0:
+            raise EmptyBenji2FileError(f"Skipping empty BENJI2 file: {name}")
+
+        try:
+            header = self._mmap[4 : 4 + header_length].decode("utf-8")
+        except UnicodeDecodeError as exc:
+            raise ValueError(f"Unable to decode header in {name}: {exc}") from exc
+
+        self.header, data_sizes = filter_duplicate_headers(header)
+        self.devices = create_devices([device.strip() for device in self.header.split(",")], data_sizes)
+        configure(self.devices)
+        self.record_devices = record_devices(self.devices)
+        self.record_dtype = build_record_dtype(self.devices)
+
+        # The header is followed by one separator byte before the first record.
+        self.data_offset = min(4 + header_length + 1, file_size)
+        payload_size = file_size - self.data_offset
+        self.record_size = self.record_dtype.itemsize
+        self.record_count = payload_size // self.record_size if self.record_size else 0
+        self.trailing_bytes = payload_size - self.record_count * self.record_size
+
+    @property
+    def channel_names(self) -> list[str]:
+        return [device.name for device in self.record_devices]
+
+    @property
+    def records(self) -> np.ndarray:
+        """Structured array view over every complete record in the file."""
+        return np.frombuffer(self._mmap, dtype=self.record_dtype, count=self.record_count, offset=self.data_offset)
+
+    def device(self, name: str) -> device_data:
+        for device in self.record_devices:
+            if device.name == name:
+                return device
+        raise KeyError(f"{name} is not stored in {self.path.name}")
+
+    def raw(self, name: str) -> np.ndarray:
+        """Uncalibrated values of one channel; a view into the mapping for native widths."""
+        return raw_field(self.records, self.device(name))
+
+    def channel(self, name: str) -> np.ndarray:
+        """Calibrated values of one channel."""
+        device = self.device(name)
+        return apply_conversion(device, raw_field(self.records, device))
+
+    def columns(self, names: list[str] | None = None, jobs: int | None = 1) -> dict[str, np.ndarray]:
+        """
+        Calibrated arrays keyed by channel name, for ``names`` or every stored channel.
+
+        With ``jobs`` other than 1 (``None`` for one per core) long files are split into
+        record-aligned ranges that are decoded and calibrated on separate threads, then joined in
+        order. The ranges share the mapping and NumPy releases the GIL for the field extraction
+        and calibration arithmetic, so no payload bytes are copied to the workers.
+        """
+        devices = [self.device(name) for name in (self.channel_names if names is None else names)]
+        jobs = (os.cpu_count() or 1) if jobs is None else jobs
+        ranges = record_ranges(self.record_count, jobs)
+        if len(ranges) <= 1:
+            return self._decode_range(devices, 0, self.record_count)
+
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            parts = list(executor.map(lambda bounds: self._decode_range(devices, *bounds), ranges))
+        return {device.name: np.concatenate([part[device.name] for part in parts]) for device in devices}
+
+    def iter_columns(self, chunk_records: int, names: list[str] | None = None) -> Iterator[dict[str, np.ndarray]]:
+        """Calibrated arrays for blocks of at most ``chunk_records`` records, in file order."""
+        if chunk_records < 1:
+            raise ValueError(f"chunk_records must be at least 1, got {chunk_records}")
+        devices = [self.device(name) for name in (self.channel_names if names is None else names)]
+        for start in range(0, self.record_count, chunk_records):
+            yield self._decode_range(devices, start, min(start + chunk_records, self.record_count))
+
+    def _decode_range(self, devices: list[device_data], start: int, stop: int) -> dict[str, np.ndarray]:
+        records = self.records[start:stop]
+        return {device.name: apply_conversion(device, raw_field(records, device)) for device in devices}
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views handed out by raw() are still alive; the mapping is released with them.
+                pass
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self) -> Benji2File:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class Benji2Tail:
+    """
+    Follow a BENJI2 file that is still being written.
+
+    The header is parsed once it is complete; after that ``poll`` reads only the complete records
+    appended since the previous call and returns them calibrated, keyed by device name. A record
+    that is still being written stays in the file until a later poll. Nothing is memory mapped,
+    since the file keeps growing.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        configure: Callable[[list[device_data]], None] = configure_devices,
+    ):
+        self.path = Path(path)
+        self._configure = configure
+        self._file: BinaryIO | None = None
+        self.header: str | None = None
+        self.devices: list[device_data] = []
+        self.record_devices: list[device_data] = []
+        self.record_dtype: np.dtype | None = None
+        self.record_size = 0
+        self.data_offset = 0
+        self.records_read = 0
+
+    @property
+    def ready(self) -> bool:
+        """True once the header has been read."""
+        return self.header is not None
+
+    def _read_header(self) -> bool:
+        if not self.path.exists():
+            return False
+        with open(self.path, "rb") as benji_file:
+            prefix = benji_file.read(4)
+        if len(prefix) < 4:
+            return False
+        header_length = int.from_bytes(prefix, "little", signed=False) - 1
+        # The separator byte after the header must be there too before the header is complete.
+        if header_length <= 0 or self.path.stat().st_size < 4 + header_length + 1:
+            return False
+
+        with Benji2File(self.path, self._configure) as benji_file:
+            if not benji_file.record_size:
+                raise ValueError(f"No record channels in {self.path.name}")
+            self.header = benji_file.header
+            self.devices = benji_file.devices
+            self.record_devices = benji_file.record_devices
+            self.record_dtype = benji_file.record_dtype
+            self.record_size = benji_file.record_size
+            self.data_offset = benji_file.data_offset
+        self._file = open(self.path, "rb")
+        return True
+
+    def available(self) -> int:
+        """Complete records in the file that have not been returned yet."""
+        if self._file is None:
+            return 0
+        size = os.fstat(self._file.fileno()).st_size
+        return max(0, (size - self.data_offset) // self.record_size - self.records_read)
+
+    def poll(self, max_records: int | None = None) -> dict[str, np.ndarray] | None:
+        """Calibrated arrays of the new complete records, or None when there are none yet."""
+        if not self.ready and not self._read_header():
+            return None
+
+        count = self.available()
+        if max_records is not None:
+            count = min(count, max_records)
+        if count <= 0:
+            return None
+
+        self._file.seek(self.data_offset + self.records_read * self.record_size)
+        payload = self._file.read(count * self.record_size)
+        records = np.frombuffer(payload, dtype=self.record_dtype, count=len(payload) // self.record_size)
+        if not len(records):
+            return None
+
+        self.records_read += len(records)
+        return {device.name: apply_conversion(device, raw_field(records, device)) for device in self.record_devices}
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> Benji2Tail:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+__all__ = [
+    "Benji2File",
+    "Benji2Tail",
+    "EmptyBenji2FileError",
+    "MIN_RANGE_RECORDS",
+    "RECORD_END_CHANNEL",
+    "apply_conversion",
+    "build_record_dtype",
+    "decode_records",
+    "decode_records_reference",
+    "field_name",
+    "filter_duplicate_headers",
+    "raw_field",
+    "record_devices",
+    "record_ranges",
+]
@@ -4,7 +4,9 @@ Convert BENJI2 binary telemetry files directly to MoTeC .ld format
 """
 from datetime import datetime
 import os
-from devices import create_devices, configure_devices
+import numpy as np
+from benji2_reader import Benji2File
+from timebase import analyze_timebase
 
 
 # Channel units mapping for MoTeC conversion
@@ -46,66 +48,27 @@ def parseBenji2File(file_path: str):
         Tuple of (samples, freq, devices)
         - samples: List of sample rows
         - freq: Sampling frequency in Hz
-        - devices: List of device_data objects
+        - devices: List of device_data objects stored in each record
     """
-    with open(file_path, 'br') as f:
+    with Benji2File(file_path) as benji_file:
+        devices = benji_file.record_devices
+        columns = benji_file.columns()
 
-        # Get the Length of the Header String
-        # Get the Length of the Header String
-        data = f.read(4)
-        headerLen = int.from_bytes(data, "little", signed=False) - 1
+    # Store samples in memory, one row per complete record
+    samples = [list(row) for row in zip(*(columns[device.name].tolist() for device in devices))]
 
+    # Calculate sampling frequency from the whole timestamp column (TS is the first device)
+    timebase = analyze_timebase(columns[devices[0].name]) if devices else None
+    freq, time_delta, _ = timebase.sample_rate() if timebase is not None else (500, None, None)
+    if time_delta is not None:
+        print(f"Calculated frequency: {freq} Hz (time delta: {time_delta} s)")
+        for line in timebase.summary():
+            print(line)
+    else:
+        print(f"Warning: Not enough samples to calculate frequency, using default {freq} Hz")
 
-        print(headerLen)
-
-
-        # Grab the Header String
-        data = f.read(headerLen)
-        header = data.decode("utf-8")
-        filtered_header, dataSize = filter_duplicate_headers(header)
-
-        deviceList = [key.strip() for key in filtered_header.split(",")]
-        devices = create_devices(deviceList, dataSize)
-        configure_devices(devices)
-
-        
-
-        f.read(1) # Changed from reading 2 bytes to 1 byte, SDM26 Logger Does Not include a null terminator in header
-
-        # # Seek back to read first timestamp as part of data loop
-        # data = f.read(devices[0].byte_size)
-        # f.seek(-4, os.SEEK_CUR)
-
-        # Store samples in memory
-        samples = []
-
-        while data:
-            # Parallel Array to the header
-            outputList = [None] * len(devices)
-            incomplete = False
-            for device in devices:
-                data = f.read(device.byte_size)
-                if not data:
-                    incomplete = True
-                    break
-
-                outputList[device.column_index] = device.getData(data)
-
-            # Only store complete samples (skip rows with None values)
-            if not incomplete and None not in outputList:
-                samples.append(outputList)
-
-        # Calculate sampling frequency from timestamp data
-        if len(samples) >= 2:
-            time_delta = samples[1][0] - samples[0][0]  # TS is first column (index 0)
-            freq = int(round(1 / time_delta))  # Round to nearest integer
-            print(f"Calculated frequency: {freq} Hz (time delta: {time_delta} s)")
-        else:
-            freq = 500  # Default fallback if not enough samples
-            print(f"Warning: Not enough samples to calculate frequency, using default {freq} Hz")
-
-        print(f"Parsed {len(samples)} samples from benji2 file")
-        return samples, freq, devices
+    print(f"Parsed {len(samples)} samples from benji2 file")
+    return samples, freq, devices
 
 
 def convert_benji2_to_motec(samples, freq, devices, output_path):
@@ -118,7 +81,7 @@ def convert_benji2_to_motec(samples, freq, devices, output_path):
         devices: List of device_data objects with channel info
         output_path: Path to write the .ld file
     """
-    from motec_ld import MotecLog, MotecChannel, MotecEvent
+    from motec_ld import MotecLog, MotecEvent
 
     print(f"[DEBUG] Converting to MoTeC: {output_path}")
 
@@ -140,6 +103,9 @@ def convert_benji2_to_motec(samples, freq, devices, output_path):
         "venuepos": 0
     })
 
+    # Columns of the parsed rows, so each channel gets its samples in one call
+    data = np.asarray(samples, dtype=np.float64).reshape(len(samples), len(devices))
+
     # Create channels
     for i, device in enumerate(devices):
         units = CHANNEL_UNITS.get(device.name, "raw")  # Lookup units, default to "raw"
@@ -156,8 +122,7 @@ def convert_benji2_to_motec(samples, freq, devices, output_path):
             "datatype": 0x07,  # Float
             "datasize": 4       # 4-byte float
         }
-        ch = MotecChannel(ch_def)
-        log.add_channel(ch)
+        ch = log.add_channel_data(ch_def, data[:, i])
         if i < 5 or i % 5 == 0:
             print(f"[DEBUG] Added channel: {device.name} ({units}) (ID {ch.id})")
 
@@ -168,57 +133,16 @@ def convert_benji2_to_motec(samples, freq, devices, output_path):
             print(f"[DEBUG] Time channel set: {ch.name} (ID {ch.id})")
             break
 
-    # Add all samples
-    print(f"[DEBUG] Adding {len(samples)} samples...")
-    for row_idx, row in enumerate(samples):
-        log.add_samples(row)
-        if row_idx < 3:
-            print(f"[DEBUG] Sample {row_idx}: {row[:5]}...")  # Show first 5 values
+    for row_idx, row in enumerate(samples[:3]):
+        print(f"[DEBUG] Sample {row_idx}: {row[:5]}...")  # Show first 5 values
 
     # Write output
     os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else ".", exist_ok=True)
-    with open(output_path, 'wb') as f:
-        f.write(log.to_string())
+    log.write(output_path)
 
     print(f"[DEBUG] MoTeC file written: {output_path} ({len(samples)} samples, {len(devices)} channels)")
 
 
-def filter_duplicate_headers(header_str: str) -> tuple[str, list[int]]:
-    """
-    Filter CSV header string and count occurrences of each base name
-
-    Args:
-        header_str: String containing comma-separated header names
-
-    Returns:
-        Tuple containing:
-            - Filtered header string with duplicates removed
-            - List of integers representing count of each base name
-
-    Example:
-        Input: "TS,TS1,TS2,TS3"
-        Output: ("TS", [4])
-    """
-    # Split headers and remove extra whitespace
-    headers = [h.strip() for h in header_str.split(',')]
-    base_counts = {}
-    filtered = []
-
-    for header in headers:
-        header = header.strip('\x00')
-        base = header.rstrip('0123456789')
-        base = base.strip()
-        if base not in base_counts:
-            filtered.append(base)
-            base_counts[base] = 1
-        else:
-            base_counts[base] += 1
-
-    counts = [base_counts[base] for base in filtered]
-
-    return ','.join(filtered), counts
-
-
 # -----------------------------
 # MAIN
 # -----------------------------
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import asdict, dataclass, field, fields
+from functools import lru_cache
+from pathlib import Path
+from typing import ClassVar
+
+import numpy as np
+
+CALIBRATION_FILE = Path(__file__).with_name("calibrations.json")
+
+CHANNEL_INTERPOLATIONS = ("linear", "hold")
+
+
+@dataclass(frozen=True, kw_only=True)
+class Calibration:
+    """
+    Base for raw logger value -> engineering unit conversions.
+
+    Calibrations are plain data, so they pickle to worker processes and can be written back to the
+    table. Calling one works on a scalar (the ``device_data.getData`` path) and on a NumPy array
+    (whole column) with the same arithmetic, so both paths give identical values.
+
+    ``wrap_bits`` reinterprets an unsigned raw value as two's complement of that width first, for
+    CAN signals the logger stores unsigned.
+    """
+
+    kind: ClassVar[str] = ""
+    wrap_bits: int | None = None
+
+    def __call__(self, value):
+        if self.wrap_bits:
+            half = 1 << (self.wrap_bits - 1)
+            value = value - (value >= half) * (half * 2)
+        return self.convert(value)
+
+    def convert(self, value):
+        raise NotImplementedError
+
+    @property
+    def resolution(self) -> float | None:
+        """Engineering units per raw count, or None when the step is not constant."""
+        return None
+
+    def to_dict(self) -> dict:
+        data = {"type": self.kind}
+        data.update({key: value for key, value in asdict(self).items() if value is not None})
+        return data
+
+
+@dataclass(frozen=True, kw_only=True)
+class Identity(Calibration):
+    """Raw integer passed through unchanged."""
+
+    kind: ClassVar[str] = "identity"
+
+    def convert(self, value):
+        return value
+
+    @property
+    def resolution(self) -> float | None:
+        return 1.0
+
+
+@dataclass(frozen=True, kw_only=True)
+class Scale(Calibration):
+    """``value * factor``, optionally ``/ divisor`` (kept separate to match the original rounding)."""
+
+    kind: ClassVar[str] = "scale"
+    factor: float = 1.0
+    divisor: float | None = None
+
+    def convert(self, value):
+        value = value * self.factor
+        if self.divisor is not None:
+            value = value / self.divisor
+        return value
+
+    @property
+    def resolution(self) -> float | None:
+        return abs(self.factor / (self.divisor or 1))
+
+
+@dataclass(frozen=True, kw_only=True)
+class Affine(Calibration):
+    """
+    ``gain * (value - zero) + offset``. Terms at their neutral value are skipped, so ``zero`` is
+    the raw reading at the reference position (e.g. shock static ride height) and ``v - 50`` stays
+    an integer.
+    """
+
+    kind: ClassVar[str] = "affine"
+    gain: float = 1
+    zero: float = 0
+    offset: float = 0
+
+    def convert(self, value):
+        if self.zero:
+            value = value - self.zero
+        if self.gain != 1:
+            value = self.gain * value
+        if self.offset:
+            value = value + self.offset
+        return value
+
+    @property
+    def resolution(self) -> float | None:
+        return abs(self.gain)
+
+
+@dataclass(frozen=True, kw_only=True)
+class Polynomial(Calibration):
+    """``c0 + c1*v + c2*v**2 + ...`` with coefficients in ascending order."""
+
+    kind: ClassVar[str] = "polynomial"
+    coefficients: tuple[float, ...] = (0.0, 1.0)
+
+    def convert(self, value):
+        result = 0.0
+        for coefficient in reversed(self.coefficients):
+            result = result * value + coefficient
+        return result
+
+
+@dataclass(frozen=True, kw_only=True)
+class Lookup(Calibration):
+    """Piecewise-linear table from raw ``points`` to ``values``; clamps outside the table."""
+
+    kind: ClassVar[str] = "lookup"
+    points: tuple[float, ...] = ()
+    values: tuple[float, ...] = ()
+
+    def convert(self, value):
+        return np.interp(value, self.points, self.values)
+
+
+@dataclass(frozen=True, kw_only=True)
+class Kelvin(Calibration):
+    """MLX90614 style temperature: raw counts of ``resolution`` Kelvin converted to Celsius."""
+
+    kind: ClassVar[str] = "kelvin"
+    resolution: float = 0.02
+
+    def convert(self, value):
+        return (value * self.resolution) - 273.15
+
+
+CALIBRATION_TYPES: dict[str, type[Calibration]] = {
+    calibration_type.kind: calibration_type
+    for calibration_type in (Identity, Scale, Affine, Polynomial, Lookup, Kelvin)
+}
+
+
+def calibration_from_dict(data: dict) -> Calibration:
+    data = dict(data)
+    kind = data.pop("type", None)
+    calibration_type = CALIBRATION_TYPES.get(kind)
+    if calibration_type is None:
+        raise ValueError(f"Unknown calibration type: {kind!r}")
+
+    known = {item.name for item in fields(calibration_type)}
+    unknown = set(data) - known
+    if unknown:
+        raise ValueError(f"Unknown {kind} calibration fields: {', '.join(sorted(unknown))}")
+
+    for key, value in data.items():
+        if isinstance(value, list):
+            data[key] = tuple(value)
+    return calibration_type(**data)
+
+
+def resolution_decimals(resolution: float | None) -> int | None:
+    """
+    Fewest decimal places that keep values one ``resolution`` step apart distinct and within half
+    a step of the calibrated value, or None when the step is not constant.
+    """
+    if resolution is None or not math.isfinite(resolution) or resolution <= 0:
+        return None
+    return max(0, math.ceil(-math.log10(resolution) - 1e-9))
+
+
+@dataclass(frozen=True)
+class ChannelFilter:
+    """
+    Zero-phase filtering for a noisy channel, added as ``<name>_FILT`` (and ``<name>_RATE``)
+    alongside the raw channel. The steps run in this order, each skipped when unset:
+
+    - ``despike``: samples more than ``spike_threshold`` median absolute deviations from the
+      median of the ``despike`` samples either side are replaced by that median.
+    - ``lowpass``: Butterworth low-pass of ``order`` poles at this cutoff in Hz, run forwards
+      and backwards so it does not delay the signal.
+    - ``savgol``: Savitzky-Golay smoothing, a ``savgol_order`` polynomial fitted over ``savgol``
+      samples either side. With ``derivative`` the fit's slope is added as ``<name>_RATE``.
+    """
+
+    despike: int = 0
+    spike_threshold: float = 3.0
+    lowpass: float | None = None
+    order: int = 2
+    savgol: int = 0
+    savgol_order: int = 2
+    derivative: bool = False
+
+    def __post_init__(self):
+        if self.despike < 0 or self.savgol < 0:
+            raise ValueError("despike and savgol are sample counts and cannot be negative")
+        if self.lowpass is not None and (self.lowpass <= 0 or self.order < 1):
+            raise ValueError("lowpass needs a positive cutoff and at least one pole")
+        if self.savgol and not 0 <= self.savgol_order < 2 * self.savgol + 1:
+            raise ValueError("savgol_order must be below the Savitzky-Golay window length")
+        if self.derivative and (not self.savgol or self.savgol_order < 1):
+            raise ValueError("derivative needs a Savitzky-Golay fit of at least first order")
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class ChannelConfig:
+    """
+    Per-channel table entry. ``decimals`` is the number of places written to CSV; when unset it
+    follows from the calibration's resolution, and channels without a constant resolution are
+    written at full precision. ``interpolation`` is how the channel is re-timed onto a uniform
+    grid: ``linear`` for analog signals, ``hold`` (last value) for flags, states and counters.
+    ``filter`` adds filtered copies of the channel, see ``ChannelFilter``.
+    """
+
+    calibration: Calibration
+    signed: bool = False
+    units: str = ""
+    display_name: str = ""
+    short_name: str = ""
+    decimals: int | None = None
+    interpolation: str = "linear"
+    filter: ChannelFilter | None = None
+
+    @property
+    def display_decimals(self) -> int | None:
+        if self.decimals is not None:
+            return self.decimals
+        return resolution_decimals(self.calibration.resolution)
+
+
+@dataclass(frozen=True)
+class CalibrationTable:
+    version: int
+    default: Calibration
+    channels: dict[str, ChannelConfig] = field(default_factory=dict)
+
+    def calibration_for(self, name: str) -> Calibration:
+        config = self.channels.get(name)
+        return config.calibration if config is not None else self.default
+
+
+def load_calibration_table(path: str | Path = CALIBRATION_FILE) -> CalibrationTable:
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as table_file:
+        data = json.load(table_file)
+
+    if "version" not in data:
+        raise ValueError(f"Calibration table has no version: {path}")
+
+    channels: dict[str, ChannelConfig] = {}
+    for name, entry in data.get("channels", {}).items():
+        entry = dict(entry)
+        calibration = calibration_from_dict(entry.pop("calibration", data["default"]))
+        if "filter" in entry:
+            entry["filter"] = ChannelFilter(**entry["filter"])
+        channels[name] = ChannelConfig(calibration=calibration, **entry)
+        if channels[name].interpolation not in CHANNEL_INTERPOLATIONS:
+            raise ValueError(f"Unknown interpolation for {name}: {channels[name].interpolation!r}")
+
+    return CalibrationTable(
+        version=int(data["version"]),
+        default=calibration_from_dict(data["default"]),
+        channels=channels,
+    )
+
+
+@lru_cache(maxsize=None)
+def default_calibration_table() -> CalibrationTable:
+    return load_calibration_table(CALIBRATION_FILE)
+
+
+__all__ = [
+    "Affine",
+    "CALIBRATION_FILE",
+    "CALIBRATION_TYPES",
+    "CHANNEL_INTERPOLATIONS",
+    "Calibration",
+    "CalibrationTable",
+    "ChannelConfig",
+    "ChannelFilter",
+    "Identity",
+    "Kelvin",
+    "Lookup",
+    "Polynomial",
+    "Scale",
+    "calibration_from_dict",
+    "default_calibration_table",
+    "load_calibration_table",
+    "resolution_decimals",
+]
@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Mapping
+
+import numpy as np
+
+from csv_columns import read_csv_columns, read_csv_header
+from devices import device_data
+from imu_displacement import (
+    CG_CHANNELS,
+    DEFAULT_IMU_SETTINGS,
+    IMU_ACCEL_CHANNELS,
+    IMU_GYRO_CHANNELS,
+    ImuSettings,
+    cg_accelerations,
+)
+from shocks import DEFAULT_SHOCK_SETTINGS, SHOCK_CHANNELS, ShockSettings, shock_displacement, shock_velocity
+
+# Loaded tyre diameter in metres, for wheel speed from the hub RPM sensors.
+TYRE_DIAMETER = 0.406
+
+# Corner -> wheel RPM channel.
+WHEEL_RPM_CHANNELS = {"FL": "FLW_RPM", "FR": "FRW_RPM", "RR": "RRW_RPM", "RL": "RLW_RPM"}
+
+TIME_CHANNEL = "TS"
+
+
+@dataclass(frozen=True)
+class DerivedChannel:
+    """
+    A channel computed from others: ``function`` takes the ``inputs`` (whole-log arrays, in that
+    order; recorded or derived channels alike) and returns this channel's array. The remaining
+    fields describe it in exported files, as for a ``device_data``.
+
+    A name starting with ``_`` marks an intermediate result, e.g. several channels computed
+    together; it can be an input but is never listed or exported.
+    """
+
+    name: str
+    inputs: tuple[str, ...]
+    function: Callable[..., np.ndarray]
+    units: str = ""
+    display_name: str = ""
+    short_name: str = ""
+    decimals: int | None = None
+
+    @property
+    def intermediate(self) -> bool:
+        return self.name.startswith("_")
+
+    def device(self, column_index: int) -> device_data:
+        return device_data(
+            self.name,
+            column_index,
+            0,
+            units=self.units,
+            display_name=self.display_name,
+            short_name=self.short_name,
+            decimals=self.decimals,
+        )
+
+
+class ChannelRegistry:
+    """Derived channels by name; see ``RunChannels`` for computing them over a run."""
+
+    def __init__(self, channels: Iterable[DerivedChannel] = ()):
+        self._channels: dict[str, DerivedChannel] = {}
+        for channel in channels:
+            self.register(channel)
+
+    def register(self, channel: DerivedChannel) -> DerivedChannel:
+        if channel.name in self._channels:
+            raise ValueError(f"Derived channel already registered: {channel.name}")
+        self._channels[channel.name] = channel
+        return channel
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._channels
+
+    def __getitem__(self, name: str) -> DerivedChannel:
+        return self._channels[name]
+
+    def __iter__(self) -> Iterator[DerivedChannel]:
+        return iter(self._channels.values())
+
+
+def _mean(*values: np.ndarray) -> np.ndarray:
+    return sum(values) / len(values)
+
+
+def _wheel_speed(tyre_diameter: float) -> Callable[[np.ndarray], np.ndarray]:
+    # rpm -> km/h: one circumference per revolution, 60 minutes an hour, 1000 m a km.
+    factor = math.pi * tyre_diameter * 60.0 / 1000.0
+    return lambda rpm: np.asarray(rpm, dtype=np.float64) * factor
+
+
+def default_registry(
+    shocks: ShockSettings = DEFAULT_SHOCK_SETTINGS,
+    imu: ImuSettings = DEFAULT_IMU_SETTINGS,
+    tyre_diameter: float = TYRE_DIAMETER,
+    devices: list[device_data] | None = None,
+) -> ChannelRegistry:
+    """
+    The derived channels the analysis scripts use: shock displacement and velocity per corner
+    and their front and rear averages, CG acceleration, and wheel speed from the hub RPM. The
+    shock and CG channels match the ones the conversion adds (see ``ShockDerivation`` and
+    ``CgTransform``). ``devices``, when given, supplies the sensor resolution the shock zero is
+    snapped to and the decimals the shock channels are written with.
+    """
+    sources = {device.name: device for device in devices or []}
+    registry = ChannelRegistry()
+
+    velocity_units = {}
+    for corner, channel in SHOCK_CHANNELS.items():
+        source = sources.get(channel)
+        resolution = getattr(source.conversion_factor, "resolution", None) if source else None
+        decimals = source.decimals if source else None
+        units = source.units if source and source.units else "mm"
+        velocity_units[corner] = f"{units}/s"
+        registry.register(
+            DerivedChannel(
+                f"{corner}_SHOCK_DISP",
+                (channel,),
+                lambda positions, resolution=resolution: shock_displacement(positions, shocks, resolution),
+                units=units,
+                display_name=f"{corner} Shock Disp",
+                short_name=f"{corner}_Disp",
+                decimals=decimals,
+            )
+        )
+        registry.register(
+            DerivedChannel(
+                f"{corner}_SHOCK_VEL",
+                (f"{corner}_SHOCK_DISP", TIME_CHANNEL),
+                lambda displacement, timestamps: shock_velocity(displacement, timestamps, shocks),
+                units=velocity_units[corner],
+                display_name=f"{corner} Shock Vel",
+                short_name=f"{corner}_Vel",
+                decimals=decimals,
+            )
+        )
+    for axle, corners in (("FRONT", ("FL", "FR")), ("REAR", ("RL", "RR"))):
+        registry.register(
+            DerivedChannel(
+                f"{axle}_SHOCK_VEL",
+                tuple(f"{corner}_SHOCK_VEL" for corner in corners),
+                _mean,
+                units=velocity_units[corners[0]],
+                display_name=f"{axle.title()} Shock Vel",
+                short_name=f"{axle[0]}_Vel",
+            )
+        )
+
+    registry.register(
+        DerivedChannel(
+            "_CG_ACCEL",
+            (TIME_CHANNEL,) + IMU_ACCEL_CHANNELS + IMU_GYRO_CHANNELS,
+            lambda timestamps, *imu_axes: cg_accelerations(timestamps, imu_axes[:3], imu_axes[3:], imu),
+        )
+    )
+    for axis_index, (name, axis) in enumerate(zip(CG_CHANNELS, "XYZ")):
+        registry.register(
+            DerivedChannel(
+                name,
+                ("_CG_ACCEL",),
+                lambda cg, axis_index=axis_index: cg[axis_index],
+                units="g",
+                display_name=f"CG {axis} Accel",
+                short_name=f"CG_{axis}",
+            )
+        )
+
+    for corner, channel in WHEEL_RPM_CHANNELS.items():
+        registry.register(
+            DerivedChannel(
+                f"{corner}W_SPEED",
+                (channel,),
+                _wheel_speed(tyre_diameter),
+                units="km/h",
+                display_name=f"{corner} Wheel Speed (RPM)",
+                short_name=f"{corner}W_Spd",
+                decimals=2,
+            )
+        )
+    return registry
+
+
+class RunChannels(Mapping):
+    """
+    The recorded and derived channels of one run, as a read-only mapping of whole-log arrays.
+
+    Derived channels are computed lazily: asking for one computes what it depends on first, in
+    dependency order, and keeps every result for the run, so a report only pays for the channels
+    it uses and each is computed once. A recorded channel always wins over a registered one of
+    the same name (a conversion that already added the shock channels, say).
+
+    ``calibration`` fingerprints how the recorded channels were calibrated; ``recalibrate``
+    swaps in recalibrated columns and drops every derived value when it changes. With a
+    ``loader`` the recorded channels are read on demand too, all the ones a request needs at once.
+    """
+
+    def __init__(
+        self,
+        columns: Mapping[str, np.ndarray] | None = None,
+        registry: ChannelRegistry | None = None,
+        calibration: str | None = None,
+        loader: Callable[[list[str]], dict[str, np.ndarray]] | None = None,
+        recorded: Iterable[str] | None = None,
+    ):
+        self.registry = default_registry() if registry is None else registry
+        self.calibration = calibration
+        self._loader = loader
+        self._columns = dict(columns or {})
+        self._recorded = list(self._columns) if recorded is None else list(recorded)
+        self._derived: dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_csv(cls, csv_path: str | Path, registry: ChannelRegistry | None = None) -> RunChannels:
+        """A converted CSV; only the columns derived channels (or callers) ask for are read."""
+        header = read_csv_header(csv_path)
+        positions = {name: index for index, name in enumerate(header)}
+
+        def load(names: list[str]) -> dict[str, np.ndarray]:
+            return dict(zip(names, read_csv_columns(csv_path, [positions[name] for name in names])))
+
+        return cls(registry=registry, loader=load, recorded=header)
+
+    @property
+    def recorded(self) -> list[str]:
+        return list(self._recorded)
+
+    @property
+    def computed(self) -> list[str]:
+        """Derived channels computed so far, in the order they were."""
+        return list(self._derived)
+
+    def derivable(self) -> list[str]:
+        """Registered channels (not intermediates) whose inputs this run has, recorded or derived."""
+        recorded = set(self._recorded)
+        known: dict[str, bool] = {}
+
+        def resolvable(name: str, visiting: frozenset[str] = frozenset()) -> bool:
+            if name in recorded:
+                return True
+            if name not in known:
+                if name in visiting or name not in self.registry:
+                    return False
+                inputs = self.registry[name].inputs
+                known[name] = all(resolvable(source, visiting | {name}) for source in inputs)
+            return known[name]
+
+        return [
+            channel.name
+            for channel in self.registry
+            if not channel.intermediate and channel.name not in recorded and resolvable(channel.name)
+        ]
+
+    def _plan(self, names: Iterable[str]) -> tuple[list[str], list[str]]:
+        """Recorded channels to load and derived channels to compute (in order) for ``names``."""
+        recorded = set(self._recorded)
+        load: list[str] = []
+        order: list[str] = []
+        done: set[str] = set()
+
+        def visit(name: str, path: tuple[str, ...]) -> None:
+            if name in done:
+                return
+            if name in recorded:
+                if name not in self._columns:
+                    load.append(name)
+            elif name in self._derived:
+                pass
+            elif name in self.registry:
+                if name in path:
+                    raise ValueError(f"Derived channels depend on each other: {' -> '.join(path + (name,))}")
+                for source in self.registry[name].inputs:
+                    visit(source, path + (name,))
+                order.append(name)
+            else:
+                raise KeyError(name)
+            done.add(name)
+
+        for name in names:
+            visit(name, ())
+        return load, order
+
+    def select(self, names: Iterable[str]) -> dict[str, np.ndarray]:
+        """The channels in ``names``, computing (and keeping) only what they need."""
+        names = list(names)
+        load, order = self._plan(names)
+        if load:
+            self._columns.update(self._loader(load))
+        for name in order:
+            channel = self.registry[name]
+            self._derived[name] = np.asarray(channel.function(*(self[source] for source in channel.inputs)))
+        return {name: self._columns[name] if name in self._columns else self._derived[name] for name in names}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name in self._columns:
+            return self._columns[name]
+        if name in self._derived:
+            return self._derived[name]
+        return self.select([name])[name]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._recorded
+        yield from self.derivable()
+
+    def __len__(self) -> int:
+        return len(self._recorded) + len(self.derivable())
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._recorded or name in self.derivable()
+
+    def devices(self, names: Iterable[str], recorded: list[device_data]) -> list[device_data]:
+        """Devices for exporting ``names``: those in ``recorded`` where there is one, else the registry's."""
+        known = {device.name: device for device in recorded}
+        return [
+            known[name] if name in known else self.registry[name].device(index) for index, name in enumerate(names)
+        ]
+
+    def recalibrate(self, calibration: str | None, columns: Mapping[str, np.ndarray] | None = None) -> bool:
+        """
+        Switch to recorded channels calibrated as ``calibration`` (``columns``, or read again
+        through the loader). Returns whether anything changed; derived values are then dropped.
+        A run without a loader has no way to read its channels again, so it needs ``columns``.
+        """
+        if calibration == self.calibration:
+            return False
+        if columns is None and self._loader is None:
+            raise ValueError("Recalibrating a run without a loader needs the recalibrated columns")
+        self.calibration = calibration
+        self._columns = dict(columns or {})
+        if columns is not None:
+            self._recorded = list(self._columns)
+        self._derived.clear()
+        return True
+
+    def invalidate(self, names: Iterable[str] | None = None) -> None:
+        """Drop the derived values of ``names`` (all by default) and everything computed from them."""
+        if names is None:
+            self._derived.clear()
+            return
+        stale = set(names)
+        for name in list(self._derived):
+            if name in stale or any(source in stale for source in self.registry[name].inputs):
+                stale.add(name)
+                del self._derived[name]
+
+
+__all__ = [
+    "ChannelRegistry",
+    "DerivedChannel",
+    "RunChannels",
+    "TIME_CHANNEL",
+    "TYRE_DIAMETER",
+    "WHEEL_RPM_CHANNELS",
+    "default_registry",
+]
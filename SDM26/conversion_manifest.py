@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+MANIFEST_NAME = "conversion_manifest.json"
+MANIFEST_VERSION = 1
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def partial_path(path: str | Path) -> Path:
+    """Where an output is written until it is complete; it only takes its real name once whole."""
+    path = Path(path)
+    return path.with_name(path.name + ".partial")
+
+
+def file_digest(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_state(path: str | Path, previous: dict[str, Any] | None = None) -> dict[str, Any]:
+    """
+    Size, modification time and content hash of an input file. The hash is reused from
+    ``previous`` when size and modification time are unchanged, so an untouched file is not
+    read again.
+    """
+    stat = Path(path).stat()
+    state = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    previous_source = (previous or {}).get("source") or {}
+    if {key: previous_source.get(key) for key in state} == state and previous_source.get("sha256"):
+        state["sha256"] = previous_source["sha256"]
+    else:
+        state["sha256"] = file_digest(path)
+    return state
+
+
+def stage_is_current(
+    previous: dict[str, Any] | None,
+    source: dict[str, Any],
+    stage: str,
+    inputs: dict[str, Any],
+    output_path: str | Path,
+) -> bool:
+    """
+    True when ``stage`` was last built from the same input content with the same ``inputs`` and
+    its output is still on disk at the size it was written with. A missing or truncated output
+    (e.g. a conversion killed part way) makes the stage stale.
+    """
+    if not previous:
+        return False
+    previous_source = previous.get("source") or {}
+    if previous_source.get("sha256") != source["sha256"] or previous_source.get("size") != source["size"]:
+        return False
+
+    record = (previous.get("outputs") or {}).get(stage)
+    if not record or record.get("inputs") != json.loads(json.dumps(inputs)):
+        return False
+
+    output_path = Path(output_path)
+    return output_path.is_file() and output_path.stat().st_size == record.get("size")
+
+
+def stage_record(output_path: str | Path, inputs: dict[str, Any]) -> dict[str, Any]:
+    return {"file": Path(output_path).name, "size": Path(output_path).stat().st_size, "inputs": inputs}
+
+
+class ConversionManifest:
+    """
+    Record of what was converted into an output folder, one entry per input file name:
+    the input's size/mtime/sha256 and, per output stage (``csv``, ``ld``), the settings it was
+    built with and the size of the file written. Lets a re-run skip inputs whose outputs are
+    still current.
+    """
+
+    def __init__(self, path: str | Path, files: dict[str, dict[str, Any]] | None = None):
+        self.path = Path(path)
+        self.files: dict[str, dict[str, Any]] = files or {}
+
+    @classmethod
+    def load(cls, directory: str | Path) -> ConversionManifest:
+        """Read the manifest in ``directory``; a missing, unreadable or older manifest starts empty."""
+        path = Path(directory) / MANIFEST_NAME
+        try:
+            with open(path, "r", encoding="utf-8") as manifest_file:
+                data = json.load(manifest_file)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, dict(data.get("files") or {}))
+
+    def entry(self, name: str) -> dict[str, Any] | None:
+        return self.files.get(name)
+
+    def update(self, name: str, entry: dict[str, Any] | None) -> None:
+        if entry is not None:
+            self.files[name] = entry
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = partial_path(self.path)
+        with open(temporary, "w", encoding="utf-8") as manifest_file:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, manifest_file, indent=2, sort_keys=True)
+            manifest_file.write("\n")
+        os.replace(temporary, self.path)
+
+
+__all__ = [
+    "ConversionManifest",
+    "MANIFEST_NAME",
+    "MANIFEST_VERSION",
+    "file_digest",
+    "partial_path",
+    "source_state",
+    "stage_is_current",
+    "stage_record",
+]
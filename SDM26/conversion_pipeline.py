@@ -1,22 +1,60 @@
 from __future__ import annotations
 
 import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from statistics import median
-from typing import Callable
-
-from devices import create_devices, configure_devices, generate_channel_list
-from imu_displacement import translate_linear_acc
-from motec_ld import MotecChannel, MotecEvent, MotecLog
+from typing import Any, Callable, Iterator
+
+import numpy as np
+
+from benji2_reader import Benji2File, Benji2Tail, EmptyBenji2FileError, filter_duplicate_headers, record_devices
+from channel_registry import ChannelRegistry, RunChannels, default_registry
+from conversion_manifest import ConversionManifest, partial_path, source_state, stage_is_current, stage_record
+from csv_columns import parse_float_cells, read_csv_columns, read_csv_header
+from devices import create_devices, configure_devices, device_data, generate_channel_list
+from derived_channels import DerivedStage, derive_columns, row_count
+from envelopes import BASE_LEVEL, ENVELOPE_VERSION, EnvelopeWriter, envelope_path
+from filters import FilterStage, filter_devices
+from imu_displacement import DEFAULT_IMU_SETTINGS, CgTransform, ImuSettings, imu_devices
+from resample import Resampler, grid_length, resample_columns
+from run_catalog import CATALOG_NAME, RunCatalog, RunRecord, RunStatistics
+from shocks import DEFAULT_SHOCK_SETTINGS, ShockDerivation, ShockSettings, shock_devices
+from timebase import TimebaseReport, TimebaseTracker, analyze_timebase
+from motec_ld import (
+    MotecAppendWriter,
+    MotecChannel,
+    MotecEvent,
+    MotecLog,
+    MotecStreamWriter,
+    compact_range_encoding,
+    within_error_bound,
+)
 
 LogCallback = Callable[[str], None]
 ProgressCallback = Callable[[int, int, str], None]
+StepCallback = Callable[..., None]
+
+# Rates a slow channel may be written at. Keeping to these keeps decimated channels on a few common
+# time grids in i2 instead of one odd rate per channel.
+NATIVE_RATE_STEPS = (1, 2, 5, 10, 20, 25, 50, 100, 200, 250)
+
+# Bump whenever decoded values or output formats change, so outputs in existing manifests are rebuilt.
+CONVERTER_VERSION = 6
 
+# Records decoded per block by the streaming path: 512 KiB per float64 channel.
+DEFAULT_CHUNK_RECORDS = 1 << 16
 
-class EmptyBenji2FileError(ValueError):
-    """Raised when a BENJI2 file has no readable log payload."""
+# Rows formatted at once by CsvBlockWriter; bounds the byte matrices to a few MB per slice.
+CSV_FORMAT_ROWS = 1 << 14
+_CSV_WRITE_BUFFER = 1 << 20
 
 
 @dataclass(frozen=True)
@@ -24,31 +62,36 @@ class OutputLayout:
     root_dir: Path
     csv_dir: Path
     ld_dir: Path
+    session: str = ""
 
 
 @dataclass(frozen=True)
 class ConversionArtifacts:
     benji_path: Path
-    csv_path: Path
+    csv_path: Path | None
     ld_path: Path
 
 
-def filter_duplicate_headers(header_str: str) -> tuple[str, list[int]]:
-    headers = [header.strip() for header in header_str.split(",")]
-    base_counts: dict[str, int] = {}
-    filtered: list[str] = []
+@dataclass(frozen=True)
+class ChannelEncoding:
+    """Error bound (and native sensor resolution, when known) for compact LD encoding."""
 
-    for header in headers:
-        header = header.strip("\x00")
-        base = header.rstrip("0123456789").strip()
-        if base not in base_counts:
-            filtered.append(base)
-            base_counts[base] = 1
-        else:
-            base_counts[base] += 1
+    max_error: float
+    resolution: float | None = None
 
-    counts = [base_counts[base] for base in filtered]
-    return ",".join(filtered), counts
+
+@dataclass(frozen=True)
+class DecodedBenji2:
+    """Calibrated channel arrays for one BENJI2 file, keyed by device name."""
+
+    benji_path: Path
+    header: str
+    devices: list[device_data]
+    columns: dict[str, np.ndarray]
+
+    @property
+    def row_count(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
 
 
 def collect_files(input_path: str | Path, suffix: str) -> list[Path]:
@@ -80,7 +123,7 @@ def build_output_layout(output_dir: str | Path, input_path: str | Path) -> Outpu
     source_path = Path(input_path)
     session_name = source_path.stem if source_path.is_file() else source_path.name
     root_dir = base_output_dir / f"converted_{session_name}"
-    return OutputLayout(root_dir=root_dir, csv_dir=root_dir / "csv", ld_dir=root_dir / "ld")
+    return OutputLayout(root_dir=root_dir, csv_dir=root_dir / "csv", ld_dir=root_dir / "ld", session=session_name)
 
 
 def _emit_log(logger: LogCallback | None, message: str) -> None:
@@ -93,72 +136,529 @@ def _emit_progress(progress_callback: ProgressCallback | None, completed: int, t
         progress_callback(completed, total, message)
 
 
+def decode_benji2_file(benji_path: str | Path, jobs: int | None = 1) -> DecodedBenji2:
+    """Decode and calibrate every stored channel; ``jobs`` splits long files into record ranges."""
+    benji_path = Path(benji_path)
+    with Benji2File(benji_path) as benji_file:
+        return DecodedBenji2(
+            benji_path=benji_path,
+            header=benji_file.header,
+            devices=benji_file.devices,
+            columns=benji_file.columns(jobs=jobs),
+        )
+
+
+def _derived_stages(
+    devices: list[device_data],
+    shocks: ShockSettings | None,
+    imu: ImuSettings | None,
+) -> list[DerivedStage]:
+    """
+    Stages adding the derived channels ``devices`` has inputs for; None settings leave one out.
+    Filtered channels are added for every device with a filter in the calibration table.
+    """
+    stages: list[DerivedStage] = []
+    if shocks is not None:
+        stages.append(ShockDerivation(devices, shocks))
+    if imu is not None:
+        stages.append(CgTransform(devices, imu))
+    stages.append(FilterStage(devices))
+    return [stage for stage in stages if stage.devices]
+
+
+def _with_derived(
+    header: str,
+    devices: list[device_data],
+    stages: list[DerivedStage],
+) -> tuple[str, list[device_data]]:
+    """CSV header and device list with the derived channels of ``stages`` appended."""
+    derived = [device for stage in stages for device in stage.devices]
+    if not derived:
+        return header, devices
+    return ",".join([header] + [device.name for device in derived]), devices + derived
+
+
+def _through_stages(block: dict[str, np.ndarray], stages: list[DerivedStage]) -> dict[str, np.ndarray]:
+    for stage in stages:
+        block = stage.update(block)
+    return block
+
+
+def _finish_stages(stages: list[DerivedStage]) -> Iterator[dict[str, np.ndarray]]:
+    """The rows ``stages`` still hold back once the input has ended."""
+    for index, stage in enumerate(stages):
+        block = stage.finish()
+        if row_count(block):
+            block = _through_stages(block, stages[index + 1 :])
+            if row_count(block):
+                yield block
+
+
+def _derived_blocks(
+    blocks: Iterator[dict[str, np.ndarray]],
+    stages: list[DerivedStage],
+) -> Iterator[dict[str, np.ndarray]]:
+    """``blocks`` with the derived channels of ``stages`` added; rows they hold back come out later."""
+    for block in blocks:
+        block = _through_stages(block, stages)
+        if row_count(block):
+            yield block
+    yield from _finish_stages(stages)
+
+
+def derive_decoded_channels(
+    decoded: DecodedBenji2,
+    shocks: ShockSettings | None = DEFAULT_SHOCK_SETTINGS,
+    imu: ImuSettings | None = DEFAULT_IMU_SETTINGS,
+) -> DecodedBenji2:
+    """
+    ``decoded`` with its derived channels appended: shock displacement and velocity per corner
+    (see ``ShockDerivation``) and the acceleration at the CG (see ``CgTransform``), either left
+    out when its settings are None, and the filtered channels (see ``FilterStage``).
+    """
+    stages = _derived_stages(decoded.devices, shocks, imu)
+    if not stages:
+        return decoded
+    header, devices = _with_derived(decoded.header, decoded.devices, stages)
+    columns = derive_columns(decoded.columns, stages)
+    return DecodedBenji2(benji_path=decoded.benji_path, header=header, devices=devices, columns=columns)
+
+
+def decoded_run_channels(
+    decoded: DecodedBenji2,
+    registry: ChannelRegistry | None = None,
+    shocks: ShockSettings | None = DEFAULT_SHOCK_SETTINGS,
+    imu: ImuSettings | None = DEFAULT_IMU_SETTINGS,
+) -> RunChannels:
+    """
+    Lazily derived channels over ``decoded`` (see ``RunChannels``), keyed to its calibration so
+    a recalibrated decode of the same file drops them. Uses ``default_registry`` with ``shocks``
+    and ``imu`` by default (the defaults where None), so channels the conversion did not add are
+    derived as it would have.
+    """
+    if registry is None:
+        registry = default_registry(
+            shocks or DEFAULT_SHOCK_SETTINGS, imu or DEFAULT_IMU_SETTINGS, devices=decoded.devices
+        )
+    return RunChannels(decoded.columns, registry, calibration=_calibration_digest(decoded.devices))
+
+
+def select_decoded_channels(
+    decoded: DecodedBenji2,
+    names: list[str],
+    channels: RunChannels | None = None,
+    shocks: ShockSettings | None = DEFAULT_SHOCK_SETTINGS,
+    imu: ImuSettings | None = DEFAULT_IMU_SETTINGS,
+) -> DecodedBenji2:
+    """
+    ``decoded`` cut down to ``names``, recorded or derived (computed through ``channels``, by
+    default ``decoded_run_channels`` with ``shocks`` and ``imu``), ready for ``write_decoded_csv``
+    or ``write_channels_to_motec``. The time channel is always kept. Channels ``decoded`` already
+    has (e.g. from ``derive_decoded_channels``) are taken as they are, so a selection never
+    differs from the columns a full conversion would write.
+    """
+    if channels is None:
+        channels = decoded_run_channels(decoded, shocks=shocks, imu=imu)
+    time_name = _find_time_name(decoded.columns)
+    if time_name is not None and time_name not in names:
+        names = [time_name] + list(names)
+    devices = channels.devices(names, decoded.devices)
+    return DecodedBenji2(
+        benji_path=decoded.benji_path,
+        header=",".join(names),
+        devices=devices,
+        columns=channels.select(names),
+    )
+
+
+def _exported(
+    decoded: DecodedBenji2,
+    channels: list[str] | None,
+    shocks: ShockSettings | None,
+    imu: ImuSettings | None,
+) -> DecodedBenji2:
+    """What is written out of ``decoded``: all of it, or only the selected ``channels``."""
+    return decoded if channels is None else select_decoded_channels(decoded, channels, shocks=shocks, imu=imu)
+
+
+def _check_selection(channels: list[str] | None, chunk_records: int | None) -> None:
+    # Registered channels are computed over the whole log, so a selection cannot be streamed.
+    if channels is not None and chunk_records is not None:
+        raise ValueError("Selecting channels needs the whole log decoded at once; leave chunk_records unset")
+
+
+def _scaled_integers(values: np.ndarray, decimals: int) -> np.ndarray | None:
+    """``values * 10**decimals`` rounded to int64, or None when a value is not finite or too large."""
+    scale = 10**decimals
+    if values.dtype.kind in "iu":
+        values = values.astype(np.int64)
+        if len(values) and np.abs(values).max() >= 10**18 // scale:
+            return None
+        return values * scale
+
+    scaled = np.rint(values * scale)
+    if not np.isfinite(scaled).all() or (len(scaled) and np.abs(scaled).max() >= 1e18):
+        return None
+    return scaled.astype(np.int64)
+
+
+def _fixed_point_cells(scaled: np.ndarray, decimals: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Scaled integers as right-aligned ASCII digits with a decimal point ``decimals`` places from
+    the right, one column per value, plus a mask of the characters to keep. Sign, leading zeros
+    and trailing fractional zeros are masked out, so ``1.50`` is written ``1.5`` and ``2.00``
+    is ``2``.
+    """
+    magnitude = np.abs(scaled)
+    largest = int(magnitude.max(initial=0))
+    if largest < 1 << 32:
+        # Digit extraction is integer division per character; 32-bit division is much cheaper.
+        magnitude = magnitude.astype(np.uint32)
+    digits = max(len(str(largest)), decimals + 1)
+    width = 1 + digits + (1 if decimals else 0)
+    chars = np.empty((width, len(scaled)), dtype=np.uint8)
+    keep = np.empty((width, len(scaled)), dtype=bool)
+
+    row = width - 1
+    significant = np.zeros(len(scaled), dtype=bool)
+    remaining = magnitude
+    for position in range(digits):
+        if decimals and position == decimals:
+            chars[row] = ord(".")
+            keep[row] = significant
+            row -= 1
+        if position < decimals:
+            remaining, digit = np.divmod(remaining, 10)
+            significant |= digit != 0
+            keep[row] = significant
+        else:
+            keep[row] = remaining != 0
+            if position == decimals:
+                keep[row] = True
+            remaining, digit = np.divmod(remaining, 10)
+        chars[row] = digit + ord("0")
+        row -= 1
+
+    chars[0] = ord("-")
+    keep[0] = scaled < 0
+    return chars, keep
+
+
+def _csv_cells(values: np.ndarray, decimals: int | None) -> tuple[np.ndarray, np.ndarray]:
+    """ASCII cells for one column: fixed point when ``decimals`` is set, else ``str(value)``."""
+    if decimals is not None:
+        scaled = _scaled_integers(values, decimals)
+        if scaled is not None:
+            return _fixed_point_cells(scaled, decimals)
+
+    text = values.astype(str).astype(np.bytes_)
+    chars = text.view(np.uint8).reshape(len(text), text.dtype.itemsize).T
+    return chars, chars != 0
+
+
+def format_csv_rows(
+    columns: list[np.ndarray | None],
+    decimals: list[int | None],
+    first_row: int = 1,
+) -> bytes:
+    """
+    CSV text for a block of rows, numbered from ``first_row``. Each column is formatted as a
+    whole into a character matrix (one matrix column per row) with a keep-mask; the matrices are
+    stacked with the separators and the kept bytes read out row by row. ``None`` columns are
+    empty cells.
+    """
+    row_count = next((len(values) for values in columns if values is not None), 0)
+    separator = (np.full((1, row_count), ord(","), dtype=np.uint8), np.ones((1, row_count), dtype=bool))
+    newline = (np.full((1, row_count), ord("\n"), dtype=np.uint8), separator[1])
+
+    cells = [_csv_cells(np.arange(first_row, first_row + row_count, dtype=np.int64), 0)]
+    for values, places in zip(columns, decimals):
+        cells.append(separator)
+        if values is not None:
+            cells.append(_csv_cells(np.asarray(values), places))
+    cells.append(newline)
+
+    chars = np.concatenate([cell[0] for cell in cells])
+    keep = np.concatenate([cell[1] for cell in cells])
+    return chars.T[keep.T].tobytes()
+
+
+class CsvBlockWriter:
+    """
+    Write the decoded CSV a block of rows at a time. Rows are numbered across blocks, so writing
+    one block or many gives the same file. Each channel is written to its device's ``decimals``
+    (from the calibration table), or at full precision when that is unset. Devices missing from
+    the record payload (after CH_COUNT) are written as empty cells. The CSV is written under a
+    temporary name and only appears once complete, unless ``atomic`` is off (a live CSV that
+    readers follow as it grows).
+    """
+
+    def __init__(self, csv_path: str | Path, header: str, devices: list[device_data], atomic: bool = True):
+        self.csv_path = Path(csv_path)
+        self.csv_path.parent.mkdir(parents=True, exist_ok=True)
+        self.devices = devices
+        self.rows = 0
+        self._partial = partial_path(self.csv_path) if atomic else self.csv_path
+        self._file = open(self._partial, "wb", buffering=_CSV_WRITE_BUFFER)
+        self._file.write(("SAMPLE," + header + "\n").encode())
+
+    def write(self, columns: dict[str, np.ndarray]) -> None:
+        row_count = len(next(iter(columns.values()))) if columns else 0
+        decimals = [device.decimals for device in self.devices]
+        for start in range(0, row_count, CSV_FORMAT_ROWS):
+            stop = min(start + CSV_FORMAT_ROWS, row_count)
+            block = [
+                columns[device.name][start:stop] if device.name in columns else None
+                for device in self.devices
+            ]
+            self._file.write(format_csv_rows(block, decimals, first_row=self.rows + 1))
+            self.rows += stop - start
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+            if self._partial != self.csv_path:
+                os.replace(self._partial, self.csv_path)
+
+    def abort(self) -> None:
+        self._file.close()
+        if self._partial != self.csv_path:
+            self._partial.unlink(missing_ok=True)
+
+    def __enter__(self) -> CsvBlockWriter:
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_decoded_csv(decoded: DecodedBenji2, csv_path: str | Path) -> int:
+    with CsvBlockWriter(csv_path, decoded.header, decoded.devices) as writer:
+        writer.write(decoded.columns)
+    return writer.rows
+
+
 def convert_benji2_file_to_csv(
     benji_path: str | Path,
     csv_path: str | Path,
     logger: LogCallback | None = None,
+    chunk_records: int | None = None,
+    shocks: ShockSettings | None = DEFAULT_SHOCK_SETTINGS,
+    imu: ImuSettings | None = DEFAULT_IMU_SETTINGS,
+    extra_sinks: list[RunStatistics | EnvelopeWriter] | None = None,
+    channels: list[str] | None = None,
 ) -> Path:
+    """
+    Decode one BENJI2 file to CSV, with the derived channels (see ``derive_decoded_channels``);
+    with ``chunk_records`` only one block is held at a time. ``channels`` limits the CSV to those
+    channels, recorded or registered (see ``select_decoded_channels``; not with ``chunk_records``).
+    ``extra_sinks`` see every row of every channel too.
+    """
+    _check_selection(channels, chunk_records)
     benji_path = Path(benji_path)
     csv_path = Path(csv_path)
 
     _emit_log(logger, f"BENJI2 -> CSV: {benji_path.name}")
+    if chunk_records is None:
+        decoded = derive_decoded_channels(decode_benji2_file(benji_path), shocks, imu)
+        written_rows = write_decoded_csv(_exported(decoded, channels, shocks, imu), csv_path)
+        _write_whole_log(extra_sinks, decoded.columns)
+    else:
+        written_rows = stream_benji2_file(
+            benji_path,
+            None,
+            csv_path=csv_path,
+            chunk_records=chunk_records,
+            shocks=shocks,
+            imu=imu,
+            extra_sinks=extra_sinks,
+        )
 
-    with open(benji_path, "br") as benji_file:
-        header_length_bytes = benji_file.read(4)
-        if not header_length_bytes:
-            raise EmptyBenji2FileError(f"Skipping empty BENJI2 file: {benji_path.name}")
-        if len(header_length_bytes) != 4:
-            raise ValueError(f"Missing BENJI2 header length in {benji_path.name}")
+    _emit_log(logger, f"CSV written: {csv_path} ({written_rows} rows)")
+    return csv_path
 
-        header_length = int.from_bytes(header_length_bytes, "little", signed=False) - 1
-        if header_length <= 0:
-            raise EmptyBenji2FileError(f"Skipping empty BENJI2 file: {benji_path.name}")
 
-        header_data = benji_file.read(header_length)
+def resolve_jobs(jobs: int | None) -> int:
+    """Worker process count for ``jobs``; ``None`` leaves one core free, like ``process_directory``."""
+    if jobs is None:
+        return max(1, (os.cpu_count() or 1) - 1)
+    return max(1, int(jobs))
+
+
+# Set in each pool worker by _init_relay; carries (task index, kind, payload) back to the parent.
+_relay: Any = None
+
+
+def _init_relay(relay: Any) -> None:
+    global _relay
+    _relay = relay
+
+
+def _relayed_task(task: Callable[..., Any], index: int, arguments: tuple) -> Any:
+    def log(message: str) -> None:
+        _relay.put((index, "log", message))
+
+    def step(message: str, count: int = 1) -> None:
+        _relay.put((index, "step", (message, count)))
+
+    try:
+        return task(*arguments, logger=log, step=step)
+    finally:
+        _relay.put((index, "done", None))
+
+
+def _run_tasks(
+    task: Callable[..., Any],
+    arguments: list[tuple],
+    jobs: int | None,
+    logger: LogCallback | None,
+    step: StepCallback,
+    on_result: Callable[[int, Any], None] | None = None,
+) -> list[Any]:
+    """
+    Run ``task(*args, logger=..., step=...)`` for every entry of ``arguments`` and return the results
+    in order. With more than one job the tasks go to a process pool; their log and step messages come
+    back through a queue and are replayed in task order, so callbacks only ever run in this thread
+    and the log reads the same as a sequential run. Messages of the earliest unfinished task are
+    passed on as they arrive, those of later tasks are held until it is done. ``on_result`` gets
+    ``(index, result)`` of each task in the same order as soon as it is done, so the work of earlier
+    tasks can be kept when a later one raises.
+    """
+    results: list[Any] = []
+
+    def finished(result: Any) -> None:
+        if on_result is not None:
+            on_result(len(results), result)
+        results.append(result)
+
+    workers = min(resolve_jobs(jobs), len(arguments))
+    if workers <= 1:
+        for args in arguments:
+            finished(task(*args, logger=logger, step=step))
+        return results
+
+    def replay(kind: str, payload: Any) -> None:
+        if kind == "log":
+            _emit_log(logger, payload)
+        elif kind == "step":
+            step(*payload)
+
+    relay = multiprocessing.get_context().Queue()
+    held: list[list[tuple[str, Any]]] = [[] for _ in arguments]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_relay, initargs=(relay,)) as executor:
+        futures = [executor.submit(_relayed_task, task, index, args) for index, args in enumerate(arguments)]
         try:
-            header = header_data.decode("utf-8")
-        except UnicodeDecodeError as exc:
-            raise ValueError(f"Unable to decode header in {benji_path.name}: {exc}") from exc
-
-        filtered_header, data_sizes = filter_duplicate_headers(header)
-        device_names = [name.strip() for name in filtered_header.split(",")]
-        devices = create_devices(device_names, data_sizes)
-        configure_devices(devices)
-
-        csv_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(csv_path, "w", newline="") as csv_file:
-            csv_file.write("SAMPLE," + filtered_header + "\n")
-            benji_file.read(1)
-
-            sample_number = 0
-            written_rows = 0
-
-            while True:
-                output_row = [None] * len(devices)
-                eof = False
-
-                for device in devices:
-                    if device.name == "CH_COUNT":
+            head = 0
+            while head < len(futures):
+                try:
+                    index, kind, payload = relay.get(timeout=0.1)
+                except queue.Empty:
+                    # A worker that died without reporting back would otherwise stall the loop.
+                    if futures[head].done() and futures[head].exception() is not None:
+                        raise futures[head].exception()
+                    continue
+
+                if index != head:
+                    held[index].append((kind, payload))
+                    continue
+                if kind != "done":
+                    replay(kind, payload)
+                    continue
+
+                finished(futures[head].result())
+                head += 1
+                # Catch up on the next task; it may already have finished as well.
+                while head < len(futures):
+                    pending, held[head] = held[head], []
+                    for kind, payload in pending:
+                        if kind != "done":
+                            replay(kind, payload)
+                    if ("done", None) not in pending:
                         break
+                    finished(futures[head].result())
+                    head += 1
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+    return results
+
+
+def _progress_steps(progress_callback: ProgressCallback | None, total: int) -> StepCallback:
+    completed = 0
+
+    def step(message: str, count: int = 1) -> None:
+        nonlocal completed
+        completed += count
+        _emit_progress(progress_callback, completed, total, message)
+
+    return step
+
+
+def _benji2_to_csv_task(
+    benji_path: Path,
+    csv_path: Path,
+    chunk_records: int | None,
+    incremental: bool,
+    shocks: ShockSettings | None,
+    imu: ImuSettings | None,
+    catalog: Path | None,
+    envelopes: bool,
+    channels: list[str] | None,
+    previous: dict[str, Any] | None,
+    logger: LogCallback,
+    step: StepCallback,
+) -> tuple[Path | None, dict[str, Any] | None, RunRecord | None]:
+    try:
+        with Benji2File(benji_path) as benji_file:
+            calibration = _calibration_digest(benji_file.devices)
+    except EmptyBenji2FileError as exc:
+        _emit_log(logger, str(exc))
+        step(f"Skipped empty file: {benji_path.name}")
+        return None, None, None
+
+    source = source_state(benji_path, previous)
+    inputs = _csv_stage_inputs(calibration, shocks, imu, channels)
+    outputs = _reusable_outputs(previous, source)
+    statistics = _catalog_statistics(catalog, csv_path, source, inputs)
+    envelope = None
+    if envelopes and not (
+        incremental
+        and stage_is_current(previous, source, "envelope", _envelope_stage_inputs(inputs), envelope_path(csv_path))
+    ):
+        envelope = EnvelopeWriter(envelope_path(csv_path))
+    sidecars = [sink for sink in (statistics, envelope) if sink is not None]
+
+    if incremental and stage_is_current(previous, source, "csv", inputs, csv_path):
+        _emit_log(logger, f"Up to date: {benji_path.name}")
+        if sidecars:
+            _sidecar_pass(benji_path, sidecars, chunk_records, shocks, imu, logger)
+        step(f"Up to date: {benji_path.name}")
+    else:
+        convert_benji2_file_to_csv(
+            benji_path,
+            csv_path,
+            logger=logger,
+            chunk_records=chunk_records,
+            shocks=shocks,
+            imu=imu,
+            extra_sinks=sidecars,
+            channels=channels,
+        )
+        step(f"CSV complete: {benji_path.name}")
+        outputs["csv"] = stage_record(csv_path, inputs)
+    if envelope is not None:
+        outputs["envelope"] = stage_record(envelope.path, _envelope_stage_inputs(inputs))
 
-                    raw_data = benji_file.read(device.byte_size)
-                    if len(raw_data) != device.byte_size:
-                        eof = True
-                        break
-
-                    output_row[device.column_index] = device.getData(raw_data)
-
-                if eof:
-                    break
-
-                sample_number += 1
-                output_row.insert(0, sample_number)
-                csv_file.write(",".join(str(value) if value is not None else "" for value in output_row) + "\n")
-                written_rows += 1
-
-    # translate_linear_acc(str(csv_path))
-    _emit_log(logger, f"CSV written: {csv_path} ({written_rows} rows)")
-    return csv_path
+    record = None
+    if statistics is not None:
+        record = statistics.record(csv_path, benji_path, csv_path, csv_path.parent.name, source, inputs)
+    return csv_path, {"source": source, "outputs": outputs}, record
 
 
 def convert_benji2_inputs_to_csv(
@@ -166,28 +666,56 @@ def convert_benji2_inputs_to_csv(
     csv_output_dir: str | Path,
     logger: LogCallback | None = None,
     progress_callback: ProgressCallback | None = None,
+    jobs: int | None = 1,
+    chunk_records: int | None = None,
+    incremental: bool = True,
+    shocks: ShockSettings | None = DEFAULT_SHOCK_SETTINGS,
+    imu: ImuSettings | None = DEFAULT_IMU_SETTINGS,
+    catalog: str | Path | None = CATALOG_NAME,
+    envelopes: bool = True,
+    channels: list[str] | None = None,
 ) -> list[Path]:
+    """
+    Convert BENJI2 file(s) to CSV. With ``incremental`` files whose CSV is still current according
+    to the manifest in ``csv_output_dir`` are skipped, see ``convert_benji2_inputs_to_outputs``.
+    The derived channels are added as in ``derive_decoded_channels``; ``channels`` limits the CSVs
+    to those, see ``convert_benji2_file_to_csv``. Every CSV is listed in the run ``catalog``
+    (relative to ``csv_output_dir``; None for none), see ``RunCatalog``, and with ``envelopes``
+    gets an envelope sidecar, see ``EnvelopeWriter``.
+    """
+    _check_selection(channels, chunk_records)
     benji_files = collect_files(input_path, ".benji2")
     csv_output_dir = Path(csv_output_dir)
     csv_output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = ConversionManifest.load(csv_output_dir)
+    catalog_path = _open_catalog(csv_output_dir, catalog)
 
-    outputs: list[Path] = []
     total = len(benji_files)
-
     _emit_progress(progress_callback, 0, total, "Starting BENJI2 -> CSV conversion")
 
-    for index, benji_path in enumerate(benji_files, start=1):
-        csv_path = csv_output_dir / f"{benji_path.stem}.csv"
-        try:
-            convert_benji2_file_to_csv(benji_path, csv_path, logger=logger)
-        except EmptyBenji2FileError as exc:
-            _emit_log(logger, str(exc))
-            _emit_progress(progress_callback, index, total, f"Skipped empty file: {benji_path.name}")
-            continue
-        outputs.append(csv_path)
-        _emit_progress(progress_callback, index, total, f"CSV complete: {benji_path.name}")
-
-    return outputs
+    results = _run_tasks(
+        _benji2_to_csv_task,
+        [
+            (
+                benji_path,
+                csv_output_dir / f"{benji_path.stem}.csv",
+                chunk_records,
+                incremental,
+                shocks,
+                imu,
+                catalog_path,
+                envelopes,
+                channels,
+                manifest.entry(benji_path.name),
+            )
+            for benji_path in benji_files
+        ],
+        jobs,
+        logger,
+        _progress_steps(progress_callback, total),
+        _record_result(manifest, catalog_path, benji_files),
+    )
+    return [csv_path for csv_path, _, _ in results if csv_path is not None]
 
 
 def read_csv_file(csv_path: str | Path, max_samples: int | None = None) -> tuple[list[str], list[list[str]]]:
@@ -214,69 +742,144 @@ def is_synthetic_csv_column(header_name: str) -> bool:
     return not normalized or normalized == "sample" or normalized.startswith("unnamed:")
 
 
+def infer_sample_rate_from_timestamps(
+    timestamps: np.ndarray,
+    default_freq: int = 500,
+    max_deltas: int | None = None,
+) -> tuple[int, float | None, float | None]:
+    """``(freq, mean dt, median dt)`` for a timestamp column, see ``analyze_timebase``."""
+    return analyze_timebase(timestamps, max_deltas=max_deltas).sample_rate(default_freq)
+
+
 def infer_sample_rate(
     header: list[str],
     data: list[list[str]],
     default_freq: int = 500,
-    max_deltas: int = 1000,
+    max_deltas: int | None = None,
 ) -> tuple[int, int | None, float | None, float | None]:
     header_map = {column.strip().lower(): index for index, column in enumerate(header)} if header else {}
     time_index = header_map.get("ts")
     if time_index is None:
         return default_freq, None, None, None
 
-    timestamps: list[float] = []
-    deltas: list[float] = []
-    previous_timestamp: float | None = None
+    timestamps = parse_float_cells([row[time_index] if time_index < len(row) else "" for row in data])
+    freq, representative_delta, median_delta = infer_sample_rate_from_timestamps(
+        timestamps[~np.isnan(timestamps)],
+        default_freq=default_freq,
+        max_deltas=max_deltas,
+    )
+    return freq, time_index, representative_delta, median_delta
 
-    for row in data:
-        try:
-            current_timestamp = float(row[time_index])
-        except (IndexError, ValueError):
-            continue
 
-        timestamps.append(current_timestamp)
-        if previous_timestamp is not None:
-            delta = current_timestamp - previous_timestamp
-            if delta > 0 and len(deltas) < max_deltas:
-                deltas.append(delta)
-        previous_timestamp = current_timestamp
+def _find_time_name(names) -> str | None:
+    return next((name for name in names if name.strip().lower() == "ts"), None)
 
-    if len(timestamps) < 2 or not deltas:
-        return default_freq, time_index, None, None
 
-    total_duration = timestamps[-1] - timestamps[0]
-    if total_duration <= 0:
-        return default_freq, time_index, None, None
+def _find_time_column(columns: dict[str, np.ndarray]) -> np.ndarray | None:
+    name = _find_time_name(columns)
+    return None if name is None else columns[name]
 
-    representative_delta = total_duration / (len(timestamps) - 1)
-    median_delta = median(deltas)
-    inferred_freq = max(1, int(round(1.0 / representative_delta)))
-    return inferred_freq, time_index, representative_delta, median_delta
 
+def channel_interpolations(devices: list[device_data]) -> dict[str, str]:
+    """How each device is re-timed onto a uniform grid, from the calibration table."""
+    return {device.name: device.interpolation for device in devices}
 
-def convert_csv_file_to_motec(
-    csv_path: str | Path,
-    ld_path: str | Path,
-    max_samples: int | None = None,
-    logger: LogCallback | None = None,
-) -> Path:
-    csv_path = Path(csv_path)
-    ld_path = Path(ld_path)
-    ld_path.parent.mkdir(parents=True, exist_ok=True)
 
-    _emit_log(logger, f"CSV -> LD: {csv_path.name}")
+def _count_changes(values: np.ndarray) -> int:
+    previous, current = values[:-1], values[1:]
+    same = previous == current
+    if values.dtype.kind == "f":
+        same |= np.isnan(previous) & np.isnan(current)
+    return int(len(same) - np.count_nonzero(same))
 
-    header, data = read_csv_file(csv_path, max_samples)
-    header = [column.strip() for column in header]
-    header_map = {column.lower(): index for index, column in enumerate(header)} if header else {}
 
-    device_names = [column for column in header if not is_synthetic_csv_column(column)]
-    devices = create_devices(device_names, [4] * len(device_names))
-    configure_devices(devices)
-    channel_definitions = generate_channel_list(devices)
+def _differs(previous, current) -> bool:
+    return bool(previous != current) and not (previous != previous and current != current)
+
+
+class NativeRateTracker:
+    """
+    Block-by-block form of ``detect_native_rate``. Feed a channel's blocks in order to
+    ``update``; ``rate`` then gives the same answer as ``detect_native_rate`` on the whole column.
+    """
+
+    def __init__(self, freq: int, rate_steps: tuple[int, ...] = NATIVE_RATE_STEPS):
+        self.freq = freq
+        self.count = 0
+        self.changes = 0
+        self._last = None
+        # Decimation step -> [value changes seen in values[::step], last value picked].
+        self._picked = {
+            freq // rate: [0, None] for rate in sorted(rate_steps) if rate < freq and not freq % rate
+        }
 
-    freq, _, representative_delta, median_delta = infer_sample_rate(header, data)
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values)
+        if not len(values):
+            return
+
+        self.changes += _count_changes(values)
+        if self._last is not None:
+            self.changes += _differs(self._last, values[0])
+
+        for step, picked in self._picked.items():
+            # values[::step] of the whole column, continued from the previous block.
+            picks = values[(-self.count) % step :: step]
+            if not len(picks):
+                continue
+            picked[0] += _count_changes(picks)
+            if picked[1] is not None:
+                picked[0] += _differs(picked[1], picks[0])
+            picked[1] = picks[-1]
+
+        self._last = values[-1]
+        self.count += len(values)
+
+    @property
+    def rate(self) -> int:
+        if self.count < 2:
+            return self.freq
+        for step, (changes, _) in self._picked.items():
+            if changes == self.changes:
+                return self.freq // step
+        return self.freq
+
+
+def detect_native_rate(values: np.ndarray, freq: int, rate_steps: tuple[int, ...] = NATIVE_RATE_STEPS) -> int:
+    """
+    Lowest rate from ``rate_steps`` (dividing ``freq``) at which ``values`` loses no update.
+
+    CAN values are held by the logger between updates, so a channel that only changes every
+    ``k`` records can be stored as ``values[::k]``. A rate is accepted when the decimated
+    channel still shows every value change of the full-rate one, so each update is kept and
+    lands at most one output sample late. Channels that change every record stay at ``freq``.
+    """
+    tracker = NativeRateTracker(freq, rate_steps)
+    tracker.update(values)
+    return tracker.rate
+
+
+def compact_channel_encodings(
+    devices: list[device_data],
+    max_error: float | None = None,
+) -> dict[str, ChannelEncoding]:
+    """
+    Error bounds for compact LD encoding. Without an explicit ``max_error`` each channel may be off
+    by half of its calibration resolution, i.e. the encoding is as exact as the sensor. Channels
+    with no fixed resolution and no explicit bound stay float32.
+    """
+    encodings: dict[str, ChannelEncoding] = {}
+    for device in devices:
+        resolution = getattr(device.conversion_factor, "resolution", None)
+        bound = max_error if max_error is not None else (resolution / 2 if resolution else None)
+        if bound is not None:
+            encodings[device.name] = ChannelEncoding(max_error=bound, resolution=resolution)
+    return encodings
+
+
+def _log_timebase(logger: LogCallback | None, report: TimebaseReport | None) -> int:
+    """Log the sample rate and timestamp quality of ``report`` (None: no TS column); returns the rate."""
+    freq, representative_delta, median_delta = (500, None, None) if report is None else report.sample_rate()
     if representative_delta is None:
         _emit_log(logger, f"Using default sample rate: {freq} Hz")
     else:
@@ -285,7 +888,17 @@ def convert_csv_file_to_motec(
             "Sample rate: "
             f"{freq} Hz (average dt {representative_delta:.9f} s, median dt {median_delta:.9f} s)",
         )
+    if report is not None:
+        for line in report.summary():
+            _emit_log(logger, line)
+    return freq
 
+
+def _log_resampled(logger: LogCallback | None, raw_count: int, grid_count: int, freq: int) -> None:
+    _emit_log(logger, f"Resampled {raw_count} samples onto a uniform {freq} Hz grid ({grid_count} samples)")
+
+
+def _new_motec_log(channel_count: int) -> MotecLog:
     log = MotecLog()
     now = datetime.now()
     log.date = now.strftime("%d/%m/%Y")
@@ -298,52 +911,612 @@ def convert_csv_file_to_motec(
         {
             "name": "Full Data Session",
             "session": "All Channels from devices.py",
-            "comment": f"All {len(channel_definitions)} channels with decplaces=0",
+            "comment": f"All {channel_count} channels",
             "venuepos": 0,
         }
     )
-
-    channel_indexes: list[tuple[int, str]] = []
-    for index, (csv_name, display_name, short_name, units) in enumerate(channel_definitions):
-        channel = MotecChannel(
-            {
-                "name": display_name,
-                "shortname": short_name[:8],
-                "units": units,
-                "id": 8000 + index,
-                "freq": freq,
-                "shift": 0,
-                "multiplier": 1,
-                "scale": 1,
-                "decplaces": 0,
-                "datatype": 0x07,
-                "datasize": 4,
-            }
+    return log
+
+
+def _channel_definition(index: int, display_name: str, short_name: str, units: str, freq: int) -> dict:
+    return {
+        "name": display_name,
+        "shortname": short_name[:8],
+        "units": units,
+        "id": 8000 + index,
+        "freq": freq,
+        "shift": 0,
+        "multiplier": 1,
+        "scale": 1,
+        "decplaces": 0,
+        "datatype": 0x07,
+        "datasize": 4,
+    }
+
+
+def _log_channel_encoding(
+    logger: LogCallback | None,
+    column_name: str,
+    type_name: str,
+    error: float,
+    encoding: ChannelEncoding,
+    units: str,
+) -> None:
+    exceeded = "" if within_error_bound(error, encoding.max_error) else " (exceeds bound)"
+    _emit_log(logger, f"  {column_name}: {type_name}, max error {error:.3g} {units}{exceeded}")
+
+
+def _log_storage_summary(
+    logger: LogCallback | None,
+    log: MotecLog,
+    freq: int,
+    full_rate_samples: int,
+    decimated_channels: int | None,
+    float32_bytes: int | None,
+) -> None:
+    if decimated_channels is not None:
+        stored_samples = sum(channel.samples.numsamples for channel in log.channels)
+        _emit_log(
+            logger,
+            f"Native rates: {decimated_channels} of {log.numchannels} channels below {freq} Hz, "
+            f"{full_rate_samples - stored_samples} samples dropped",
         )
-        log.add_channel(channel)
 
-        resolved_index = header_map.get(csv_name.strip().lower())
-        if resolved_index is None:
-            log.channels.pop()
-            log.numchannels = len(log.channels)
-            _emit_log(logger, f"Skipping channel missing from CSV header: {csv_name}")
+    if float32_bytes is not None:
+        data_bytes = sum(channel.samples.numsamples * channel.samples.datasize for channel in log.channels)
+        saved = float32_bytes - data_bytes
+        percent = 100.0 * saved / float32_bytes if float32_bytes else 0.0
+        _emit_log(logger, f"Compact encoding saved {saved / 1024:.1f} KiB ({percent:.0f}% of float32 data)")
+
+
+def write_channels_to_motec(
+    channel_definitions: list[tuple[str, str, str, str]],
+    columns: dict[str, np.ndarray],
+    ld_path: str | Path,
+    max_samples: int | None = None,
+    logger: LogCallback | None = None,
+    encodings: dict[str, ChannelEncoding] | None = None,
+    native_rates: bool = False,
+    resample: bool = False,
+    interpolations: dict[str, str] | None = None,
+) -> Path:
+    """
+    Write columnar channel data to a MoTeC .ld file.
+    ``columns`` is keyed by the first element of each channel definition; definitions without a
+    column are skipped. Channels listed in ``encodings`` are stored in the smallest datatype that
+    meets their error bound, the rest as float32. With ``native_rates`` slow (held) channels are
+    decimated to the rate they actually update at, see ``detect_native_rate``. With ``resample``
+    every column is first re-timed onto a uniform grid at the detected rate (``Resampler``,
+    per-channel ``interpolations``), so i2's fixed-rate time axis matches the timestamps.
+    """
+    ld_path = Path(ld_path)
+    ld_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if max_samples is not None:
+        columns = {name: values[:max_samples] for name, values in columns.items()}
+    column_map = {name.strip().lower(): values for name, values in columns.items()}
+
+    time_column = _find_time_column(columns)
+    freq = _log_timebase(logger, None if time_column is None else analyze_timebase(time_column))
+    if resample and time_column is not None:
+        columns = resample_columns(columns, _find_time_name(columns), freq, interpolations)
+        column_map = {name.strip().lower(): values for name, values in columns.items()}
+        _log_resampled(logger, len(time_column), len(_find_time_column(columns)), freq)
+
+    log = _new_motec_log(len(channel_definitions))
+    encodings = encodings or {}
+    sample_count = 0
+    float32_bytes = 0
+    full_rate_samples = 0
+    decimated_channels = 0
+    for index, (column_name, display_name, short_name, units) in enumerate(channel_definitions):
+        values = column_map.get(column_name.strip().lower())
+        if values is None:
+            _emit_log(logger, f"Skipping channel with no data: {column_name}")
             continue
 
-        channel_indexes.append((resolved_index, csv_name))
-
-    for row in data:
-        samples: list[float] = []
-        for column_index, _ in channel_indexes:
-            try:
-                value_str = row[column_index]
-                value = 0.0 if value_str in {"", "None"} else float(value_str)
-            except (IndexError, ValueError):
-                value = 0.0
-            samples.append(value)
-        log.add_samples(samples)
-
-    ld_path.write_bytes(log.to_string())
-    _emit_log(logger, f"LD written: {ld_path} ({len(data)} samples, {len(channel_indexes)} channels)")
+        sample_count = len(values)
+        full_rate_samples += len(values)
+        channel_freq = freq
+        if native_rates:
+            channel_freq = detect_native_rate(values, freq)
+            if channel_freq != freq:
+                values = values[:: freq // channel_freq]
+                decimated_channels += 1
+                _emit_log(logger, f"  {column_name}: {channel_freq} Hz native rate")
+
+        definition = _channel_definition(index, display_name, short_name, units, channel_freq)
+        encoding = encodings.get(column_name)
+        if encoding is None:
+            log.add_channel_data(definition, values)
+        else:
+            channel = log.add_compact_channel_data(definition, values, encoding.max_error, encoding.resolution)
+            _log_channel_encoding(
+                logger, column_name, channel.samples.type_name, channel.quantization_error, encoding, units
+            )
+        float32_bytes += len(values) * 4
+
+    _log_storage_summary(
+        logger,
+        log,
+        freq,
+        full_rate_samples,
+        decimated_channels if native_rates else None,
+        float32_bytes if encodings else None,
+    )
+
+    log.write(ld_path)
+    _emit_log(logger, f"LD written: {ld_path} ({sample_count} samples, {log.numchannels} channels)")
+    return ld_path
+
+
+class ChannelSummary:
+    """
+    Value range and native update rate of one channel, gathered block by block. With a
+    ``resolution`` it also tracks how far the values sit from that resolution's grid, so a
+    tighter ``max_error`` can still keep the sensor step when the data is exactly on it.
+    """
+
+    def __init__(self, freq: int, resolution: float | None = None):
+        self.count = 0
+        self.minimum: float | None = None
+        self.maximum: float | None = None
+        self.resolution = resolution
+        self.resolution_error = 0.0 if resolution else None
+        self.rate = NativeRateTracker(freq)
+
+    def update(self, values: np.ndarray) -> None:
+        if not len(values):
+            return
+        low, high = float(np.min(values)), float(np.max(values))
+        self.minimum = low if self.minimum is None else min(self.minimum, low)
+        self.maximum = high if self.maximum is None else max(self.maximum, high)
+        # min/max drop NaN depending on argument order, keep it sticky instead.
+        if np.isnan(low) or np.isnan(high):
+            self.minimum = self.maximum = float("nan")
+        if self.resolution:
+            grid = np.rint(values / self.resolution) * self.resolution
+            self.resolution_error = max(self.resolution_error, float(np.max(np.abs(values - grid))))
+        self.count += len(values)
+        self.rate.update(values)
+
+
+class MotecBlockWriter:
+    """
+    Streaming LD sink. The channel list, rates and encodings are fixed up front from one
+    ``ChannelSummary`` per column (a first pass over the data), then ``write`` pushes each block
+    of columns straight to its channels' data blocks in the file, see ``MotecStreamWriter``.
+    Integer encodings are chosen from each channel's value range (``compact_range_encoding``);
+    the error actually reached is measured as the blocks are written. With a ``resampler``
+    each block is re-timed before it is written; ``sample_count`` then counts grid samples.
+    """
+
+    def __init__(
+        self,
+        ld_path: str | Path,
+        channel_definitions: list[tuple[str, str, str, str]],
+        summaries: dict[str, ChannelSummary],
+        sample_count: int,
+        freq: int,
+        logger: LogCallback | None = None,
+        encodings: dict[str, ChannelEncoding] | None = None,
+        native_rates: bool = False,
+        resampler: Resampler | None = None,
+    ):
+        self.ld_path = Path(ld_path)
+        self.ld_path.parent.mkdir(parents=True, exist_ok=True)
+        self.sample_count = sample_count
+        self.freq = freq
+        self.logger = logger
+        self.encodings = encodings or {}
+        self.native_rates = native_rates
+        self.resampler = resampler
+        self.written = 0
+
+        summary_map = {name.strip().lower(): (name, summary) for name, summary in summaries.items()}
+        self.log = _new_motec_log(len(channel_definitions))
+        # (column name, decimation step, error so far, definition) for every channel in the log
+        self._channels: list[list] = []
+        self._decimated = 0
+        for index, (column_name, display_name, short_name, units) in enumerate(channel_definitions):
+            found = summary_map.get(column_name.strip().lower())
+            if found is None:
+                _emit_log(logger, f"Skipping channel with no data: {column_name}")
+                continue
+            name, summary = found
+
+            channel_freq = freq
+            if native_rates and summary.rate.rate != freq:
+                channel_freq = summary.rate.rate
+                self._decimated += 1
+                _emit_log(logger, f"  {column_name}: {channel_freq} Hz native rate")
+            step = freq // channel_freq
+
+            definition = _channel_definition(index, display_name, short_name, units, channel_freq)
+            encoding = self.encodings.get(column_name)
+            if encoding is not None:
+                fields, _ = compact_range_encoding(
+                    summary.minimum,
+                    summary.maximum,
+                    encoding.max_error,
+                    encoding.resolution,
+                    summary.resolution_error,
+                )
+                definition.update(fields)
+            channel = MotecChannel(definition)
+            channel.samples.rounding = encoding is not None
+            channel.samples.reserve(len(range(0, sample_count, step)))
+            self.log.add_channel(channel)
+            self._channels.append([name, step, 0.0, (column_name, units, encoding)])
+
+        self._writer = MotecStreamWriter(self.log, self.ld_path)
+
+    def write(self, columns: dict[str, np.ndarray]) -> None:
+        remaining = self.sample_count - self.written
+        if remaining <= 0 or not columns:
+            return
+        if self.resampler is not None:
+            columns = self.resampler.update(columns)
+
+        block_length = 0
+        for index, entry in enumerate(self._channels):
+            name, step, error, (_, _, encoding) = entry
+            values = np.asarray(columns[name][:remaining])
+            block_length = len(values)
+            picks = values[(-self.written) % step :: step]
+            encoded = self._writer.write(index, picks)
+            if encoding is not None and len(picks):
+                decoded = self.log.channels[index].samples.decode(encoded)
+                entry[2] = max(error, float(np.max(np.abs(decoded - picks))))
+        self.written += block_length
+
+    def close(self) -> None:
+        self._writer.close()
+        float32_bytes = 0
+        for channel, (_, _, error, (column_name, units, encoding)) in zip(self.log.channels, self._channels):
+            float32_bytes += channel.samples.numsamples * 4
+            if encoding is not None:
+                _log_channel_encoding(self.logger, column_name, channel.samples.type_name, error, encoding, units)
+
+        _log_storage_summary(
+            self.logger,
+            self.log,
+            self.freq,
+            self.sample_count * self.log.numchannels,
+            self._decimated if self.native_rates else None,
+            float32_bytes if self.encodings else None,
+        )
+        _emit_log(
+            self.logger,
+            f"LD written: {self.ld_path} ({self.sample_count} samples, {self.log.numchannels} channels)",
+        )
+
+    def __enter__(self) -> MotecBlockWriter:
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def abort(self) -> None:
+        self._writer.abort()
+
+
+def stream_benji2_file(
+    benji_path: str | Path,
+    ld_path: str | Path | None,
+    csv_path: str | Path | None = None,
+    chunk_records: int = DEFAULT_CHUNK_RECORDS,
+    max_samples: int | None = None,
+    logger: LogCallback | None = None,
+    compact: bool = True,
+    max_error: float | None = None,
+    native_rates: bool = True,
+    resample: bool = False,
+    shocks: ShockSettings | None = DEFAULT_SHOCK_SETTINGS,
+    imu: ImuSettings | None = DEFAULT_IMU_SETTINGS,
+    extra_sinks: list[RunStatistics | EnvelopeWriter] | None = None,
+) -> int:
+    """
+    Convert one BENJI2 file to .ld and/or CSV (either path may be None) holding at most
+    ``chunk_records`` decoded records at a time, however long the log. The file is mapped, not
+    read, so for the LD the payload is walked in blocks up to three times: the timestamps for the
+    sample rate, every channel for its range and native rate (skipped when neither ``compact``
+    nor ``native_rates`` needs them), then decode -> derived channels -> CSV/LD sinks. With
+    ``resample`` the LD (not the CSV) is re-timed onto a uniform grid on the way, see
+    ``write_channels_to_motec``. ``extra_sinks`` see the same blocks as the CSV and are closed
+    with it. Returns the number of CSV rows written.
+    """
+    if chunk_records < 1:
+        raise ValueError(f"chunk_records must be at least 1, got {chunk_records}")
+    with Benji2File(benji_path) as benji_file:
+        stages = _derived_stages(benji_file.devices, shocks, imu)
+        header, devices = _with_derived(benji_file.header, benji_file.devices, stages)
+        sinks: list[CsvBlockWriter | MotecBlockWriter | RunStatistics | EnvelopeWriter] = []
+        try:
+            if csv_path is not None:
+                sinks.append(CsvBlockWriter(csv_path, header, devices))
+            if ld_path is not None:
+                sinks.append(
+                    _motec_block_writer(
+                        benji_file,
+                        ld_path,
+                        chunk_records,
+                        max_samples,
+                        logger,
+                        compact,
+                        max_error,
+                        native_rates,
+                        resample,
+                        shocks,
+                        imu,
+                    )
+                )
+            sinks.extend(extra_sinks or [])
+            for block in _derived_blocks(benji_file.iter_columns(chunk_records), stages):
+                for sink in sinks:
+                    sink.write(block)
+        except BaseException:
+            for sink in sinks:
+                sink.abort()
+            raise
+
+        for sink in sinks:
+            sink.close()
+        return sinks[0].rows if csv_path is not None else 0
+
+
+def _motec_block_writer(
+    benji_file: Benji2File,
+    ld_path: str | Path,
+    chunk_records: int,
+    max_samples: int | None,
+    logger: LogCallback | None,
+    compact: bool,
+    max_error: float | None,
+    native_rates: bool,
+    resample: bool = False,
+    shocks: ShockSettings | None = None,
+    imu: ImuSettings | None = None,
+) -> MotecBlockWriter:
+    """Run the sample rate and channel summary passes over ``benji_file`` and open the LD sink."""
+    stages = _derived_stages(benji_file.devices, shocks, imu)
+    _, devices = _with_derived(benji_file.header, benji_file.devices, stages)
+    record_count = benji_file.record_count
+    sample_count = record_count if max_samples is None else min(max_samples, record_count)
+
+    timebase = TimebaseTracker()
+    time_name = _find_time_name(benji_file.channel_names)
+    if time_name is not None:
+        for block in benji_file.iter_columns(chunk_records, names=[time_name]):
+            timebase.update(block[time_name][: sample_count - timebase.count])
+            if timebase.count >= sample_count:
+                break
+    report = timebase.report() if time_name is not None else None
+    freq = _log_timebase(logger, report)
+
+    def new_resampler() -> Resampler | None:
+        if not resample or report is None:
+            return None
+        return Resampler(time_name, freq, channel_interpolations(devices))
+
+    resampler = new_resampler()
+    raw_count = sample_count
+    if resampler is not None:
+        sample_count = grid_length(timebase.start, timebase.end, freq) if timebase.end is not None else 0
+        _log_resampled(logger, raw_count, sample_count, freq)
+
+    encodings = compact_channel_encodings(devices, max_error) if compact else {}
+    summaries = {
+        name: ChannelSummary(freq, encodings[name].resolution if name in encodings else None)
+        for name in benji_file.channel_names + [device.name for device in devices[len(benji_file.devices) :]]
+    }
+    if compact or native_rates:
+        seen = 0
+        blocks = benji_file.iter_columns(chunk_records)
+        for block in _derived_blocks(blocks, _derived_stages(benji_file.devices, shocks, imu)):
+            block = {name: values[: raw_count - seen] for name, values in block.items()}
+            seen += len(next(iter(block.values())))
+            if resampler is not None:
+                block = resampler.update(block)
+            for name, values in block.items():
+                summaries[name].update(values)
+            if seen >= raw_count:
+                break
+
+    return MotecBlockWriter(
+        ld_path,
+        generate_channel_list(devices),
+        summaries,
+        sample_count,
+        freq,
+        logger=logger,
+        encodings=encodings,
+        native_rates=native_rates,
+        resampler=new_resampler(),
+    )
+
+
+def _open_follow_ld(
+    ld_path: str | Path,
+    devices: list[device_data],
+    first_block: dict[str, np.ndarray],
+    capacity: int,
+    logger: LogCallback | None,
+) -> tuple[MotecAppendWriter, list[str]]:
+    """LD writer for follow mode, with the sample rate taken from the first block's timestamps."""
+    time_column = _find_time_column(first_block)
+    freq = _log_timebase(logger, None if time_column is None else analyze_timebase(time_column))
+
+    channel_definitions = generate_channel_list(devices)
+    log = _new_motec_log(len(channel_definitions))
+    names: list[str] = []
+    for index, (column_name, display_name, short_name, units) in enumerate(channel_definitions):
+        if column_name in first_block:
+            log.add_channel(_channel_definition(index, display_name, short_name, units, freq))
+            names.append(column_name)
+
+    ld_path = Path(ld_path)
+    ld_path.parent.mkdir(parents=True, exist_ok=True)
+    return MotecAppendWriter(log, ld_path, capacity=capacity), names
+
+
+def follow_benji2_file(
+    benji_path: str | Path,
+    csv_path: str | Path | None = None,
+    ld_path: str | Path | None = None,
+    poll_interval: float = 0.2,
+    idle_timeout: float | None = None,
+    stop: Callable[[], bool] | None = None,
+    logger: LogCallback | None = None,
+    on_block: Callable[[dict[str, np.ndarray]], None] | None = None,
+    chunk_records: int = DEFAULT_CHUNK_RECORDS,
+    ld_capacity: int = DEFAULT_CHUNK_RECORDS,
+    derived: bool = False,
+    shocks: ShockSettings | None = DEFAULT_SHOCK_SETTINGS,
+    imu: ImuSettings | None = DEFAULT_IMU_SETTINGS,
+) -> int:
+    """
+    Convert a BENJI2 file that is still being written, as it grows.
+
+    Every ``poll_interval`` seconds the complete records appended since the last poll are
+    decoded (at most ``chunk_records`` at a time) and appended to the CSV and/or LD output, so
+    the work per poll only depends on the new data. Both outputs stay readable throughout: the
+    CSV is flushed after each block and the LD keeps its sample counts current (see
+    ``MotecAppendWriter``; channels are float32 at the logger rate, as ranges and native rates
+    are not known up front). ``on_block`` gets every decoded block, e.g. for a live display.
+    Only the logged channels are written unless ``derived`` is set: the derived channels (see
+    ``derive_decoded_channels``) hold back the first records until their static calibration is
+    known, which delays all output by several seconds at the start of the log.
+
+    Runs until ``stop()`` returns True, no new record arrived for ``idle_timeout`` seconds, or
+    the caller interrupts it. Returns the number of records converted.
+    """
+    if chunk_records < 1:
+        raise ValueError(f"chunk_records must be at least 1, got {chunk_records}")
+    benji_path = Path(benji_path)
+    csv_writer: CsvBlockWriter | None = None
+    ld_writer: MotecAppendWriter | None = None
+    ld_names: list[str] = []
+    stages: list[DerivedStage] = []
+    first_block = True
+    last_data = time.monotonic()
+    last_report = last_data
+
+    def emit(block: dict[str, np.ndarray]) -> None:
+        nonlocal csv_writer, ld_writer, ld_names
+        if not row_count(block):
+            return
+        header, devices = _with_derived(tail.header, tail.devices, stages)
+        if csv_path is not None:
+            if csv_writer is None:
+                csv_writer = CsvBlockWriter(csv_path, header, devices, atomic=False)
+            csv_writer.write(block)
+            csv_writer.flush()
+        if ld_path is not None:
+            if ld_writer is None:
+                ld_writer, ld_names = _open_follow_ld(ld_path, devices, block, ld_capacity, logger)
+            ld_writer.append([block[name] for name in ld_names])
+        if on_block is not None:
+            on_block(block)
+
+    _emit_log(logger, f"Following {benji_path} (poll every {poll_interval:g} s)")
+    with Benji2Tail(benji_path) as tail:
+        try:
+            while not (stop is not None and stop()):
+                block = tail.poll(max_records=chunk_records)
+                now = time.monotonic()
+                if block is None:
+                    if idle_timeout is not None and now - last_data >= idle_timeout:
+                        _emit_log(logger, f"No new records for {idle_timeout:g} s, stopping")
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                last_data = now
+
+                if first_block:
+                    stages = _derived_stages(tail.devices, shocks, imu) if derived else []
+                    first_block = False
+                emit(_through_stages(block, stages))
+
+                if now - last_report >= 5.0:
+                    _emit_log(logger, f"{tail.records_read} records")
+                    last_report = now
+        finally:
+            # Records the derived-channel stages are still holding back belong in the outputs too.
+            for block in _finish_stages(stages):
+                emit(block)
+            if csv_writer is not None:
+                csv_writer.close()
+            if ld_writer is not None:
+                ld_writer.close()
+
+        _emit_log(logger, f"Stopped following {benji_path.name} after {tail.records_read} records")
+        return tail.records_read
+
+
+def convert_csv_file_to_motec(
+    csv_path: str | Path,
+    ld_path: str | Path,
+    max_samples: int | None = None,
+    logger: LogCallback | None = None,
+    compact: bool = True,
+    max_error: float | None = None,
+    native_rates: bool = True,
+    resample: bool = False,
+) -> Path:
+    csv_path = Path(csv_path)
+
+    _emit_log(logger, f"CSV -> LD: {csv_path.name}")
+
+    header = [column.strip() for column in read_csv_header(csv_path)]
+    header_map = {column.lower(): index for index, column in enumerate(header)} if header else {}
+
+    device_names = [column for column in header if not is_synthetic_csv_column(column)]
+    devices = create_devices(device_names, [4] * len(device_names))
+    configure_devices(devices)
+    # Derived channels written by the BENJI2 conversion keep their names and units.
+    derived = {
+        device.name: device for device in shock_devices(devices) + imu_devices(devices) + filter_devices(devices)
+    }
+    devices = [derived.get(device.name, device) for device in devices]
+    channel_definitions = generate_channel_list(devices)
+
+    mapped = [
+        (csv_name, header_map[csv_name.strip().lower()])
+        for csv_name, _, _, _ in channel_definitions
+        if csv_name.strip().lower() in header_map
+    ]
+    values = read_csv_columns(csv_path, [column_index for _, column_index in mapped], max_samples)
+    # Empty, "None" and unparseable cells are written as 0.
+    columns = {
+        csv_name: np.where(np.isnan(column), 0.0, column) for (csv_name, _), column in zip(mapped, values)
+    }
+
+    encodings = compact_channel_encodings(devices, max_error) if compact else None
+    return write_channels_to_motec(
+        channel_definitions,
+        columns,
+        ld_path,
+        logger=logger,
+        encodings=encodings,
+        native_rates=native_rates,
+        resample=resample,
+        interpolations=channel_interpolations(devices),
+    )
+
+
+def _csv_to_motec_task(
+    csv_path: Path,
+    ld_path: Path,
+    options: dict[str, Any],
+    logger: LogCallback,
+    step: StepCallback,
+) -> Path:
+    convert_csv_file_to_motec(csv_path, ld_path, logger=logger, **options)
+    step(f"LD complete: {csv_path.name}")
     return ld_path
 
 
@@ -353,23 +1526,318 @@ def convert_csv_inputs_to_motec(
     max_samples: int | None = None,
     logger: LogCallback | None = None,
     progress_callback: ProgressCallback | None = None,
+    compact: bool = True,
+    max_error: float | None = None,
+    native_rates: bool = True,
+    jobs: int | None = 1,
+    resample: bool = False,
 ) -> list[Path]:
     csv_files = collect_files(input_path, ".csv")
     ld_output_dir = Path(ld_output_dir)
     ld_output_dir.mkdir(parents=True, exist_ok=True)
 
-    outputs: list[Path] = []
     total = len(csv_files)
-
     _emit_progress(progress_callback, 0, total, "Starting CSV -> LD conversion")
 
-    for index, csv_path in enumerate(csv_files, start=1):
-        ld_path = ld_output_dir / f"{csv_path.stem}.ld"
-        convert_csv_file_to_motec(csv_path, ld_path, max_samples=max_samples, logger=logger)
-        outputs.append(ld_path)
-        _emit_progress(progress_callback, index, total, f"LD complete: {csv_path.name}")
+    options = {
+        "max_samples": max_samples,
+        "compact": compact,
+        "max_error": max_error,
+        "native_rates": native_rates,
+        "resample": resample,
+    }
+    return _run_tasks(
+        _csv_to_motec_task,
+        [(csv_path, ld_output_dir / f"{csv_path.stem}.ld", options) for csv_path in csv_files],
+        jobs,
+        logger,
+        _progress_steps(progress_callback, total),
+    )
 
-    return outputs
+
+def _convert_benji2_decoded(
+    benji_path: Path,
+    csv_path: Path | None,
+    ld_path: Path | None,
+    options: dict[str, Any],
+    logger: LogCallback,
+    step: StepCallback,
+    extra_sinks: list[RunStatistics | EnvelopeWriter] | None = None,
+) -> None:
+    decoded = derive_decoded_channels(
+        decode_benji2_file(benji_path, jobs=options["decode_jobs"]), options["shocks"], options["imu"]
+    )
+    _write_whole_log(extra_sinks, decoded.columns)
+    decoded = _exported(decoded, options["channels"], options["shocks"], options["imu"])
+
+    if csv_path is not None:
+        _emit_log(logger, f"BENJI2 -> CSV: {benji_path.name}")
+        written_rows = write_decoded_csv(decoded, csv_path)
+        _emit_log(logger, f"CSV written: {csv_path} ({written_rows} rows)")
+    step(f"{'CSV complete' if csv_path is not None else 'Decoded'}: {benji_path.name}")
+
+    if ld_path is not None:
+        _emit_log(logger, f"BENJI2 -> LD: {benji_path.name}")
+        write_channels_to_motec(
+            generate_channel_list(decoded.devices),
+            decoded.columns,
+            ld_path,
+            max_samples=options["max_samples"],
+            logger=logger,
+            encodings=compact_channel_encodings(decoded.devices, options["max_error"]) if options["compact"] else None,
+            native_rates=options["native_rates"],
+            resample=options["resample"],
+            interpolations=channel_interpolations(decoded.devices),
+        )
+    step(f"{'LD complete' if ld_path is not None else 'LD up to date'}: {benji_path.name}")
+
+
+def _convert_benji2_streamed(
+    benji_path: Path,
+    csv_path: Path | None,
+    ld_path: Path | None,
+    options: dict[str, Any],
+    logger: LogCallback,
+    step: StepCallback,
+    extra_sinks: list[RunStatistics | EnvelopeWriter] | None = None,
+) -> None:
+    outputs = " + ".join(name for name, path in (("CSV", csv_path), ("LD", ld_path)) if path is not None)
+    _emit_log(logger, f"BENJI2 -> {outputs} in blocks of {options['chunk_records']} records")
+    written_rows = stream_benji2_file(
+        benji_path,
+        ld_path,
+        csv_path=csv_path,
+        chunk_records=options["chunk_records"],
+        max_samples=options["max_samples"],
+        logger=logger,
+        compact=options["compact"],
+        max_error=options["max_error"],
+        native_rates=options["native_rates"],
+        resample=options["resample"],
+        shocks=options["shocks"],
+        imu=options["imu"],
+        extra_sinks=extra_sinks,
+    )
+
+    if csv_path is not None:
+        _emit_log(logger, f"CSV written: {csv_path} ({written_rows} rows)")
+    step(f"{'CSV complete' if csv_path is not None else 'Decoded'}: {benji_path.name}")
+    step(f"{'LD complete' if ld_path is not None else 'LD up to date'}: {benji_path.name}")
+
+
+def _open_catalog(output_dir: Path, catalog: str | Path | None) -> Path | None:
+    """Path of the run catalog (created if need be), or None for none."""
+    if catalog is None:
+        return None
+    catalog_path = output_dir / catalog
+    RunCatalog(catalog_path).close()
+    return catalog_path
+
+
+def _catalog_statistics(
+    catalog: Path | None,
+    run_path: Path,
+    source: dict[str, Any],
+    inputs: dict[str, Any],
+) -> RunStatistics | None:
+    """Statistics to gather for the catalog, or None when there is none or its row is current."""
+    if catalog is None:
+        return None
+    with RunCatalog(catalog) as run_catalog:
+        if run_catalog.is_current(run_path, source["sha256"], inputs):
+            return None
+    return RunStatistics()
+
+
+def _sidecar_pass(
+    benji_path: Path,
+    sinks: list[RunStatistics | EnvelopeWriter],
+    chunk_records: int | None,
+    shocks: ShockSettings | None,
+    imu: ImuSettings | None,
+    logger: LogCallback | None,
+) -> None:
+    """Feed the catalog statistics and/or envelope of a file whose outputs are already up to date."""
+    _emit_log(logger, f"Indexing {benji_path.name}")
+    stream_benji2_file(
+        benji_path,
+        None,
+        chunk_records=chunk_records or DEFAULT_CHUNK_RECORDS,
+        shocks=shocks,
+        imu=imu,
+        extra_sinks=sinks,
+    )
+
+
+def _write_whole_log(sinks: list[RunStatistics | EnvelopeWriter] | None, columns: dict[str, np.ndarray]) -> None:
+    """Write a whole decoded log to ``sinks`` as one block and close them."""
+    sinks = sinks or []
+    try:
+        for sink in sinks:
+            sink.write(columns)
+    except BaseException:
+        for sink in sinks:
+            sink.abort()
+        raise
+    for sink in sinks:
+        sink.close()
+
+
+def _write_catalog(catalog: Path | None, records: list[RunRecord | None]) -> None:
+    records = [record for record in records if record is not None]
+    if catalog is not None and records:
+        with RunCatalog(catalog) as run_catalog:
+            run_catalog.record(records)
+
+
+def _record_result(
+    manifest: ConversionManifest,
+    catalog: Path | None,
+    benji_files: list[Path],
+) -> Callable[[int, tuple[Any, dict[str, Any] | None, RunRecord | None]], None]:
+    """
+    ``_run_tasks`` callback saving each converted file's manifest entry and catalog row as soon as
+    it is done, so a file failing later in the batch does not lose them.
+    """
+
+    def record(index: int, result: tuple[Any, dict[str, Any] | None, RunRecord | None]) -> None:
+        _, entry, run = result
+        manifest.update(benji_files[index].name, entry)
+        manifest.save()
+        _write_catalog(catalog, [run])
+
+    return record
+
+
+def _calibration_digest(devices: list[device_data]) -> str:
+    """Fingerprint of how the stored channels of one file are decoded and calibrated."""
+    channels = {
+        device.name: {
+            "byte_size": device.byte_size,
+            "byte_order": device.byte_order,
+            "signed": device.signed,
+            "decimals": device.decimals,
+            "interpolation": device.interpolation,
+            "filter": None if device.channel_filter is None else device.channel_filter.to_dict(),
+            "calibration": (
+                device.conversion_factor.to_dict()
+                if hasattr(device.conversion_factor, "to_dict")
+                else repr(device.conversion_factor)
+            ),
+        }
+        for device in record_devices(devices)
+    }
+    return hashlib.sha256(json.dumps(channels, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _csv_stage_inputs(
+    calibration: str,
+    shocks: ShockSettings | None,
+    imu: ImuSettings | None,
+    channels: list[str] | None = None,
+) -> dict[str, Any]:
+    inputs = {
+        "converter": CONVERTER_VERSION,
+        "calibration": calibration,
+        "shocks": None if shocks is None else shocks.to_dict(),
+        "imu": None if imu is None else imu.to_dict(),
+    }
+    # Only recorded for a selection, so full conversions keep matching their manifest records.
+    if channels is not None:
+        inputs["channels"] = list(channels)
+    return inputs
+
+
+def _envelope_stage_inputs(csv_inputs: dict[str, Any]) -> dict[str, Any]:
+    # Built from the same channels as the CSV.
+    return dict(csv_inputs, envelope=ENVELOPE_VERSION, base_level=BASE_LEVEL)
+
+
+def _reusable_outputs(previous: dict[str, Any] | None, source: dict[str, Any]) -> dict[str, Any]:
+    """Records of outputs built from other content are dropped, they no longer describe this file."""
+    if previous and (previous.get("source") or {}).get("sha256") == source["sha256"]:
+        return dict(previous.get("outputs") or {})
+    return {}
+
+
+def _stage_inputs(calibration: str, options: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Everything each output stage depends on besides the input file itself."""
+    csv_inputs = _csv_stage_inputs(calibration, options["shocks"], options["imu"], options["channels"])
+    ld_inputs = dict(
+        csv_inputs,
+        max_samples=options["max_samples"],
+        compact=options["compact"],
+        max_error=options["max_error"],
+        native_rates=options["native_rates"],
+        resample=options["resample"],
+    )
+    return {"csv": csv_inputs, "ld": ld_inputs, "envelope": _envelope_stage_inputs(csv_inputs)}
+
+
+def _benji2_to_outputs_task(
+    benji_path: Path,
+    layout: OutputLayout,
+    label: str,
+    options: dict[str, Any],
+    previous: dict[str, Any] | None,
+    logger: LogCallback,
+    step: StepCallback,
+) -> tuple[ConversionArtifacts | None, dict[str, Any] | None, RunRecord | None]:
+    """
+    Convert one file, rebuilding only the outputs whose manifest record is stale. Returns the
+    artifacts, the file's new manifest entry and its new catalog row (None when current).
+    """
+    _emit_log(logger, f"{label} Processing {benji_path.name}")
+    csv_path = layout.csv_dir / f"{benji_path.stem}.csv" if options["write_csv"] else None
+    ld_path = layout.ld_dir / f"{benji_path.stem}.ld"
+
+    try:
+        with Benji2File(benji_path) as benji_file:
+            calibration = _calibration_digest(benji_file.devices)
+    except EmptyBenji2FileError as exc:
+        _emit_log(logger, str(exc))
+        step(f"Skipped empty file: {benji_path.name}", 2)
+        return None, None, None
+
+    source = source_state(benji_path, previous)
+    stage_inputs = _stage_inputs(calibration, options)
+    targets = {"csv": csv_path, "ld": ld_path, "envelope": envelope_path(ld_path) if options["envelopes"] else None}
+    stale = {
+        stage: path
+        for stage, path in targets.items()
+        if path is not None
+        and not (options["incremental"] and stage_is_current(previous, source, stage, stage_inputs[stage], path))
+    }
+
+    artifacts = ConversionArtifacts(benji_path=benji_path, csv_path=csv_path, ld_path=ld_path)
+    outputs = _reusable_outputs(previous, source)
+
+    # The statistics and the envelope follow the decoded and derived channels, i.e. what the CSV
+    # is built from, and ride along with whichever output is rebuilt.
+    statistics = _catalog_statistics(options["catalog"], ld_path, source, stage_inputs["csv"])
+    sidecars = [sink for sink in (statistics,) if sink is not None]
+    if "envelope" in stale:
+        sidecars.append(EnvelopeWriter(stale["envelope"]))
+    if not stale.keys() - {"envelope"}:
+        _emit_log(logger, f"Up to date: {benji_path.name}")
+        if sidecars:
+            _sidecar_pass(benji_path, sidecars, options["chunk_records"], options["shocks"], options["imu"], logger)
+        step(f"Up to date: {benji_path.name}", 2)
+    else:
+        for stage in targets.keys() - stale.keys():
+            if targets[stage] is not None:
+                _emit_log(logger, f"{stage.upper()} up to date: {targets[stage]}")
+
+        convert = _convert_benji2_decoded if options["chunk_records"] is None else _convert_benji2_streamed
+        convert(benji_path, stale.get("csv"), stale.get("ld"), options, logger, step, sidecars)
+
+        for stage, path in stale.items():
+            outputs[stage] = stage_record(path, stage_inputs[stage])
+
+    record = None
+    if statistics is not None:
+        record = statistics.record(ld_path, benji_path, csv_path, layout.session, source, stage_inputs["csv"])
+    return artifacts, {"source": source, "outputs": outputs}, record
 
 
 def convert_benji2_inputs_to_outputs(
@@ -378,58 +1846,133 @@ def convert_benji2_inputs_to_outputs(
     max_samples: int | None = None,
     logger: LogCallback | None = None,
     progress_callback: ProgressCallback | None = None,
+    write_csv: bool = True,
+    compact: bool = True,
+    max_error: float | None = None,
+    native_rates: bool = True,
+    jobs: int | None = 1,
+    chunk_records: int | None = None,
+    incremental: bool = True,
+    resample: bool = False,
+    shocks: ShockSettings | None = DEFAULT_SHOCK_SETTINGS,
+    imu: ImuSettings | None = DEFAULT_IMU_SETTINGS,
+    catalog: str | Path | None = CATALOG_NAME,
+    envelopes: bool = True,
+    channels: list[str] | None = None,
 ) -> tuple[OutputLayout, list[ConversionArtifacts]]:
+    """
+    Convert BENJI2 file(s) to MoTeC .ld, decoding each file once. The decoded arrays go straight
+    to the LD writer; the CSV is an optional second output fed from the same arrays. With
+    ``jobs`` other than 1 the files are converted in parallel worker processes (``None`` for one
+    per core but one); log and progress callbacks still arrive in file order on this thread.
+    When there are fewer files than jobs, the spare jobs decode each file in record ranges.
+    With ``chunk_records`` each file is streamed in blocks of that many records instead of being
+    decoded whole, so memory use does not grow with log length (see ``stream_benji2_file``).
+
+    A manifest in ``layout.root_dir`` records the content hash of every input and the settings
+    each output was built with. With ``incremental`` an output is only rebuilt when its input,
+    the calibration of that file's channels, its own settings or the converter changed, or when
+    it is missing or was not completely written.
+
+    With ``resample`` the LD channels are re-timed onto a uniform grid at the detected rate, so
+    logger jitter and dropped loops do not warp i2's time axis; the CSV keeps the raw records.
+
+    Both outputs get the derived channels, computed from the decoded arrays: shock displacement
+    and velocity per corner with ``shocks`` and the CG acceleration with ``imu`` (see
+    ``derive_decoded_channels``); None leaves them out. ``channels`` limits both outputs to those
+    channels, recorded or registered in ``default_registry`` (e.g. ``FRONT_SHOCK_VEL``), see
+    ``select_decoded_channels``; it needs whole-file decoding, so not with ``chunk_records``. The
+    catalog statistics and envelopes still cover every channel.
+
+    Every run gets a row in the SQLite run ``catalog`` (relative to ``output_dir``, so one catalog
+    covers every session converted there; None for none) with its duration, sample rate and
+    per-channel statistics, see ``RunCatalog``. With ``envelopes`` every .ld gets a ``.envelope``
+    sidecar of min/max/mean bins at power-of-two levels for fast plotting, see ``RunEnvelope``.
+    """
+    _check_selection(channels, chunk_records)
     benji_files = collect_files(input_path, ".benji2")
     layout = build_output_layout(output_dir, input_path)
-    layout.csv_dir.mkdir(parents=True, exist_ok=True)
+    if write_csv:
+        layout.csv_dir.mkdir(parents=True, exist_ok=True)
     layout.ld_dir.mkdir(parents=True, exist_ok=True)
 
     total_steps = len(benji_files) * 2
-    completed_steps = 0
-    results: list[ConversionArtifacts] = []
 
     _emit_log(logger, f"Output root: {layout.root_dir}")
-    _emit_log(logger, f"CSV output: {layout.csv_dir}")
+    if write_csv:
+        _emit_log(logger, f"CSV output: {layout.csv_dir}")
     _emit_log(logger, f"LD output: {layout.ld_dir}")
-    _emit_progress(progress_callback, completed_steps, total_steps, "Ready")
-
-    for index, benji_path in enumerate(benji_files, start=1):
-        _emit_log(logger, f"[{index}/{len(benji_files)}] Processing {benji_path.name}")
-
-        csv_path = layout.csv_dir / f"{benji_path.stem}.csv"
-        try:
-            convert_benji2_file_to_csv(benji_path, csv_path, logger=logger)
-        except EmptyBenji2FileError as exc:
-            _emit_log(logger, str(exc))
-            completed_steps += 2
-            _emit_progress(progress_callback, completed_steps, total_steps, f"Skipped empty file: {benji_path.name}")
-            continue
-        completed_steps += 1
-        _emit_progress(progress_callback, completed_steps, total_steps, f"CSV complete: {benji_path.name}")
-
-        ld_path = layout.ld_dir / f"{benji_path.stem}.ld"
-        convert_csv_file_to_motec(csv_path, ld_path, max_samples=max_samples, logger=logger)
-        completed_steps += 1
-        _emit_progress(progress_callback, completed_steps, total_steps, f"LD complete: {benji_path.name}")
-
-        results.append(ConversionArtifacts(benji_path=benji_path, csv_path=csv_path, ld_path=ld_path))
-
-    return layout, results
+    _emit_progress(progress_callback, 0, total_steps, "Ready")
+
+    manifest = ConversionManifest.load(layout.root_dir)
+    options = {
+        "catalog": _open_catalog(Path(output_dir), catalog),
+        "chunk_records": chunk_records,
+        "envelopes": envelopes,
+        "decode_jobs": max(1, resolve_jobs(jobs) // max(len(benji_files), 1)),
+        "incremental": incremental,
+        "max_samples": max_samples,
+        "write_csv": write_csv,
+        "compact": compact,
+        "max_error": max_error,
+        "native_rates": native_rates,
+        "resample": resample,
+        "shocks": shocks,
+        "imu": imu,
+        "channels": None if channels is None else list(channels),
+    }
+    results = _run_tasks(
+        _benji2_to_outputs_task,
+        [
+            (benji_path, layout, f"[{index}/{len(benji_files)}]", options, manifest.entry(benji_path.name))
+            for index, benji_path in enumerate(benji_files, start=1)
+        ],
+        jobs,
+        logger,
+        _progress_steps(progress_callback, total_steps),
+        _record_result(manifest, options["catalog"], benji_files),
+    )
+    return layout, [artifacts for artifacts, _, _ in results if artifacts is not None]
 
 
 __all__ = [
+    "ChannelEncoding",
+    "ChannelSummary",
     "ConversionArtifacts",
+    "CONVERTER_VERSION",
+    "CSV_FORMAT_ROWS",
+    "CsvBlockWriter",
+    "DEFAULT_CHUNK_RECORDS",
+    "DecodedBenji2",
     "EmptyBenji2FileError",
+    "MotecBlockWriter",
+    "NATIVE_RATE_STEPS",
+    "NativeRateTracker",
     "OutputLayout",
+    "TimebaseTracker",
     "build_output_layout",
+    "channel_interpolations",
     "collect_files",
+    "compact_channel_encodings",
     "convert_benji2_file_to_csv",
     "convert_benji2_inputs_to_csv",
     "convert_benji2_inputs_to_outputs",
     "convert_csv_file_to_motec",
     "convert_csv_inputs_to_motec",
+    "decode_benji2_file",
+    "decoded_run_channels",
+    "derive_decoded_channels",
+    "detect_native_rate",
     "filter_duplicate_headers",
+    "follow_benji2_file",
+    "format_csv_rows",
     "infer_sample_rate",
+    "infer_sample_rate_from_timestamps",
     "is_synthetic_csv_column",
     "read_csv_file",
+    "resolve_jobs",
+    "select_decoded_channels",
+    "stream_benji2_file",
+    "write_channels_to_motec",
+    "write_decoded_csv",
 ]
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import csv
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, Sequence
+
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# Cells read as missing (NaN): blank, and what older converters wrote for absent values.
+MISSING_VALUES = ("", "None")
+
+# Rows parsed per block: 512 KiB per float64 column.
+DEFAULT_CSV_CHUNK_ROWS = 1 << 16
+
+
+def read_csv_header(csv_path: str | Path) -> list[str]:
+    with open(csv_path, "r", newline="") as csv_file:
+        return next(csv.reader(csv_file), [])
+
+
+def parse_float_cells(cells: Sequence[str]) -> np.ndarray:
+    """
+    Parse a column of CSV cells to float64. Missing cells and cells that are not numbers
+    (``#VALUE!`` and the like from spreadsheet edits) become NaN; only a column that has such a
+    cell pays for checking cell by cell.
+    """
+    try:
+        return np.fromiter(map(float, cells), dtype=np.float64, count=len(cells))
+    except ValueError:
+        return np.fromiter(map(_float_or_nan, cells), dtype=np.float64, count=len(cells))
+
+
+def _float_or_nan(cell: str) -> float:
+    try:
+        return float(cell)
+    except ValueError:
+        return float("nan")
+
+
+def _pandas_column(values) -> np.ndarray:
+    if values.dtype.kind in "biuf":
+        return values.to_numpy(dtype=np.float64)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _pandas_blocks(
+    csv_path: Path,
+    columns: list[int],
+    chunk_rows: int,
+    max_samples: int | None,
+) -> Iterator[list[np.ndarray]]:
+    reader = pd.read_csv(
+        csv_path,
+        header=None,
+        skiprows=1,
+        usecols=sorted(set(columns)),
+        nrows=max_samples,
+        chunksize=chunk_rows,
+        keep_default_na=False,
+        na_values=list(MISSING_VALUES),
+        skip_blank_lines=False,
+        engine="c",
+        float_precision="round_trip",
+    )
+    with reader:
+        for frame in reader:
+            yield [_pandas_column(frame[index]) for index in columns]
+
+
+def _csv_module_blocks(
+    csv_path: Path,
+    columns: list[int],
+    chunk_rows: int,
+    max_samples: int | None,
+    start: int = 0,
+) -> Iterator[list[np.ndarray]]:
+    width = max(columns) + 1
+    with open(csv_path, "r", newline="") as csv_file:
+        rows = islice(csv.reader(csv_file), start + 1, None if max_samples is None else max_samples + 1)
+        while True:
+            block = list(islice(rows, chunk_rows))
+            if not block:
+                return
+            if min(map(len, block)) < width:
+                # Short rows (blank lines, trailing cells dropped by an editor) read as missing.
+                block = [row + [""] * (width - len(row)) if len(row) < width else row for row in block]
+            transposed = list(zip(*block))
+            yield [parse_float_cells(transposed[index]) for index in columns]
+
+
+def iter_csv_columns(
+    csv_path: str | Path,
+    columns: Sequence[int],
+    chunk_rows: int = DEFAULT_CSV_CHUNK_ROWS,
+    max_samples: int | None = None,
+) -> Iterator[list[np.ndarray]]:
+    """
+    Yield blocks of up to ``chunk_rows`` data rows as one float64 array per requested column
+    (by position, after the header row). Only those columns are parsed; empty, ``None``,
+    non-numeric and missing trailing cells are NaN.
+
+    Uses the pandas C parser when pandas is installed. A file it rejects (ragged rows it cannot
+    reconcile, for example) is finished with the csv module from the first row not yet
+    yielded, so the rows come out the same either way.
+    """
+    csv_path = Path(csv_path)
+    columns = list(columns)
+    if not columns:
+        return
+    done = 0
+    if pd is not None:
+        try:
+            for block in _pandas_blocks(csv_path, columns, chunk_rows, max_samples):
+                done += len(block[0])
+                yield block
+            return
+        except ValueError:
+            pass
+
+    yield from _csv_module_blocks(csv_path, columns, chunk_rows, max_samples, start=done)
+
+
+def read_csv_columns(
+    csv_path: str | Path,
+    columns: Sequence[int],
+    max_samples: int | None = None,
+    chunk_rows: int = DEFAULT_CSV_CHUNK_ROWS,
+) -> list[np.ndarray]:
+    """Whole-file form of ``iter_csv_columns``: one float64 array per requested column."""
+    blocks = list(iter_csv_columns(csv_path, columns, chunk_rows, max_samples))
+    if not blocks:
+        return [np.empty(0, dtype=np.float64) for _ in columns]
+    return [np.concatenate(parts) for parts in zip(*blocks)]
+
+
+__all__ = [
+    "DEFAULT_CSV_CHUNK_ROWS",
+    "MISSING_VALUES",
+    "iter_csv_columns",
+    "parse_float_cells",
+    "read_csv_columns",
+    "read_csv_header",
+]
@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 
-import csv
 import sys
 import os
 from datetime import datetime
 
 # Import MoTeC format classes from local file
 try:
+    import numpy as np
+    from csv_columns import read_csv_columns
     from motec_ld import MotecLog, MotecChannel, MotecEvent
 except ImportError as e:
     print(f"Error importing MoTeC format library: {e}")
@@ -83,18 +84,13 @@ ALL_CHANNELS = [
 ]
 
 
-def read_csv_file(csv_path, max_samples=None):
+def read_csv_columns_for(csv_path, channels, max_samples=None):
+    """Parse only the CSV columns used by ``channels``; missing or bad cells read as 0.0."""
     print(f"Reading {csv_path}...")
-    data = []
-    with open(csv_path, 'r') as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        for i, row in enumerate(reader):
-            if max_samples and i >= max_samples:
-                break
-            data.append(row)
-    print(f"Read {len(data)} samples from {os.path.basename(csv_path)}")
-    return data
+    columns = read_csv_columns(csv_path, [col_idx for col_idx, *_ in channels], max_samples)
+    columns = [np.where(np.isnan(values), 0.0, values) for values in columns]
+    print(f"Read {len(columns[0]) if columns else 0} samples from {os.path.basename(csv_path)}")
+    return columns
 
 
 def convert_csv_to_motec_fixed(csv_path, output_filename, max_samples=None):
@@ -103,17 +99,15 @@ def convert_csv_to_motec_fixed(csv_path, output_filename, max_samples=None):
     print("Converting CSV to MoTeC")
     print("=" * 60)
 
-    data = read_csv_file(csv_path, max_samples)
+    columns = read_csv_columns_for(csv_path, ALL_CHANNELS, max_samples)
 
     # Calculate frequency
     freq = 500
-    if len(data) >= 2:
-        try:
-            dt = float(data[1][1]) - float(data[0][1])
-            if dt > 0:
-                freq = int(1.0 / dt)
-        except:
-            pass
+    time_column = columns[0]
+    if len(time_column) >= 2:
+        dt = float(time_column[1] - time_column[0])
+        if dt > 0:
+            freq = int(1.0 / dt)
     print(f"Sample rate: {freq} Hz")
     
     # Create MoTeC log
@@ -155,7 +149,7 @@ def convert_csv_to_motec_fixed(csv_path, output_filename, max_samples=None):
             }
             channel = MotecChannel(channel_def)
             log.add_channel(channel)
-            channels_added.append((col_idx, csv_name))
+            channels_added.append((col_idx, csv_name, columns[i]))
             if i < 10 or i % 10 == 0:
                 print(f"  [{i+1:2}/{len(ALL_CHANNELS)}] {display_name:25} (col {col_idx:2}, {units})")
         except Exception as e:
@@ -165,21 +159,8 @@ def convert_csv_to_motec_fixed(csv_path, output_filename, max_samples=None):
     
     # Add samples
     print(f"\nConverting samples...")
-    sample_count = 0
-    for row_idx, row in enumerate(data):
-        samples = []
-        for col_idx, csv_name in channels_added:
-            try:
-                val_str = row[col_idx]
-                if val_str == 'None' or val_str == '':
-                    val = 0.0
-                else:
-                    val = float(val_str)
-                samples.append(val)
-            except (IndexError, ValueError):
-                samples.append(0.0)
-        log.add_samples(samples)
-        sample_count += 1
+    log.set_columns(values for _, _, values in channels_added)
+    sample_count = len(columns[0]) if columns else 0
     
     print(f"\nConversion complete:")
     print(f"  Samples converted: {sample_count}")
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import numpy as np
+
+from devices import device_data
+
+
+def row_count(columns: dict[str, np.ndarray] | None) -> int:
+    return len(next(iter(columns.values()))) if columns else 0
+
+
+def joined_rows(first: dict[str, np.ndarray] | None, second: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Rows of ``first`` then ``second``; only copies when both have rows."""
+    if not row_count(first):
+        return dict(second)
+    if not row_count(second):
+        return dict(first)
+    return {name: np.concatenate((first[name], second[name])) for name in first}
+
+
+def nominal_period(timestamps: np.ndarray) -> float:
+    """Median forward step of ``timestamps``, 0.0 when they never move forward."""
+    steps = np.diff(np.asarray(timestamps, dtype=np.float64))
+    positive = steps[steps > 0]
+    return float(np.median(positive)) if len(positive) else 0.0
+
+
+def quietest_window(columns: list[np.ndarray], window: int) -> slice:
+    """
+    The ``window`` consecutive samples (whole windows from the start) over which ``columns``
+    move the least, by summed peak-to-peak travel; e.g. the car standing still.
+    """
+    length = min(len(values) for values in columns) if columns else 0
+    window = max(1, min(window, length))
+    usable = length // window * window
+    if not usable:
+        return slice(0, 0)
+    travel = sum(
+        np.ptp(np.asarray(values[:usable], dtype=np.float64).reshape(-1, window), axis=1) for values in columns
+    )
+    start = int(np.argmin(travel)) * window
+    return slice(start, start + window)
+
+
+class DerivedStage:
+    """
+    Base for stages that add derived channels (``devices``) to decoded blocks.
+
+    ``update`` takes blocks in file order and returns them with the derived columns. A derived
+    value may depend on the ``lookback`` rows before it and the ``lookahead`` rows after it, and
+    the stage may need the first ``warmup`` rows before deriving anything (a static calibration
+    window, say), so rows are held back until what they depend on has arrived: a returned block
+    may be shorter than the one passed in, or empty, and ``finish`` returns the rest. The rows
+    come out the same however the data is split into blocks.
+
+    Subclasses implement ``_prepare`` (called once with the first ``warmup`` rows, or all of them
+    for a shorter log) and ``_derive``.
+    """
+
+    warmup = 0
+    lookback = 0
+    lookahead = 0
+
+    def __init__(self, devices: list[device_data]):
+        self.devices = devices
+        self._prepared = False
+        self._history: dict[str, np.ndarray] | None = None
+        self._pending: dict[str, np.ndarray] | None = None
+
+    def update(self, block: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        if not self.devices:
+            return block
+        self._pending = joined_rows(self._pending, block)
+        if not self._prepared and row_count(self._pending) < self.warmup:
+            return self._take(0)
+        self._ensure_prepared()
+        return self._take(row_count(self._pending) - self.lookahead)
+
+    def finish(self) -> dict[str, np.ndarray]:
+        # Nothing held back (e.g. a log without records): nothing to prepare for.
+        if not self.devices or not row_count(self._pending):
+            return {}
+        self._ensure_prepared()
+        return self._take(row_count(self._pending))
+
+    def _prepare(self, head: dict[str, np.ndarray]) -> None:
+        """May also set ``lookback`` and ``lookahead``, e.g. from the sample rate."""
+
+    def _derive(self, work: dict[str, np.ndarray], start: int, stop: int) -> dict[str, np.ndarray]:
+        """
+        Derived columns for rows ``start:stop`` of ``work``. Rows outside that range are only
+        there as neighbours; ``work`` begins or ends with the log where fewer than ``lookback``
+        or ``lookahead`` rows are around a derived row.
+        """
+        raise NotImplementedError
+
+    def _ensure_prepared(self) -> None:
+        if not self._prepared:
+            self._prepare({name: values[: self.warmup] for name, values in self._pending.items()})
+            self._prepared = True
+
+    def _take(self, count: int) -> dict[str, np.ndarray]:
+        """Emit the first ``count`` pending rows with their derived columns."""
+        if count <= 0:
+            empty = {name: values[:0] for name, values in self._pending.items()}
+            empty.update((device.name, np.empty(0, dtype=np.float64)) for device in self.devices)
+            return empty
+
+        work = joined_rows(self._history, self._pending)
+        start = row_count(self._history)
+        stop = start + count
+        out = {name: values[start:stop] for name, values in work.items()}
+        out.update(self._derive(work, start, stop))
+
+        keep = max(stop - self.lookback, 0)
+        self._history = {name: values[keep:stop] for name, values in work.items()}
+        self._pending = {name: values[stop:] for name, values in work.items()}
+        return out
+
+
+def derive_columns(columns: dict[str, np.ndarray], stages: list[DerivedStage]) -> dict[str, np.ndarray]:
+    """Whole-column form of running ``stages`` in turn: ``columns`` plus every derived channel."""
+    for stage in stages:
+        head = stage.update(columns)
+        tail = stage.finish()
+        columns = joined_rows(head, tail) if tail else head
+    return columns
+
+
+__all__ = [
+    "DerivedStage",
+    "derive_columns",
+    "joined_rows",
+    "nominal_period",
+    "quietest_window",
+    "row_count",
+]
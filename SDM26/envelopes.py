@@ -0,0 +1,431 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+from conversion_manifest import partial_path
+
+ENVELOPE_SUFFIX = ".envelope"
+
+# Bumped when the file layout or the binning changes, so existing sidecars are rebuilt.
+ENVELOPE_VERSION = 2
+
+# Samples per bin at the finest level, as a power of two: 16 samples, 32 ms at 500 Hz.
+BASE_LEVEL = 4
+
+_MAGIC = b"SDMENV\x00\x01"
+_HEADER_LENGTH = struct.Struct("<Q")
+# Arrays start on these boundaries, so every memory-mapped view is aligned.
+_ALIGNMENT = 64
+
+
+def envelope_path(run_path: str | Path) -> Path:
+    """The envelope sidecar of a converted run (.ld or .csv): next to it, with ``ENVELOPE_SUFFIX``."""
+    return Path(run_path).with_suffix(ENVELOPE_SUFFIX)
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+# Bins as (minimum, maximum, total, counts, times): channels x bins for the first three, the
+# sample count and the time of the first sample per bin for the others.
+_Bins = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+def _joined(first: _Bins | None, second: _Bins) -> _Bins:
+    if first is None:
+        return second
+    return tuple(np.concatenate((a, b), axis=-1) for a, b in zip(first, second))
+
+
+def _split(bins: _Bins, stop: int) -> tuple[_Bins, _Bins]:
+    return tuple(values[..., :stop] for values in bins), tuple(values[..., stop:] for values in bins)
+
+
+def _paired(bins: _Bins) -> _Bins:
+    """The next level up from an even number of bins: each pair merged."""
+    minimum, maximum, total, counts, times = bins
+    return (
+        np.minimum(minimum[:, 0::2], minimum[:, 1::2]),
+        np.maximum(maximum[:, 0::2], maximum[:, 1::2]),
+        total[:, 0::2] + total[:, 1::2],
+        counts[0::2] + counts[1::2],
+        times[0::2],
+    )
+
+
+class EnvelopeWriter:
+    """
+    Build a run's envelope sidecar a block of rows at a time, as another sink next to the CSV
+    and LD writers. Every channel but the timestamp is binned into ``2 ** base_level`` samples
+    at the finest level and pairs of bins at each level above, up to a single bin; each bin
+    keeps the minimum, maximum and mean of its samples (NaN when one is missing) and the time
+    its first sample was logged. Bins follow the row numbers, not the block boundaries, so the
+    file is the same however the log was split. A log without rows gets a file without levels.
+
+    The finest bins go to a scratch file as the blocks arrive; ``close`` then reads them back a
+    slice at a time and builds every level in one pass, holding at most one unpaired bin per
+    level, so memory use does not grow with the log. The envelope is written under a temporary
+    name and only appears once complete.
+    """
+
+    # Finest bins read back from the scratch file at a time.
+    build_bins = 1 << 12
+
+    def __init__(self, path: str | Path, base_level: int = BASE_LEVEL):
+        self.path = Path(path)
+        self.base_level = base_level
+        self.rows = 0
+        self.bins = 0
+        self.channels: list[str] = []
+        self._time_name: str | None = None
+        self._carry: tuple[np.ndarray, np.ndarray] | None = None
+        self._last_time = 0.0
+        self._scratch_path = partial_path(self.path.with_name(self.path.name + ".bins"))
+        self._scratch = None
+        self._record: np.dtype | None = None
+
+    def write(self, columns: dict[str, np.ndarray]) -> None:
+        rows = len(next(iter(columns.values()))) if columns else 0
+        if not rows:
+            return
+        if self._scratch is None:
+            self._time_name = next((name for name in columns if name.strip().lower() == "ts"), None)
+            self.channels = [name for name in columns if name != self._time_name]
+            channels = len(self.channels)
+            self._record = np.dtype(
+                [
+                    ("time", "<f8"),
+                    ("count", "<i8"),
+                    ("minimum", "<f4", (channels,)),
+                    ("maximum", "<f4", (channels,)),
+                    ("total", "<f8", (channels,)),
+                ]
+            )
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._scratch = open(self._scratch_path, "w+b")
+
+        values = np.full((len(self.channels), rows), np.nan)
+        for index, name in enumerate(self.channels):
+            if name in columns:
+                values[index] = columns[name]
+        if self._time_name is not None:
+            times = np.asarray(columns[self._time_name], dtype=np.float64)
+        else:
+            times = np.arange(self.rows, self.rows + rows, dtype=np.float64)
+        self.rows += rows
+        self._last_time = float(times[-1])
+
+        # Rows left over from the previous block start this one, so bins never straddle blocks.
+        if self._carry is not None:
+            values = np.concatenate((self._carry[0], values), axis=1)
+            times = np.concatenate((self._carry[1], times))
+        size = 1 << self.base_level
+        complete = len(times) // size * size
+        if complete:
+            self._add_bins(values[:, :complete], times[:complete], size)
+        self._carry = values[:, complete:], times[complete:]
+
+    def _add_bins(self, values: np.ndarray, times: np.ndarray, size: int) -> None:
+        bins = values.reshape(len(values), len(times) // size, size)
+        records = np.zeros(len(times) // size, dtype=self._record)
+        records["time"] = times[::size]
+        records["count"] = size
+        records["minimum"] = bins.min(axis=2).T
+        records["maximum"] = bins.max(axis=2).T
+        records["total"] = bins.sum(axis=2).T
+        self._scratch.write(records.tobytes())
+        self.bins += len(records)
+
+    def close(self) -> None:
+        if self._carry is not None and len(self._carry[1]):
+            values, times = self._carry
+            self._add_bins(values, times, len(times))
+        self._carry = None
+
+        level_bins = [self.bins] if self.bins else []
+        while level_bins and level_bins[-1] > 1:
+            level_bins.append((level_bins[-1] + 1) // 2)
+        # Offsets are relative to the end of the header, so they do not depend on its length.
+        layout = []
+        offset = 0
+        for level, bins in enumerate(level_bins, start=self.base_level):
+            times_offset = offset
+            values_offset = _aligned(times_offset + (bins + 1) * 8)
+            offset = _aligned(values_offset + len(self.channels) * 3 * bins * 4)
+            layout.append({"level": level, "bins": bins, "times": times_offset, "values": values_offset})
+        header = {
+            "version": ENVELOPE_VERSION,
+            "rows": self.rows,
+            "base_level": self.base_level,
+            "channels": self.channels,
+            "levels": layout,
+        }
+        encoded = json.dumps(header).encode("utf-8")
+        data_start = _aligned(len(_MAGIC) + _HEADER_LENGTH.size + len(encoded))
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        partial = partial_path(self.path)
+        try:
+            with open(partial, "wb") as envelope_file:
+                envelope_file.write(_MAGIC + _HEADER_LENGTH.pack(len(encoded)) + encoded)
+                envelope_file.truncate(data_start + offset)
+                _LevelBuilder(envelope_file, data_start, layout, len(self.channels)).build(
+                    self._finest_bins(), self._last_time
+                )
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        finally:
+            self._discard_scratch()
+        os.replace(partial, self.path)
+
+    def _finest_bins(self) -> Iterator[_Bins]:
+        if self._scratch is None:
+            return
+        self._scratch.seek(0)
+        while True:
+            records = np.fromfile(self._scratch, dtype=self._record, count=self.build_bins)
+            if not len(records):
+                return
+            yield (
+                np.ascontiguousarray(records["minimum"].T),
+                np.ascontiguousarray(records["maximum"].T),
+                np.ascontiguousarray(records["total"].T),
+                records["count"],
+                records["time"],
+            )
+
+    def _discard_scratch(self) -> None:
+        if self._scratch is not None:
+            self._scratch.close()
+            self._scratch = None
+            self._scratch_path.unlink(missing_ok=True)
+
+    def abort(self) -> None:
+        self._carry = None
+        self._discard_scratch()
+
+
+class _LevelBuilder:
+    """Writes the bins of every level into place as the finest ones are fed in, in order."""
+
+    def __init__(self, envelope_file, data_start: int, layout: list[dict[str, Any]], channels: int):
+        self._file = envelope_file
+        self._data_start = data_start
+        self._layout = layout
+        self._channels = channels
+        self._written = [0] * len(layout)
+        # At most one bin per level waiting for the bin it pairs with.
+        self._unpaired: list[_Bins | None] = [None] * len(layout)
+
+    def build(self, finest: Iterator[_Bins], last_time: float) -> None:
+        for bins in finest:
+            self._put(0, bins)
+        # An odd last bin goes up a level on its own.
+        for index in range(len(self._layout) - 1):
+            if self._unpaired[index] is not None:
+                bins, self._unpaired[index] = self._unpaired[index], None
+                self._put(index + 1, bins)
+        for entry in self._layout:
+            self._write(entry["times"] + entry["bins"] * 8, np.array([last_time]), "<f8")
+
+    def _put(self, index: int, bins: _Bins) -> None:
+        minimum, maximum, total, counts, times = bins
+        entry = self._layout[index]
+        first = self._written[index]
+        self._write(entry["times"] + first * 8, times, "<f8")
+        means = total / counts
+        for channel in range(self._channels):
+            for row, values in enumerate((minimum, maximum, means)):
+                position = (channel * 3 + row) * entry["bins"] + first
+                self._write(entry["values"] + position * 4, values[channel], "<f4")
+        self._written[index] += len(counts)
+
+        if index + 1 < len(self._layout):
+            bins = _joined(self._unpaired[index], bins)
+            even = len(bins[3]) // 2 * 2
+            pairs, rest = _split(bins, even)
+            self._unpaired[index] = rest if len(rest[3]) else None
+            if even:
+                self._put(index + 1, _paired(pairs))
+
+    def _write(self, offset: int, values: np.ndarray, dtype: str) -> None:
+        self._file.seek(self._data_start + offset)
+        self._file.write(np.asarray(values).astype(dtype).tobytes())
+
+
+@dataclass(frozen=True)
+class EnvelopeWindow:
+    """
+    One channel over a time window at one level: bin ``i`` covers ``times[i]`` up to
+    ``times[i + 1]`` (one more time than bins) and ``samples`` samples per bin.
+    """
+
+    level: int
+    samples: int
+    times: np.ndarray
+    minimum: np.ndarray
+    maximum: np.ndarray
+    mean: np.ndarray
+
+
+class RunEnvelope:
+    """
+    A run's envelope sidecar, memory-mapped: a window at a coarse level only reads its own
+    bins, so an overview of a whole session or a zoom into one lap costs about one value per
+    pixel whatever the log length. Use as a context manager or ``close``.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as envelope_file:
+            start = envelope_file.read(len(_MAGIC) + _HEADER_LENGTH.size)
+            if start[: len(_MAGIC)] != _MAGIC:
+                raise ValueError(f"Not an envelope file: {self.path}")
+            (length,) = _HEADER_LENGTH.unpack(start[len(_MAGIC) :])
+            header: dict[str, Any] = json.loads(envelope_file.read(length))
+        if header.get("version") != ENVELOPE_VERSION:
+            raise ValueError(f"Unsupported envelope version {header.get('version')}: {self.path}")
+
+        self.rows: int = header["rows"]
+        self.base_level: int = header["base_level"]
+        self.channels: list[str] = header["channels"]
+        self._index = {name: index for index, name in enumerate(self.channels)}
+        self._map = np.memmap(self.path, dtype=np.uint8, mode="r")
+        data_start = _aligned(len(_MAGIC) + _HEADER_LENGTH.size + length)
+        self._levels: dict[int, tuple[np.ndarray, np.ndarray]] = {}
+        for entry in header["levels"]:
+            bins = entry["bins"]
+            times_at = data_start + entry["times"]
+            values_at = data_start + entry["values"]
+            times = self._map[times_at : times_at + (bins + 1) * 8].view("<f8")
+            values = self._map[values_at : values_at + len(self.channels) * 3 * bins * 4].view("<f4")
+            self._levels[entry["level"]] = (times, values.reshape(len(self.channels), 3, bins))
+
+    @classmethod
+    def for_run(cls, run_path: str | Path) -> RunEnvelope:
+        """The envelope of the converted run at ``run_path`` (.ld or .csv)."""
+        return cls(envelope_path(run_path))
+
+    @property
+    def levels(self) -> list[int]:
+        """Levels finest first; a bin at level ``n`` covers ``2 ** n`` samples."""
+        return sorted(self._levels)
+
+    @property
+    def start(self) -> float | None:
+        """Time of the first sample; None for a log without rows."""
+        return float(self._levels[self.levels[0]][0][0]) if self._levels else None
+
+    @property
+    def end(self) -> float | None:
+        return float(self._levels[self.levels[0]][0][-1]) if self._levels else None
+
+    def _bin_range(self, level: int, start: float | None, stop: float | None) -> tuple[int, int]:
+        starts = self._levels[level][0][:-1]
+        first = 0 if start is None else max(int(np.searchsorted(starts, start, "right")) - 1, 0)
+        last = len(starts) if stop is None else max(int(np.searchsorted(starts, stop, "left")), first + 1)
+        return first, min(last, len(starts))
+
+    def level_for(self, width: int, start: float | None = None, stop: float | None = None) -> int:
+        """The coarsest level with at least ``width`` bins (pixels) between ``start`` and ``stop``."""
+        for level in reversed(self.levels):
+            first, last = self._bin_range(level, start, stop)
+            if last - first >= width:
+                return level
+        return self.levels[0] if self._levels else self.base_level
+
+    def window(
+        self,
+        channel: str,
+        start: float | None = None,
+        stop: float | None = None,
+        width: int | None = None,
+        level: int | None = None,
+    ) -> EnvelopeWindow:
+        """
+        ``channel`` between the times ``start`` and ``stop`` (the whole run by default), at
+        ``level`` or else the level for ``width`` pixels (the finest without either). Empty
+        for a log without rows.
+        """
+        if channel not in self._index:
+            raise KeyError(channel)
+        if level is None:
+            level = self.level_for(width, start, stop) if width is not None else self.base_level
+        if not self._levels:
+            empty = np.empty(0, dtype=np.float32)
+            return EnvelopeWindow(level, 1 << level, np.empty(0), empty, empty, empty)
+        times, values = self._levels[level]
+        first, last = self._bin_range(level, start, stop)
+        minimum, maximum, mean = np.array(values[self._index[channel], :, first:last])
+        return EnvelopeWindow(level, 1 << level, np.array(times[first : last + 1]), minimum, maximum, mean)
+
+    def close(self) -> None:
+        self._levels.clear()
+        mmap = getattr(self._map, "_mmap", None)
+        self._map = None
+        if mmap is not None:
+            mmap.close()
+
+    def __enter__(self) -> RunEnvelope:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def plot_envelope(
+    ax,
+    envelope: RunEnvelope,
+    channel: str,
+    start: float | None = None,
+    stop: float | None = None,
+    label: str | None = None,
+    color: str | None = None,
+    alpha: float = 0.3,
+):
+    """
+    Draw ``channel`` on the matplotlib axes ``ax`` at the level for the axes' width in pixels:
+    the min/max band, so no spike is lost however far out the view is, and the mean as a line.
+    Returns the band and the line.
+    """
+    width = max(int(ax.get_window_extent().width), 1)
+    window = envelope.window(channel, start, stop, width=width)
+    # Steps hold each bin's values up to the next bin's start.
+    (line,) = ax.plot(
+        window.times,
+        np.append(window.mean, window.mean[-1:]),
+        drawstyle="steps-post",
+        label=label or channel,
+        color=color,
+    )
+    band = ax.fill_between(
+        window.times,
+        np.append(window.minimum, window.minimum[-1:]),
+        np.append(window.maximum, window.maximum[-1:]),
+        step="post",
+        color=line.get_color(),
+        alpha=alpha,
+        linewidth=0,
+    )
+    return band, line
+
+
+__all__ = [
+    "BASE_LEVEL",
+    "ENVELOPE_SUFFIX",
+    "ENVELOPE_VERSION",
+    "EnvelopeWindow",
+    "EnvelopeWriter",
+    "RunEnvelope",
+    "envelope_path",
+    "plot_envelope",
+]
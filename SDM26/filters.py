@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from calibration import ChannelFilter
+from derived_channels import DerivedStage, derive_columns, nominal_period
+from devices import device_data
+
+FILTERED_SUFFIX = "_FILT"
+RATE_SUFFIX = "_RATE"
+
+# Samples the sample rate is measured over before any filter is designed.
+RATE_WARMUP = 1000
+
+# Largest absolute sum of the low-pass taps cut off the ends, per unit of input.
+KERNEL_TOLERANCE = 1e-6
+
+# Upper bound on low-pass taps either side; reached only by cutoffs far below the sample rate.
+MAX_KERNEL_HALF_WIDTH = 1 << 12
+
+# Median absolute deviation -> standard deviation of normally distributed noise.
+_MAD_SCALE = 1.4826
+
+
+def butterworth_sos(order: int, cutoff: float, rate: float) -> np.ndarray:
+    """
+    Digital Butterworth low-pass as second-order sections (rows of ``b0 b1 b2 a0 a1 a2``), by
+    the bilinear transform with the cutoff prewarped, each section at unit gain at DC.
+    """
+    if not 0 < cutoff < rate / 2:
+        raise ValueError(f"Cutoff {cutoff} Hz is not between 0 and the Nyquist frequency ({rate / 2} Hz)")
+    warped = 2.0 * rate * math.tan(math.pi * cutoff / rate)
+    analog = warped * np.exp(1j * np.pi * (2 * np.arange(order) + order + 1) / (2 * order))
+    poles = (2.0 * rate + analog) / (2.0 * rate - analog)
+
+    sections = []
+    # Poles k and order - 1 - k are conjugates; the first of each pair has the positive imaginary part.
+    for pole in poles[: order // 2]:
+        a = np.array([1.0, -2.0 * pole.real, abs(pole) ** 2])
+        sections.append(np.concatenate((np.array([1.0, 2.0, 1.0]) * a.sum() / 4.0, a)))
+    if order % 2:
+        pole = poles[order // 2].real
+        sections.append(np.array([(1.0 - pole) / 2.0, (1.0 - pole) / 2.0, 0.0, 1.0, -pole, 0.0]))
+    return np.array(sections)
+
+
+def sos_impulse_response(sos: np.ndarray, length: int) -> np.ndarray:
+    """The first ``length`` samples of the response of ``sos`` to a unit impulse."""
+    response = np.zeros(length)
+    if length:
+        response[0] = 1.0
+    for b0, b1, b2, _, a1, a2 in sos / sos[:, 3:4]:
+        x1 = x2 = y1 = y2 = 0.0
+        for index, x0 in enumerate(response.tolist()):
+            y0 = b0 * x0 + b1 * x1 + b2 * x2 - a1 * y1 - a2 * y2
+            response[index] = y0
+            x1, x2, y1, y2 = x0, x1, y0, y1
+    return response
+
+
+def zero_phase_kernel(sos: np.ndarray, tolerance: float = KERNEL_TOLERANCE) -> np.ndarray:
+    """
+    ``sos`` run forwards and then backwards (as ``filtfilt`` does) as one symmetric set of taps:
+    the autocorrelation of its impulse response. The ends are cut where their absolute sum
+    drops below ``tolerance`` and the taps rescaled to unit gain at DC.
+    """
+    radius = max(float(np.max(np.abs(np.roots(section[3:])), initial=0.0)) for section in sos)
+    if radius <= 0.0:
+        length = 3 * len(sos) + 1
+    else:
+        length = math.ceil(math.log(tolerance * 1e-3) / math.log(radius)) + 3 * len(sos)
+    length = min(max(length, 1), MAX_KERNEL_HALF_WIDTH + 1)
+
+    impulse = sos_impulse_response(sos, length)
+    kernel = np.correlate(impulse, impulse, "full")
+    # outside[k]: absolute sum of the taps more than k from the centre, on both sides.
+    half = np.abs(kernel[length - 1 :])
+    outside = 2.0 * np.append(np.cumsum(half[::-1])[::-1][1:], 0.0)
+    width = int(np.argmax(outside <= tolerance))
+    kernel = kernel[length - 1 - width : length + width]
+    return kernel / kernel.sum()
+
+
+def savgol_coefficients(half_width: int, polyorder: int, derivative: int = 0) -> np.ndarray:
+    """
+    Savitzky-Golay taps over ``half_width`` samples either side: the ``derivative``-th
+    derivative (per sample) at the centre of the least-squares ``polyorder`` polynomial.
+    """
+    offsets = np.arange(-half_width, half_width + 1, dtype=np.float64)
+    fit = np.linalg.pinv(np.vander(offsets, polyorder + 1, increasing=True))
+    return fit[derivative] * math.factorial(derivative)
+
+
+def apply_kernel(values: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+    """
+    ``sum(kernel[j] * values[i + j - half])`` for every sample, the values past either end
+    repeating the end value. Summed tap by tap, so a sample gets the same arithmetic whichever
+    block it falls in.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    half = len(kernel) // 2
+    if not len(values) or not half:
+        return values * kernel[0] if len(kernel) else values.copy()
+    padded = np.pad(values, half, mode="edge")
+    total = np.zeros(len(values))
+    for offset, tap in enumerate(kernel):
+        if tap:
+            total += tap * padded[offset : offset + len(values)]
+    return total
+
+
+def despike(values: np.ndarray, half_width: int, threshold: float = 3.0) -> np.ndarray:
+    """
+    Hampel filter: each sample more than ``threshold`` scaled median absolute deviations from
+    the median of the ``half_width`` samples either side is replaced by that median.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if half_width <= 0 or not len(values):
+        return values
+    windows = sliding_window_view(np.pad(values, half_width, mode="edge"), 2 * half_width + 1)
+    median = np.median(windows, axis=1)
+    deviation = np.median(np.abs(windows - median[:, None]), axis=1)
+    spikes = np.abs(values - median) > threshold * _MAD_SCALE * deviation
+    return np.where(spikes, median, values)
+
+
+def filter_devices(devices: list[device_data]) -> list[device_data]:
+    """The filtered (and rate) devices for the channels of ``devices`` that have a filter."""
+    if not any(device.name.strip().lower() == "ts" for device in devices):
+        return []
+
+    derived: list[device_data] = []
+    for source in devices:
+        settings = source.channel_filter
+        if settings is None:
+            continue
+        derived.append(
+            device_data(
+                f"{source.name}{FILTERED_SUFFIX}",
+                len(devices) + len(derived),
+                0,
+                units=source.units,
+                display_name=f"{source.display_name} Filtered",
+                short_name=f"{source.short_name[:6]}_F",
+                decimals=source.decimals,
+            )
+        )
+        if settings.derivative:
+            derived.append(
+                device_data(
+                    f"{source.name}{RATE_SUFFIX}",
+                    len(devices) + len(derived),
+                    0,
+                    units=f"{source.units}/s" if source.units else "1/s",
+                    display_name=f"{source.display_name} Rate",
+                    short_name=f"{source.short_name[:6]}_R",
+                    decimals=source.decimals,
+                )
+            )
+    return derived
+
+
+class FilterStage(DerivedStage):
+    """
+    Derived-channel stage adding ``<name>_FILT`` and ``<name>_RATE`` for every channel with a
+    ``ChannelFilter`` (from the calibration table). The filters are designed for the sample
+    rate of the first ``RATE_WARMUP`` rows; a low-pass at or above the Nyquist frequency is
+    skipped. Each block is filtered together with the rows either side the filters reach (the
+    saved overlap, see ``DerivedStage``), and only its own rows are kept, so long logs are
+    filtered block by block with the same result as the whole log at once.
+    """
+
+    def __init__(self, devices: list[device_data]):
+        super().__init__(filter_devices(devices))
+        self.warmup = RATE_WARMUP
+        self._time_name = next((device.name for device in devices if device.name.strip().lower() == "ts"), None)
+        self._filters = {device.name: device.channel_filter for device in devices if device.channel_filter}
+        self._lowpass: dict[str, np.ndarray | None] = {}
+        self._period = 0.0
+
+    def _prepare(self, head: dict[str, np.ndarray]) -> None:
+        self._period = nominal_period(head[self._time_name])
+        rate = 1.0 / self._period if self._period > 0 else 0.0
+        reach = 0
+        for name, settings in self._filters.items():
+            kernel = None
+            if settings.lowpass is not None and 0 < settings.lowpass < rate / 2:
+                kernel = zero_phase_kernel(butterworth_sos(settings.order, settings.lowpass, rate))
+            self._lowpass[name] = kernel
+            lowpass_half = 0 if kernel is None else len(kernel) // 2
+            reach = max(reach, settings.despike + lowpass_half + settings.savgol)
+        self.lookback = self.lookahead = reach
+
+    def _derive(self, work: dict[str, np.ndarray], start: int, stop: int) -> dict[str, np.ndarray]:
+        derived = {}
+        for name, settings in self._filters.items():
+            values = despike(work[name], settings.despike, settings.spike_threshold)
+            if self._lowpass[name] is not None:
+                values = apply_kernel(values, self._lowpass[name])
+            filtered = values
+            if settings.savgol:
+                filtered = apply_kernel(values, savgol_coefficients(settings.savgol, settings.savgol_order))
+            derived[f"{name}{FILTERED_SUFFIX}"] = np.asarray(filtered[start:stop], dtype=np.float64)
+
+            if settings.derivative:
+                slope = apply_kernel(values, savgol_coefficients(settings.savgol, settings.savgol_order, 1))
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    rate = slope[start:stop] / self._period
+                derived[f"{name}{RATE_SUFFIX}"] = np.where(np.isfinite(rate), rate, 0.0)
+        return derived
+
+
+def filter_columns(columns: dict[str, np.ndarray], devices: list[device_data]) -> dict[str, np.ndarray]:
+    """Whole-column form of ``FilterStage``: ``columns`` plus the filtered channels."""
+    return derive_columns(columns, [FilterStage(devices)])
+
+
+__all__ = [
+    "FILTERED_SUFFIX",
+    "FilterStage",
+    "KERNEL_TOLERANCE",
+    "RATE_SUFFIX",
+    "RATE_WARMUP",
+    "apply_kernel",
+    "butterworth_sos",
+    "despike",
+    "filter_columns",
+    "filter_devices",
+    "savgol_coefficients",
+    "sos_impulse_response",
+    "zero_phase_kernel",
+]
@@ -1,52 +1,262 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+
 import numpy as np
-import pandas as pd
 
-def translate_linear_acc( csv_file: str ) :
-    """Translates IMU linear acceleration data from IMU frame to CG and adds the data in 3 new columns to the csv file.
-       - CG_X_ACCEL
-       - CG_Y_ACCEL
-       - CG_Z_ACCEL
+from derived_channels import DerivedStage, derive_columns, nominal_period, quietest_window
+from devices import device_data
+
+STANDARD_GRAVITY = 9.80665
+
+IMU_ACCEL_CHANNELS = ("IMU_X_ACCEL", "IMU_Y_ACCEL", "IMU_Z_ACCEL")
+IMU_GYRO_CHANNELS = ("IMU_X_GYRO", "IMU_Y_GYRO", "IMU_Z_GYRO")
+CG_CHANNELS = ("CG_X_ACCEL", "CG_Y_ACCEL", "CG_Z_ACCEL")
+
+# Samples the logger period is measured over when the mounting angle is not needed.
+PERIOD_SEARCH = 100
+
+
+@dataclass(frozen=True)
+class ImuSettings:
+    """
+    Where the IMU sits and how its readings are brought to the CG.
+
+    ``lever_arm`` is the IMU position relative to the CG in metres, in the vehicle frame
+    (x forward, y left, z up); to be adjusted per car. With ``level`` the mounting roll and pitch
+    are taken from gravity over the quietest ``level_window`` samples in the first
+    ``level_search`` (the car at rest on level ground) and removed before the transform.
+    """
+
+    lever_arm: tuple[float, float, float] = (0.5, 0.0, 0.0)
+    level: bool = False
+    level_search: int = 2500
+    level_window: int = 250
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+DEFAULT_IMU_SETTINGS = ImuSettings()
+
+
+def time_derivative(values: np.ndarray, timestamps: np.ndarray, period: float | None = None) -> np.ndarray:
+    """
+    Derivative of ``values`` (along the last axis) over ``timestamps``, with ``np.gradient``'s
+    second-order scheme for uneven steps (one-sided at the ends). Steps where the timestamps do
+    not move forward use ``period`` instead (by default their median forward step), so logger
+    jitter bends the derivative no more than it bends the timestamps, and duplicate or backwards
+    timestamps do not blow it up.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    derivative = np.zeros_like(values)
+    if values.shape[-1] < 2:
+        return derivative
+
+    if period is None:
+        period = nominal_period(timestamps)
+    steps = np.diff(np.asarray(timestamps, dtype=np.float64))
+    steps = np.where(steps > 0, steps, period)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        derivative[..., 0] = (values[..., 1] - values[..., 0]) / steps[0]
+        derivative[..., -1] = (values[..., -1] - values[..., -2]) / steps[-1]
+        if values.shape[-1] > 2:
+            back, forward = steps[:-1], steps[1:]
+            a = -forward / (back * (back + forward))
+            b = (forward - back) / (back * forward)
+            c = back / (forward * (back + forward))
+            derivative[..., 1:-1] = a * values[..., :-2] + b * values[..., 1:-1] + c * values[..., 2:]
+    return np.where(np.isfinite(derivative), derivative, 0.0)
+
+
+def level_rotation(accel: np.ndarray) -> np.ndarray:
+    """
+    Rotation (3x3) taking the mean of ``accel`` (3 x n, the IMU at rest) onto the z axis, i.e.
+    removing the roll and pitch the IMU is mounted at. Identity when there is no reading.
+    """
+    accel = np.asarray(accel, dtype=np.float64)
+    gravity = np.mean(accel, axis=1) if accel.shape[-1] else np.zeros(3)
+    if not np.all(np.isfinite(gravity)) or not np.any(gravity):
+        return np.eye(3)
+    roll = np.arctan2(gravity[1], gravity[2])
+    pitch = np.arctan2(-gravity[0], np.hypot(gravity[1], gravity[2]))
+    about_x = np.array([[1, 0, 0], [0, np.cos(roll), -np.sin(roll)], [0, np.sin(roll), np.cos(roll)]])
+    about_y = np.array([[np.cos(pitch), 0, np.sin(pitch)], [0, 1, 0], [-np.sin(pitch), 0, np.cos(pitch)]])
+    return about_y @ about_x
+
+
+def cg_acceleration(
+    accel: np.ndarray,
+    gyro: np.ndarray,
+    angular_accel: np.ndarray,
+    lever_arm: tuple[float, float, float],
+) -> np.ndarray:
+    """
+    Rigid-body transfer of IMU acceleration to the CG: ``a_cg = a_imu - alpha x r - w x (w x r)``
+    for every sample at once. ``accel`` is in g, ``gyro`` in deg/s and ``angular_accel`` in
+    deg/s^2 (3 x n each, one row per vehicle axis); ``lever_arm`` is ``r`` in metres. Returns g.
+
+    With the IMU ahead of the CG on the x axis this is the usual planar correction
+    ``ax + wz^2 x`` and ``ay - (dwz/dt) x``.
+    """
+    rx, ry, rz = lever_arm
+    r = np.array([[rx], [ry], [rz]], dtype=np.float64)
+    omega = np.radians(gyro)
+    alpha = np.radians(angular_accel)
+    # w x (w x r) = w (w . r) - r |w|^2
+    correction = omega * (rx * omega[0] + ry * omega[1] + rz * omega[2])
+    correction -= r * (omega[0] * omega[0] + omega[1] * omega[1] + omega[2] * omega[2])
+    correction[0] += alpha[1] * rz - alpha[2] * ry
+    correction[1] += alpha[2] * rx - alpha[0] * rz
+    correction[2] += alpha[0] * ry - alpha[1] * rx
+    return np.asarray(accel, dtype=np.float64) - correction / STANDARD_GRAVITY
+
+
+def _mounting_rotation(accel: np.ndarray, settings: ImuSettings) -> np.ndarray:
+    """``level_rotation`` over the quietest window of ``accel`` (3 x n, the start of the log)."""
+    rest = quietest_window(list(accel), settings.level_window)
+    return level_rotation(np.array([values[rest] for values in accel]))
+
+
+def _cg_rows(
+    accel: np.ndarray,
+    gyro: np.ndarray,
+    timestamps: np.ndarray,
+    rotation: np.ndarray | None,
+    period: float,
+    lever_arm: tuple[float, float, float],
+    inner: slice = slice(None),
+) -> np.ndarray:
+    """CG acceleration of the ``inner`` columns of ``accel``; the others are only neighbours."""
+    if rotation is not None:
+        accel = rotation @ accel
+        gyro = rotation @ gyro
+    angular_accel = time_derivative(gyro, timestamps, period)
+    return cg_acceleration(accel[:, inner], gyro[:, inner], angular_accel[:, inner], lever_arm)
+
+
+def cg_accelerations(
+    timestamps: np.ndarray,
+    accel: np.ndarray,
+    gyro: np.ndarray,
+    settings: ImuSettings = DEFAULT_IMU_SETTINGS,
+) -> np.ndarray:
+    """
+    Whole-log CG acceleration (3 x n, in g) from ``accel`` (g) and ``gyro`` (deg/s), 3 x n each;
+    the same values ``CgTransform`` adds.
+    """
+    accel = np.asarray(accel, dtype=np.float64)
+    gyro = np.asarray(gyro, dtype=np.float64)
+    times = np.asarray(timestamps, dtype=np.float64)
+    period = nominal_period(times[: _warmup(settings)])
+    rotation = _mounting_rotation(accel[:, : settings.level_search], settings) if settings.level else None
+    return _cg_rows(accel, gyro, times, rotation, period, settings.lever_arm)
+
+
+def _warmup(settings: ImuSettings) -> int:
+    """Leading samples the transform depends on: the rest search with ``level``, else the period's."""
+    return settings.level_search if settings.level else PERIOD_SEARCH
 
-       This function assumes the following:
-       - the IMU is only offset in the x direction from the CG.
-       - the vehicle moves in the x-y plane only (no roll or pitch).
 
-       The equations are from: 
-       https://basicairdata.eu/knowledge-center/compensation/inertial-measurement-unit-placement/
+def imu_devices(devices: list[device_data]) -> list[device_data]:
+    """The CG acceleration devices, when ``devices`` has the timestamp and every IMU axis."""
+    names = {device.name: device for device in devices}
+    needed = IMU_ACCEL_CHANNELS + IMU_GYRO_CHANNELS
+    if not all(name in names for name in needed) or not any(name.strip().lower() == "ts" for name in names):
+        return []
 
-    Args:
-        csv_file (str): Path to the CSV file 
+    return [
+        device_data(
+            name,
+            len(devices) + index,
+            0,
+            units=names[source].units or "g",
+            display_name=f"CG {axis} Accel",
+            short_name=f"CG_{axis}",
+            decimals=names[source].decimals,
+        )
+        for index, (name, source, axis) in enumerate(zip(CG_CHANNELS, IMU_ACCEL_CHANNELS, "XYZ"))
+    ]
+
+
+class CgTransform(DerivedStage):
+    """
+    Derived-channel stage adding ``CG_X/Y/Z_ACCEL``: the IMU acceleration moved to the CG along
+    the full 3-axis lever arm (``cg_acceleration``), with the angular acceleration from
+    ``time_derivative`` of the gyro. Each row needs its neighbours either side for the
+    derivative, and the first rows for the logger period (and with ``level`` the mounting angle),
+    see ``DerivedStage``.
     """
-    df = pd.read_csv( csv_file )
 
-    t = df[ 'TS' ].to_numpy()
+    lookback = 1
+    lookahead = 1
 
-    # Opted to Output CSV in G rather than mG
-    ax_IMU = df[ 'IMU_X_ACCEL' ].to_numpy() #/ 1000      # convert from mg to g
-    ay_IMU = df[ 'IMU_Y_ACCEL' ].to_numpy() #/ 1000      # convert from mg to g
-    az_IMU = df[ 'IMU_Z_ACCEL' ].to_numpy() #/ 1000      # convert from mg to g
-    gz = df[ 'IMU_Z_GYRO' ].to_numpy() #/ 1000           # convert from mdps to dps
+    def __init__(self, devices: list[device_data], settings: ImuSettings = DEFAULT_IMU_SETTINGS):
+        super().__init__(imu_devices(devices))
+        self.settings = settings
+        self.warmup = _warmup(settings)
+        self._time_name = next((device.name for device in devices if device.name.strip().lower() == "ts"), None)
+        self.rotation: np.ndarray | None = None
+        self._period = 0.0
 
-    # IMU x coordinate in meters (to be adjusted based on SDM25, SDM26)
-    x_IMU = 0.5
+    def _prepare(self, head: dict[str, np.ndarray]) -> None:
+        self._period = nominal_period(head[self._time_name])
+        if self.settings.level:
+            self.rotation = _mounting_rotation(np.array([head[name] for name in IMU_ACCEL_CHANNELS]), self.settings)
 
-    # Linear x acceleration correction
-    ax_CG = ax_IMU + ( ( gz ** 2 ) * x_IMU )
+    def _derive(self, work: dict[str, np.ndarray], start: int, stop: int) -> dict[str, np.ndarray]:
+        rows = slice(max(start - 1, 0), stop + 1)
+        inner = slice(start - rows.start, stop - rows.start)
+        # One row per axis, so every per-sample operation runs over contiguous memory.
+        accel = np.array([work[name][rows] for name in IMU_ACCEL_CHANNELS], dtype=np.float64)
+        gyro = np.array([work[name][rows] for name in IMU_GYRO_CHANNELS], dtype=np.float64)
+        times = work[self._time_name][rows]
+        cg = _cg_rows(accel, gyro, times, self.rotation, self._period, self.settings.lever_arm, inner)
+        return dict(zip(CG_CHANNELS, cg))
+
+
+def derive_cg_columns(
+    columns: dict[str, np.ndarray],
+    devices: list[device_data],
+    settings: ImuSettings = DEFAULT_IMU_SETTINGS,
+) -> dict[str, np.ndarray]:
+    """Whole-column form of ``CgTransform``: ``columns`` plus the CG acceleration channels."""
+    return derive_columns(columns, [CgTransform(devices, settings)])
+
+
+def translate_linear_acc(csv_file: str, settings: ImuSettings = DEFAULT_IMU_SETTINGS) -> None:
+    """
+    Add CG_X/Y/Z_ACCEL (in g) to a CSV converted before the conversion pipeline derived them.
+    New conversions already have these channels; this re-reads and rewrites the whole file.
+    """
+    import pandas as pd
 
-    # Yaw derivative
-    dt_gz = np.zeros_like( gz )
+    df = pd.read_csv(csv_file)
+    accel = np.array([df[name].to_numpy(dtype=np.float64) for name in IMU_ACCEL_CHANNELS])
+    gyro = np.array([df[name].to_numpy(dtype=np.float64) for name in IMU_GYRO_CHANNELS])
+    cg = cg_accelerations(df["TS"].to_numpy(dtype=np.float64), accel, gyro, settings)
 
-    for i in range( 1, len( gz ) ):
-         dt_gz[ i ] = ( gz[ i ] - gz[ i - 1 ] ) / ( t[ i ] - t[ i - 1 ] )  
+    index = df.columns.get_loc("IMU_Z_GYRO") + 1
+    for offset, (name, values) in enumerate(zip(CG_CHANNELS, cg)):
+        df.insert(loc=index + offset, column=name, value=values)
+    df.to_csv(csv_file, index=False)
 
-    # Linear y acceleration correction
-    ay_CG = ay_IMU - ( dt_gz * x_IMU )
 
-    # Insert new columns after IMU_Z_GYRO
-    index = df.columns.get_loc( 'IMU_Z_GYRO' ) + 1
-    
-    df.insert( loc=index, column='CG_X_ACCEL', value=ax_CG * 1000 )   # convert back to mg
-    df.insert( loc=index+1, column='CG_Y_ACCEL', value=ay_CG * 1000 )   # convert back to mg
-    df.insert( loc=index+2, column='CG_Z_ACCEL', value=az_IMU * 1000 )   # convert back to mg
-    
-    df.to_csv( csv_file, index=False )
+__all__ = [
+    "CG_CHANNELS",
+    "CgTransform",
+    "DEFAULT_IMU_SETTINGS",
+    "IMU_ACCEL_CHANNELS",
+    "IMU_GYRO_CHANNELS",
+    "ImuSettings",
+    "PERIOD_SEARCH",
+    "STANDARD_GRAVITY",
+    "cg_acceleration",
+    "cg_accelerations",
+    "derive_cg_columns",
+    "imu_devices",
+    "level_rotation",
+    "time_derivative",
+    "translate_linear_acc",
+]
@@ -1,6 +1,11 @@
+import mmap
+import os
 import struct
 import binascii
 from io import BytesIO
+from pathlib import Path
+
+import numpy as np
 
 class MotecStruct:
 
@@ -121,17 +126,13 @@ class MotecSamples():
 
     }
 
-    def __init__(self, channel = None, samples = None):
-        if samples:
-            self.samples = samples
-        else:
-            self.samples = []
-
+    def __init__(self, channel = None, samples = None, rounding = False):
         try:
             self.channel = channel
             self.fmt = self.datatypes[channel.datatype][channel.datasize]
             self.convert = self.converttypes[channel.datatype]
             self.datasize = struct.calcsize(self.fmt)
+            self.dtype = np.dtype("<" + self.fmt)
             self.multiplier = channel.multiplier
             self.shift = channel.shift
             self.scale = channel.scale
@@ -139,21 +140,112 @@ class MotecSamples():
         except Exception as e:
             raise ValueError(f"failed to determine samples for {channel.datatype} / {channel.datasize}")
 
+        # samples are stored already encoded in the channel's on-disk type (e.g. 4 bytes for a
+        # float channel), single add_sample calls are buffered until needed
+        self._pending = []
+        self._source = None
+        self._source_numsamples = 0
+        # int channels truncate like the original encoder unless rounding to the nearest step
+        self.rounding = rounding
+        self.raw = np.empty(0, dtype=self.dtype)
+        if samples is not None:
+            self.extend(samples)
+
+    def encode(self, values):
+        # same arithmetic as the original per sample version, done on the whole array at once
+        values = np.asarray(values, dtype=np.float64)
+        values = ( (values / self.multiplier) - self.shift) * self.scale / pow(10.0, -self.decplaces)
+        if self.convert is int and self.rounding:
+            values = np.rint(values)
+        if self.convert is int and len(values):
+            limits = np.iinfo(self.dtype)
+            if values.min() < limits.min or values.max() >= limits.max + 1:
+                raise ValueError(f"sample out of range for {self.dtype} channel {self.channel.name}")
+        return values.astype(self.dtype)
+
+    def decode(self, raw):
+        raw = np.asarray(raw).astype(np.float64)
+        return (raw / self.scale * pow(10., -self.decplaces) + self.shift) * self.multiplier
+
+    def _flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self.extend(pending)
+
+    @property
+    def samples(self):
+        if self._source is not None:
+            return self.decode(np.concatenate([self.encode(chunk) for chunk in self._source()] or [self.raw]))
+        self._flush()
+        return self.decode(self.raw)
+
+    @samples.setter
+    def samples(self, samples):
+        self._pending = []
+        self._source = None
+        self.raw = self.encode(samples)
+
+    @property
+    def type_name(self):
+        return f"{'float' if self.convert is float else 'int'}{self.datasize * 8}"
+
     @property
     def numsamples(self):
-        return len(self.samples)
+        if self._source is not None:
+            return self._source_numsamples
+        return len(self.raw) + len(self._pending)
+
+    def reserve(self, numsamples):
+        """
+        declare the final sample count of a channel whose data is pushed straight to the file
+        by MotecStreamWriter instead of being held here
+        """
+        def streamed():
+            raise ValueError(f"samples of channel {self.channel.name} were streamed to the file")
+        self.set_source(streamed, numsamples)
+
+    def set_source(self, chunks, numsamples):
+        """
+        take the samples from a chunked source at write time instead of storing them. chunks is
+        a callable returning an iterable of arrays; numsamples must be known up front because
+        the file pointers are worked out before any data is written
+        """
+        self._pending = []
+        self.raw = np.empty(0, dtype=self.dtype)
+        self._source = chunks
+        self._source_numsamples = numsamples
+
+    def iter_chunks(self):
+        """yield the encoded channel data as bytes, one block per source chunk"""
+        if self._source is None:
+            yield self.to_string()
+            return
+
+        written = 0
+        for chunk in self._source():
+            encoded = self.encode(chunk)
+            written += len(encoded)
+            if written > self._source_numsamples:
+                break
+            yield encoded.tobytes()
+
+        if written != self._source_numsamples:
+            raise ValueError(f"channel {self.channel.name} source gave {written} samples, expected {self._source_numsamples}")
 
     def add_sample(self, sample):
-        self.samples.append(sample)
+        self._pending.append(sample)
 
-    def to_string(self):
-        data = bytearray()
-        for v in self.samples:
-            v = ( (v / self.multiplier) - self.shift) * self.scale / pow(10.0, -self.decplaces)
-            v = self.convert(v)
-            data += struct.pack(self.fmt, v)
+    def extend(self, values):
+        """append a whole array of samples"""
+        if self._source is not None:
+            raise ValueError(f"channel {self.channel.name} takes its samples from a chunked source")
+        self._flush()
+        encoded = self.encode(values)
+        self.raw = np.concatenate((self.raw, encoded)) if len(self.raw) else encoded
 
-        return data
+    def to_string(self):
+        self._flush()
+        return self.raw.tobytes()
 
     @classmethod
     def from_string(cls, data, channel = None):
@@ -163,16 +255,166 @@ class MotecSamples():
 
         samples = cls(channel=channel)
 
-        # go to the start of the data and unpack all the values
-        startpos = channel.datapos
-        endpos = startpos + (samples.datasize * channel.numsamples)
-        for (v, ) in struct.iter_unpack(samples.fmt, data[startpos:endpos]):
-            v = (v / channel.scale * pow(10., -channel.decplaces) + channel.shift) * channel.multiplier
-            samples.add_sample(v)
+        # keep a view of the encoded channel data, it is only scaled when samples are read
+        count = min(channel.numsamples, max(0, (len(data) - channel.datapos) // samples.datasize))
+        samples.raw = np.frombuffer(data, dtype=samples.dtype, count=count, offset=channel.datapos)
 
         return samples
 
 
+INT_DATATYPE = 0x0003
+FLOAT_DATATYPE = 0x0007
+
+# headroom for float noise when checking a channel against its error bound
+ERROR_TOLERANCE = 1e-9
+
+# bytes moved at a time when MotecAppendWriter lays its channels out again
+COPY_BUFFER_SIZE = 1 << 20
+
+
+def within_error_bound(error, max_error):
+    return error <= max_error * (1 + ERROR_TOLERANCE) + ERROR_TOLERANCE * np.finfo(np.float32).eps
+
+
+def _step_fields(step):
+    """
+    express a quantisation step as multiplier / 10**decplaces with int16 fields, or None if the
+    step has no exact decimal form
+    """
+    for decplaces in range(0, 10):
+        multiplier = step * pow(10.0, decplaces)
+        rounded = round(multiplier)
+        if 1 <= rounded <= 32767 and abs(multiplier - rounded) <= ERROR_TOLERANCE * multiplier:
+            return (rounded, 1, decplaces)
+    return None
+
+
+def _decimal_step(max_error):
+    """largest 1/2/5 x 10**n step whose rounding error stays within max_error"""
+    for decplaces in range(-4, 10):
+        for multiplier in (5, 2, 1):
+            step = multiplier * pow(10.0, -decplaces)
+            if step <= 2 * max_error:
+                return _step_fields(step)
+    return None
+
+
+def _int_fields(vmin, vmax, fields, datasize):
+    """
+    shift/multiplier/scale/decplaces storing values in [vmin, vmax] as an int of datasize bytes,
+    or None when the range does not fit. vmin is None for an empty channel
+    """
+    multiplier, scale, decplaces = fields
+    dtype = np.dtype("<" + MotecSamples.datatypes[INT_DATATYPE][datasize])
+    limits = np.iinfo(dtype)
+    if vmin is None:
+        return {"datatype": INT_DATATYPE, "datasize": datasize, "shift": 0,
+                "multiplier": multiplier, "scale": scale, "decplaces": decplaces}
+
+    units = np.array([vmin, vmax], dtype=np.float64) / multiplier
+    centre = round((units[0] + units[1]) / 2)
+
+    for shift in (0, max(-32768, min(32767, centre))):
+        # same arithmetic as MotecSamples.encode, rounded to the nearest step instead of truncated
+        stored = np.rint((units - shift) * scale / pow(10.0, -decplaces))
+        if stored[0] < limits.min or stored[1] > limits.max:
+            continue
+        return {"datatype": INT_DATATYPE, "datasize": datasize, "shift": shift,
+                "multiplier": multiplier, "scale": scale, "decplaces": decplaces}
+    return None
+
+
+def _int_encoding(values, fields, datasize):
+    if len(values):
+        encoding = _int_fields(values.min(), values.max(), fields, datasize)
+    else:
+        encoding = _int_fields(None, None, fields, datasize)
+    if encoding is None:
+        return None
+
+    samples = MotecSamples(MotecChannel(dict(encoding, name="")), rounding=True)
+    raw = samples.encode(values)
+    error = float(np.max(np.abs(samples.decode(raw) - values))) if len(values) else 0.0
+    return encoding, raw, error
+
+
+def _float_encoding(values, datasize):
+    dtype = np.dtype("<" + MotecSamples.datatypes[FLOAT_DATATYPE][datasize])
+    if datasize == 2 and len(values) and np.max(np.abs(values)) > np.finfo(dtype).max:
+        return None
+    raw = values.astype(dtype)
+    error = float(np.max(np.abs(raw.astype(np.float64) - values))) if len(values) else 0.0
+    encoding = {"datatype": FLOAT_DATATYPE, "datasize": datasize, "shift": 0,
+                "multiplier": 1, "scale": 1, "decplaces": 0}
+    return encoding, raw, error
+
+
+def compact_encoding(values, max_error, resolution = None):
+    """
+    pick the smallest of int8/int16/int32/float16/float32 that stores values within max_error.
+    integer types get shift/multiplier/scale/decplaces from the value range and either the
+    sensor resolution (when it has an exact decimal form) or a 1/2/5 decimal step.
+    returns (encoding fields, encoded raw array, max quantization error); falls back to float32
+    (whatever its error) when nothing else fits
+    """
+    values = np.asarray(values, dtype=np.float64)
+    fallback = _float_encoding(values, 4)
+    if not np.all(np.isfinite(values)):
+        return fallback
+
+    steps = []
+    if resolution:
+        steps.append(_step_fields(resolution))
+    if max_error > 0:
+        steps.append(_decimal_step(max_error))
+    steps = [fields for fields in steps if fields is not None]
+
+    for datasize in (1, 2, 4):
+        candidates = [_int_encoding(values, fields, datasize) for fields in steps]
+        # an empty channel has nothing to fit float16 to, so it ends up as compact_range_encoding's
+        if datasize > 1 and len(values):
+            candidates.append(_float_encoding(values, datasize))
+        for candidate in candidates:
+            if candidate is not None and within_error_bound(candidate[2], max_error):
+                return candidate
+
+    return fallback
+
+
+def compact_range_encoding(vmin, vmax, max_error, resolution = None, resolution_error = None):
+    """
+    the integer encoding compact_encoding would pick, decided from the value range alone so a
+    channel can be encoded block by block. rounding to the nearest step keeps the error within
+    half a step, or within resolution_error (the measured distance of the values from the
+    resolution grid) for the resolution step. float16 needs the actual values and is not
+    considered. vmin/vmax are None for an empty channel, NaN or inf for a non-finite one.
+    returns (encoding fields, error bound)
+    """
+    fallback = ({"datatype": FLOAT_DATATYPE, "datasize": 4, "shift": 0,
+                 "multiplier": 1, "scale": 1, "decplaces": 0}, None)
+    if vmin is not None and not (np.isfinite(vmin) and np.isfinite(vmax)):
+        return fallback
+
+    steps = []
+    if resolution:
+        steps.append((_step_fields(resolution), resolution_error))
+    if max_error > 0:
+        steps.append((_decimal_step(max_error), None))
+    steps = [(fields, error) for (fields, error) in steps if fields is not None]
+
+    for datasize in (1, 2, 4):
+        for (fields, error) in steps:
+            multiplier, scale, decplaces = fields
+            bound = multiplier / scale * pow(10.0, -decplaces) / 2 if error is None else error
+            if not within_error_bound(bound, max_error):
+                continue
+            encoding = _int_fields(vmin, vmax, fields, datasize)
+            if encoding is not None:
+                return encoding, bound
+
+    return fallback
+
+
 class MotecChannel(MotecBase):
 
     header = MotecStruct([
@@ -272,6 +514,40 @@ class MotecLog(MotecBase):
         for (idx, sample) in enumerate(samples):
             self.channels[idx].add_sample(sample)
 
+    def add_channel_data(self, channel, data):
+        """
+        append a whole array of samples to a channel, adding the channel to the log first if
+        it is new (a MotecChannel or its definition dict)
+        """
+        if not isinstance(channel, MotecChannel):
+            channel = MotecChannel(channel)
+        if not any(existing is channel for existing in self.channels):
+            self.add_channel(channel)
+        channel.samples.extend(data)
+        return channel
+
+    def add_compact_channel_data(self, channel, data, max_error, resolution = None):
+        """
+        add a channel (definition dict) with its samples stored in the smallest datatype that
+        keeps every sample within max_error, see compact_encoding. the achieved error is kept
+        on the channel as quantization_error
+        """
+        encoding, raw, error = compact_encoding(data, max_error, resolution)
+        channel = MotecChannel(dict(channel, **encoding))
+        channel.samples.rounding = True
+        channel.samples.raw = raw
+        channel.quantization_error = error
+        self.add_channel(channel)
+        return channel
+
+    def set_columns(self, columns):
+        """replace the samples of every channel, one array per channel in channel order"""
+        columns = list(columns)
+        if len(columns) != len(self.channels):
+            raise ValueError(f"expected {len(self.channels)} columns, got {len(columns)}")
+        for (channel, data) in zip(self.channels, columns):
+            channel.samples.samples = data
+
 
     @classmethod
     def from_string(cls, data, pad = False):
@@ -292,19 +568,85 @@ class MotecLog(MotecBase):
 
         return log
 
-    def to_string(self):
-
-        data = BytesIO()
+    @classmethod
+    def open(cls, path, pad = False):
+        """
+        memory map an .ld file and walk the channel header chain. no sample data is read until
+        a channel's samples are accessed, then only that channel is decoded
+        """
+        f = open(path, "rb")
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            f.close()
+            raise
+
+        log = cls.from_string(data, pad=pad)
+        log._file = f
+        log._mmap = data
+        return log
 
-        # pack the event
+    def close(self):
+        mapping = getattr(self, "_mmap", None)
+        if mapping is not None:
+            try:
+                mapping.close()
+            except BufferError:
+                # decoded views are still alive, the mapping is released with them
+                pass
+            self._mmap = None
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def channel(self, name):
+        """find a channel by its name or short name"""
+        for ci in self.channels:
+            if ci.name == name:
+                return ci
+        for ci in self.channels:
+            if ci.shortname == name:
+                return ci
+        raise KeyError(f"no channel named {name}")
+
+    def to_dataframe(self, channels = None):
+        """
+        decode the requested channels (all of them by default) into a pandas DataFrame indexed
+        by time in seconds. channels logged at different rates are aligned on the union of their
+        timestamps
+        """
+        import pandas as pd
+
+        selected = self.channels if channels is None else [self.channel(name) for name in channels]
+        if not selected:
+            return pd.DataFrame()
+
+        def timebase(ci):
+            freq = ci.freq or 1
+            return np.arange(ci.samples.numsamples) / freq
+
+        if len({(ci.freq, ci.samples.numsamples) for ci in selected}) == 1:
+            index = pd.Index(timebase(selected[0]), name="Time")
+            return pd.DataFrame({ci.name: ci.samples.samples for ci in selected}, index=index)
+
+        columns = [pd.Series(ci.samples.samples, index=pd.Index(timebase(ci), name="Time"), name=ci.name) for ci in selected]
+        return pd.concat(columns, axis=1)
+
+    def layout(self):
+        """
+        work out every pointer in the file from the channel count, datasizes and sample counts,
+        so the file can be written front to back without seeking
+        """
         eventpos = 0
         nextpos = self.header.size
         if getattr(self, "event", None):
             eventpos = nextpos
             nextpos = nextpos + self.event.header.size
-            data.seek(eventpos)
-            data.write(self.event.to_string())
-            
+
         self.eventpos = eventpos
 
         # work out the channel pointers
@@ -330,20 +672,217 @@ class MotecLog(MotecBase):
 
                 ci.prevpos = prevpos
                 ci.datapos = datapos
-                data.seek(thispos)
-                data.write(ci.to_string())
-
-                # get the samples for the channel
-                samples = ci.samples.to_string()
-                data.seek(datapos)
-                data.write(samples)
-                
+
                 # finally, update all the pointers
-                datapos += len(samples)
+                datapos += ci.samples.numsamples * ci.samples.datasize
                 prevpos = thispos
                 thispos = ci.nextpos
 
-        # now pack the log header
-        data.seek(0)
-        data.write(super().to_string())
-        return data.getbuffer()
\ No newline at end of file
+    def write_headers(self, target):
+        """lay the file out and write everything in front of the first channel's data"""
+        self.layout()
+        target.write(super().to_string())
+        if self.eventpos:
+            target.write(self.event.to_string())
+
+        for ci in self.channels:
+            target.write(ci.to_string())
+
+    def write(self, target):
+        """
+        stream the log to a path or a binary file object in one sequential pass: log header,
+        event, channel headers, then each channel's data block. channels backed by a chunked
+        source are encoded chunk by chunk, so the whole log never has to be in memory
+        """
+        if isinstance(target, (str, os.PathLike)):
+            # written under a temporary name so an interrupted write never leaves a truncated log
+            partial = os.fspath(target) + ".partial"
+            try:
+                with open(partial, "wb") as f:
+                    self.write(f)
+            except BaseException:
+                # the open itself may have failed, and that is the error to report
+                Path(partial).unlink(missing_ok=True)
+                raise
+            os.replace(partial, target)
+            return
+
+        self.write_headers(target)
+
+        for ci in self.channels:
+            for chunk in ci.samples.iter_chunks():
+                target.write(chunk)
+
+    def to_string(self):
+        data = BytesIO()
+        self.write(data)
+        return data.getbuffer()
+
+
+class MotecStreamWriter:
+    """
+    push samples into an .ld file as they are produced, a block at a time per channel.
+
+    the final sample count of every channel has to be declared first (MotecSamples.reserve) so
+    the layout is fixed; the headers are written on open and write(channel, values) encodes
+    values and puts them at that channel's next position in its data block, seeking between
+    channels. memory use is one block, whatever the log length
+    """
+
+    def __init__(self, log, path):
+        self.log = log
+        self.path = path
+        # the file only takes its real name once every channel is complete
+        self._partial = os.fspath(path) + ".partial"
+        self._file = open(self._partial, "wb")
+        try:
+            log.write_headers(self._file)
+        except BaseException:
+            self.abort()
+            raise
+        self._written = [0] * log.numchannels
+        self._index = {id(ci): idx for (idx, ci) in enumerate(log.channels)}
+
+    def write(self, channel, values):
+        """append values to a channel, given as a MotecChannel or its index in the log"""
+        idx = channel if isinstance(channel, int) else self._index[id(channel)]
+        ci = self.log.channels[idx]
+        encoded = ci.samples.encode(values)
+        if self._written[idx] + len(encoded) > ci.samples.numsamples:
+            raise ValueError(f"channel {ci.name} given more than its {ci.samples.numsamples} samples")
+
+        self._file.seek(ci.datapos + self._written[idx] * ci.samples.datasize)
+        self._file.write(encoded.tobytes())
+        self._written[idx] += len(encoded)
+        return encoded
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        for (ci, written) in zip(self.log.channels, self._written):
+            if written != ci.samples.numsamples:
+                os.remove(self._partial)
+                raise ValueError(f"channel {ci.name} got {written} samples, expected {ci.samples.numsamples}")
+        os.replace(self._partial, self.path)
+
+    def abort(self):
+        """drop the partly written file"""
+        self._file.close()
+        Path(self._partial).unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class MotecAppendWriter:
+    """
+    keep an .ld file valid while samples are still being appended, e.g. when following a log
+    that is being recorded.
+
+    every channel's data block is preallocated for capacity samples. append writes the new
+    samples after the existing ones and then rewrites the header block with the new sample
+    counts, so the file can be opened after any append and the cost of an append only depends
+    on the new samples. a channel that runs out of room has the file laid out again with twice
+    the capacity; close trims every channel to its final length
+    """
+
+    def __init__(self, log, path, capacity = 1 << 16):
+        self.log = log
+        self.path = path
+        self._written = [0] * log.numchannels
+        self._file = open(path, "w+b")
+        try:
+            self._relayout([max(1, capacity)] * log.numchannels)
+        except BaseException:
+            self._file.close()
+            raise
+
+    @property
+    def numsamples(self):
+        return list(self._written)
+
+    def _write_headers(self):
+        f = self._file
+        f.seek(0)
+        f.write(MotecBase.to_string(self.log))
+        if self.log.eventpos:
+            f.write(self.log.event.to_string())
+        for (ci, written) in zip(self.log.channels, self._written):
+            # the header holds the samples written so far, not the room reserved for them
+            ci.numsamples = written
+            f.write(MotecBase.to_string(ci))
+
+    def _relayout(self, capacities):
+        f = self._file
+        sizes = [written * ci.samples.datasize for (ci, written) in zip(self.log.channels, self._written)]
+        # nothing is placed before the first layout
+        sources = [ci.datapos if size else 0 for (ci, size) in zip(self.log.channels, sizes)]
+
+        for (ci, capacity) in zip(self.log.channels, capacities):
+            ci.samples.reserve(capacity)
+        self.log.layout()
+
+        # channels keep their order, so moving the ones that go back first to last and then the
+        # ones that go forward last to first never overwrites data that has not been moved yet
+        moves = [(src, ci.datapos, size) for (ci, src, size) in zip(self.log.channels, sources, sizes) if size]
+        for (src, dst, size) in [move for move in moves if move[1] < move[0]]:
+            self._move(src, dst, size)
+        for (src, dst, size) in reversed([move for move in moves if move[1] > move[0]]):
+            self._move(src, dst, size)
+
+        end = self.log.firstchannelpos + MotecChannel.header.size * self.log.numchannels
+        if self.log.channels:
+            last = self.log.channels[-1]
+            end = last.datapos + last.samples.numsamples * last.samples.datasize
+        f.truncate(end)
+        self._write_headers()
+        f.flush()
+
+    def _move(self, src, dst, size):
+        """copy size bytes from src to dst a buffer at a time, from the end when moving forward"""
+        f = self._file
+        offsets = range(0, size, COPY_BUFFER_SIZE)
+        for offset in (reversed(offsets) if dst > src else offsets):
+            f.seek(src + offset)
+            data = f.read(min(COPY_BUFFER_SIZE, size - offset))
+            f.seek(dst + offset)
+            f.write(data)
+
+    def append(self, columns):
+        """append one array per channel, in channel order"""
+        columns = list(columns)
+        if len(columns) != self.log.numchannels:
+            raise ValueError(f"expected {self.log.numchannels} columns, got {len(columns)}")
+
+        encoded = [ci.samples.encode(values) for (ci, values) in zip(self.log.channels, columns)]
+        needed = [written + len(data) for (written, data) in zip(self._written, encoded)]
+        capacities = [ci.samples.numsamples for ci in self.log.channels]
+        if any(need > capacity for (need, capacity) in zip(needed, capacities)):
+            self._relayout([max(capacity * 2, need) for (need, capacity) in zip(needed, capacities)])
+
+        f = self._file
+        for (idx, (ci, data)) in enumerate(zip(self.log.channels, encoded)):
+            f.seek(ci.datapos + self._written[idx] * ci.samples.datasize)
+            f.write(data.tobytes())
+            self._written[idx] += len(data)
+        self._write_headers()
+        f.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._relayout(self._written)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+LINEAR = "linear"
+HOLD = "hold"
+INTERPOLATIONS = (LINEAR, HOLD)
+
+# Slack, in grid periods, for the last grid point to count as reached despite float rounding.
+_GRID_TOLERANCE = 1e-6
+
+
+def grid_length(start: float, stop: float, freq: int) -> int:
+    """Points of the uniform ``freq`` grid from ``start`` up to ``stop`` (both in seconds)."""
+    if not (math.isfinite(start) and math.isfinite(stop)) or stop < start:
+        return 0
+    return int(math.floor((stop - start) * freq + _GRID_TOLERANCE)) + 1
+
+
+def monotonic_mask(timestamps: np.ndarray, previous: float = -np.inf) -> np.ndarray:
+    """
+    True for each timestamp later than every one before it (and ``previous``); duplicate,
+    backwards and NaN timestamps are False.
+    """
+    if not len(timestamps):
+        return np.zeros(0, dtype=bool)
+    latest = np.fmax.accumulate(np.concatenate(([previous], timestamps[:-1])))
+    return timestamps > latest
+
+
+def resampled_length(timestamps: np.ndarray, freq: int) -> int:
+    """Samples ``Resampler`` produces for this timestamp column."""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    kept = timestamps[monotonic_mask(timestamps)]
+    return grid_length(float(kept[0]), float(kept[-1]), freq) if len(kept) else 0
+
+
+class Resampler:
+    """
+    Re-time channels onto a uniform grid at ``freq``, starting at the first timestamp, a block at
+    a time. Each channel is interpolated linearly unless ``interpolations`` maps it to ``"hold"``
+    (last value held, for flags, counters and status channels). A grid point is produced once a
+    timestamp at or after it has been seen, and the last sample of each block is kept as overlap
+    for the next, so feeding the data in blocks gives the same samples as feeding it whole.
+
+    Samples whose timestamp does not move forward (duplicates, steps backwards) are dropped
+    before interpolating.
+    """
+
+    def __init__(self, time_name: str, freq: int, interpolations: dict[str, str] | None = None):
+        self.time_name = time_name
+        self.freq = freq
+        self.interpolations = interpolations or {}
+        self.start: float | None = None
+        self.produced = 0
+        self._last_time = -np.inf
+        self._overlap: dict[str, np.ndarray] | None = None
+
+    def update(self, columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """Resample one block; returns the grid points it completes (possibly none)."""
+        times = np.asarray(columns[self.time_name], dtype=np.float64)
+        keep = monotonic_mask(times, self._last_time)
+        if not keep.all():
+            columns = {name: values[keep] for name, values in columns.items()}
+            times = times[keep]
+        if not len(times):
+            return self._empty(columns)
+
+        if self.start is None:
+            self.start = float(times[0])
+        self._last_time = float(times[-1])
+        if self._overlap is not None:
+            columns = {name: np.concatenate((self._overlap[name], values)) for name, values in columns.items()}
+            times = np.concatenate((self._overlap[self.time_name].astype(np.float64), times))
+        self._overlap = {name: values[-1:] for name, values in columns.items()}
+
+        stop = grid_length(self.start, self._last_time, self.freq)
+        grid = self.start + np.arange(self.produced, stop, dtype=np.float64) / self.freq
+        self.produced = max(self.produced, stop)
+        return {name: self._interpolate(name, times, values, grid) for name, values in columns.items()}
+
+    def _holds(self, name: str) -> bool:
+        return name != self.time_name and self.interpolations.get(name, LINEAR) == HOLD
+
+    def _interpolate(self, name: str, times: np.ndarray, values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+        if self._holds(name):
+            return values[np.maximum(np.searchsorted(times, grid, side="right") - 1, 0)]
+        return np.interp(grid, times, values)
+
+    def _empty(self, columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        return {
+            name: values[:0] if self._holds(name) else np.empty(0, dtype=np.float64)
+            for name, values in columns.items()
+        }
+
+
+def resample_columns(
+    columns: dict[str, np.ndarray],
+    time_name: str,
+    freq: int,
+    interpolations: dict[str, str] | None = None,
+) -> dict[str, np.ndarray]:
+    """Whole-column form of ``Resampler``."""
+    return Resampler(time_name, freq, interpolations).update(columns)
+
+
+__all__ = [
+    "HOLD",
+    "INTERPOLATIONS",
+    "LINEAR",
+    "Resampler",
+    "grid_length",
+    "monotonic_mask",
+    "resample_columns",
+    "resampled_length",
+]
@@ -0,0 +1,385 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+from timebase import TimebaseTracker
+
+CATALOG_NAME = "run_catalog.sqlite"
+
+# Bumped when the schema changes; an older catalog is rebuilt as runs are converted again.
+CATALOG_VERSION = 1
+
+GPS_FIX_CHANNEL = "GPS_FIX"
+TEST_NUMBER_CHANNEL = "TESTNO"
+
+_SCHEMA = """
+CREATE TABLE runs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    csv_path TEXT,
+    session TEXT NOT NULL,
+    recorded_at TEXT,
+    converted_at TEXT NOT NULL,
+    duration REAL,
+    sample_rate INTEGER,
+    samples INTEGER NOT NULL,
+    channels TEXT NOT NULL,
+    gps_first_fix REAL,
+    source_sha256 TEXT NOT NULL,
+    inputs TEXT NOT NULL
+);
+CREATE INDEX runs_duration ON runs (duration);
+CREATE INDEX runs_session ON runs (session, recorded_at);
+
+CREATE TABLE channel_stats (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    channel TEXT NOT NULL,
+    minimum REAL,
+    maximum REAL,
+    mean REAL,
+    nulls INTEGER NOT NULL,
+    PRIMARY KEY (run_id, channel)
+) WITHOUT ROWID;
+CREATE INDEX channel_stats_maximum ON channel_stats (channel, maximum);
+CREATE INDEX channel_stats_minimum ON channel_stats (channel, minimum);
+
+CREATE TABLE test_ranges (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    test_number REAL NOT NULL,
+    start REAL,
+    stop REAL,
+    samples INTEGER NOT NULL
+);
+CREATE INDEX test_ranges_number ON test_ranges (test_number);
+CREATE INDEX test_ranges_run ON test_ranges (run_id);
+"""
+
+
+@dataclass(frozen=True)
+class ChannelStats:
+    """Range and mean of one channel over a run; ``nulls`` counts missing (NaN) samples."""
+
+    minimum: float | None
+    maximum: float | None
+    mean: float | None
+    nulls: int
+
+
+@dataclass(frozen=True)
+class TestRange:
+    """Consecutive samples logged under one TESTNO, with the timestamps of the first and last."""
+
+    test_number: float
+    start: float | None
+    stop: float | None
+    samples: int
+
+
+@dataclass(frozen=True)
+class RunRecord:
+    """One converted run as the catalog stores it; ``path`` (the .ld file) identifies it."""
+
+    path: str
+    source: str
+    csv_path: str | None
+    session: str
+    recorded_at: str | None
+    converted_at: str
+    duration: float | None
+    sample_rate: int | None
+    samples: int
+    channels: list[str]
+    gps_first_fix: float | None
+    source_sha256: str
+    inputs: dict[str, Any]
+    stats: dict[str, ChannelStats] = field(default_factory=dict)
+    tests: list[TestRange] = field(default_factory=list)
+
+
+class _ChannelAccumulator:
+    def __init__(self):
+        self.minimum: float | None = None
+        self.maximum: float | None = None
+        self.total = 0.0
+        self.count = 0
+        self.nulls = 0
+
+    def update(self, values: np.ndarray) -> None:
+        if values.dtype.kind == "f":
+            missing = np.isnan(values)
+            if missing.any():
+                self.nulls += int(np.count_nonzero(missing))
+                values = values[~missing]
+        if not len(values):
+            return
+        low, high = float(np.min(values)), float(np.max(values))
+        self.minimum = low if self.minimum is None else min(self.minimum, low)
+        self.maximum = high if self.maximum is None else max(self.maximum, high)
+        self.total += float(np.sum(values, dtype=np.float64))
+        self.count += len(values)
+
+    def stats(self) -> ChannelStats:
+        mean = self.total / self.count if self.count else None
+        return ChannelStats(self.minimum, self.maximum, mean, self.nulls)
+
+
+class RunStatistics:
+    """
+    Catalog statistics of one run gathered block by block, as another sink next to the CSV and
+    LD writers: per-channel range, mean and missing samples, the timebase, when the GPS first
+    reported a fix (seconds into the run) and the TESTNO ranges. A channel missing from some
+    blocks counts their rows as nulls, so the statistics do not depend on how the log was split.
+    """
+
+    def __init__(self):
+        self.channels: list[str] = []
+        self.rows = 0
+        self._time_name: str | None = None
+        self._accumulators: dict[str, _ChannelAccumulator] = {}
+        self._timebase = TimebaseTracker()
+        self._gps_first_fix: float | None = None
+        self._tests: list[list] = []
+
+    def write(self, columns: dict[str, np.ndarray]) -> None:
+        rows = len(next(iter(columns.values()))) if columns else 0
+        if not rows:
+            return
+        for name in columns:
+            if name not in self._accumulators:
+                # Rows written before the channel first appeared count as missing.
+                self._accumulators[name] = _ChannelAccumulator()
+                self._accumulators[name].nulls = self.rows
+                self.channels.append(name)
+        if self._time_name is None:
+            self._time_name = next((name for name in self.channels if name.strip().lower() == "ts"), None)
+        for name, accumulator in self._accumulators.items():
+            if name in columns:
+                accumulator.update(np.asarray(columns[name]))
+            else:
+                accumulator.nulls += rows
+
+        times = None
+        if self._time_name is not None and self._time_name in columns:
+            times = np.asarray(columns[self._time_name], dtype=np.float64)
+            self._timebase.update(times)
+        if self._gps_first_fix is None and GPS_FIX_CHANNEL in columns and times is not None:
+            fixed = np.flatnonzero(np.nan_to_num(np.asarray(columns[GPS_FIX_CHANNEL], dtype=np.float64)))
+            if len(fixed):
+                self._gps_first_fix = float(times[fixed[0]])
+        if TEST_NUMBER_CHANNEL in columns:
+            self._update_tests(np.asarray(columns[TEST_NUMBER_CHANNEL], dtype=np.float64), times)
+        self.rows += rows
+
+    def _update_tests(self, numbers: np.ndarray, times: np.ndarray | None) -> None:
+        # Start of each stretch of equal test numbers within the block.
+        starts = np.concatenate(([0], np.flatnonzero(numbers[1:] != numbers[:-1]) + 1))
+        stops = np.append(starts[1:], len(numbers))
+        for start, stop in zip(starts.tolist(), stops.tolist()):
+            number = float(numbers[start])
+            first = None if times is None else float(times[start])
+            last = None if times is None else float(times[stop - 1])
+            if self._tests and self._tests[-1][0] == number:
+                self._tests[-1][2] = last
+                self._tests[-1][3] += stop - start
+            else:
+                self._tests.append([number, first, last, stop - start])
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+    def record(
+        self,
+        path: str | Path,
+        source: str | Path,
+        csv_path: str | Path | None,
+        session: str,
+        source_state: dict[str, Any],
+        inputs: dict[str, Any],
+    ) -> RunRecord:
+        """The catalog row for this run; ``source_state`` is the manifest's record of the input."""
+        report = self._timebase.report() if self._timebase.count else None
+        start = None if report is None else report.first
+        mtime_ns = source_state.get("mtime_ns")
+        return RunRecord(
+            path=str(Path(path).resolve()),
+            source=str(Path(source).resolve()),
+            csv_path=None if csv_path is None else str(Path(csv_path).resolve()),
+            session=session,
+            recorded_at=None if mtime_ns is None else datetime.fromtimestamp(mtime_ns / 1e9).isoformat(" ", "seconds"),
+            converted_at=datetime.now().isoformat(" ", "seconds"),
+            duration=None if report is None else report.duration,
+            sample_rate=None if report is None or report.mean_dt is None else report.sample_rate()[0],
+            samples=self.rows,
+            channels=self.channels,
+            gps_first_fix=None if self._gps_first_fix is None or start is None else self._gps_first_fix - start,
+            source_sha256=source_state["sha256"],
+            inputs=inputs,
+            stats={name: accumulator.stats() for name, accumulator in self._accumulators.items()},
+            tests=[TestRange(number, first, last, samples) for number, first, last, samples in self._tests],
+        )
+
+
+class RunCatalog:
+    """
+    SQLite index of converted runs: one ``runs`` row per run, with per-channel statistics in
+    ``channel_stats`` and the TESTNO ranges in ``test_ranges``, indexed so season-wide questions
+    (``find_runs``) are answered without opening a log. Use as a context manager or ``close``.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30.0)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self._create()
+
+    def _create(self) -> None:
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version == CATALOG_VERSION:
+            return
+        with self.connection:
+            for table in ("test_ranges", "channel_stats", "runs"):
+                self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+            self.connection.executescript(_SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> RunCatalog:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def is_current(self, path: str | Path, source_sha256: str, inputs: dict[str, Any]) -> bool:
+        """True when the run at ``path`` is catalogued from this input content and these settings."""
+        row = self.connection.execute(
+            "SELECT source_sha256, inputs FROM runs WHERE path = ?", (str(Path(path).resolve()),)
+        ).fetchone()
+        return (
+            row is not None
+            and row["source_sha256"] == source_sha256
+            and json.loads(row["inputs"]) == json.loads(json.dumps(inputs))
+        )
+
+    def record(self, records: Iterable[RunRecord]) -> None:
+        """Add or replace the rows of ``records``, all in one transaction."""
+        with self.connection:
+            for record in records:
+                self.connection.execute("DELETE FROM runs WHERE path = ?", (record.path,))
+                run_id = self.connection.execute(
+                    "INSERT INTO runs (path, source, csv_path, session, recorded_at, converted_at, duration, "
+                    "sample_rate, samples, channels, gps_first_fix, source_sha256, inputs) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        record.path,
+                        record.source,
+                        record.csv_path,
+                        record.session,
+                        record.recorded_at,
+                        record.converted_at,
+                        record.duration,
+                        record.sample_rate,
+                        record.samples,
+                        json.dumps(record.channels),
+                        record.gps_first_fix,
+                        record.source_sha256,
+                        json.dumps(record.inputs, sort_keys=True),
+                    ),
+                ).lastrowid
+                self.connection.executemany(
+                    "INSERT INTO channel_stats (run_id, channel, minimum, maximum, mean, nulls) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (run_id, name, stats.minimum, stats.maximum, stats.mean, stats.nulls)
+                        for name, stats in record.stats.items()
+                    ],
+                )
+                self.connection.executemany(
+                    "INSERT INTO test_ranges (run_id, test_number, start, stop, samples) VALUES (?, ?, ?, ?, ?)",
+                    [(run_id, test.test_number, test.start, test.stop, test.samples) for test in record.tests],
+                )
+
+    def find_runs(
+        self,
+        min_duration: float | None = None,
+        peaks: dict[str, float] | None = None,
+        session: str | None = None,
+        test_number: float | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Runs at least ``min_duration`` seconds long, in ``session``, that logged ``test_number``
+        and in which every channel in ``peaks`` went beyond its value either way (maximum above
+        it or minimum below minus it; a peak of 0 means "ever nonzero"). E.g. runs over two
+        minutes with more than 100 mG lateral acceleration and the wheels turning::
+
+            catalog.find_runs(min_duration=120, peaks={"IMU_Y_ACCEL": 0.1, "FL_Wheel_Speed": 0})
+        """
+        clauses: list[str] = []
+        parameters: list[Any] = []
+        if min_duration is not None:
+            clauses.append("duration >= ?")
+            parameters.append(min_duration)
+        if session is not None:
+            clauses.append("session = ?")
+            parameters.append(session)
+        if test_number is not None:
+            clauses.append("id IN (SELECT run_id FROM test_ranges WHERE test_number = ?)")
+            parameters.append(test_number)
+        for channel, peak in (peaks or {}).items():
+            clauses.append(
+                "(id IN (SELECT run_id FROM channel_stats WHERE channel = ? AND maximum > ?)"
+                " OR id IN (SELECT run_id FROM channel_stats WHERE channel = ? AND minimum < ?))"
+            )
+            parameters.extend((channel, abs(peak), channel, -abs(peak)))
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.connection.execute(f"SELECT * FROM runs{where} ORDER BY recorded_at, path", parameters)
+        return [_run_row(row) for row in rows]
+
+    def channel_stats(self, path: str | Path) -> dict[str, ChannelStats]:
+        rows = self.connection.execute(
+            "SELECT channel, minimum, maximum, mean, nulls FROM channel_stats "
+            "WHERE run_id = (SELECT id FROM runs WHERE path = ?) ORDER BY channel",
+            (str(Path(path).resolve()),),
+        )
+        return {row["channel"]: ChannelStats(row["minimum"], row["maximum"], row["mean"], row["nulls"]) for row in rows}
+
+    def test_ranges(self, path: str | Path) -> list[TestRange]:
+        rows = self.connection.execute(
+            "SELECT test_number, start, stop, samples FROM test_ranges "
+            "WHERE run_id = (SELECT id FROM runs WHERE path = ?) ORDER BY rowid",
+            (str(Path(path).resolve()),),
+        )
+        return [TestRange(row["test_number"], row["start"], row["stop"], row["samples"]) for row in rows]
+
+
+def _run_row(row: sqlite3.Row) -> dict[str, Any]:
+    run = dict(row)
+    run["channels"] = json.loads(run["channels"])
+    run["inputs"] = json.loads(run["inputs"])
+    return run
+
+
+__all__ = [
+    "CATALOG_NAME",
+    "CATALOG_VERSION",
+    "ChannelStats",
+    "RunCatalog",
+    "RunRecord",
+    "RunStatistics",
+    "TestRange",
+]
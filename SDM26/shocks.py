@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from calibration import Scale
+from derived_channels import DerivedStage, derive_columns, nominal_period, quietest_window
+from devices import device_data
+
+# Corner -> shock potentiometer channel.
+SHOCK_CHANNELS = {"FL": "FLSHOCK", "FR": "FRSHOCK", "RR": "RRSHOCK", "RL": "RLSHOCK"}
+
+
+@dataclass(frozen=True)
+class ShockSettings:
+    """
+    How shock displacement and velocity are derived, in samples.
+
+    The static zero of each corner is the median of the quietest ``zero_window`` samples (smallest
+    peak-to-peak travel) within the first ``zero_search`` samples, so a car that is pushed or sat
+    in at the start of the log is not zeroed mid-movement. Velocity is the central difference
+    over ``span`` samples either side; ``smoothing`` > 0 first averages the displacement over
+    ``smoothing`` samples either side.
+    """
+
+    zero_search: int = 2500
+    zero_window: int = 250
+    span: int = 1
+    smoothing: int = 0
+
+    @property
+    def lookahead(self) -> int:
+        """Samples after a row that its velocity depends on."""
+        return self.span + self.smoothing
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+DEFAULT_SHOCK_SETTINGS = ShockSettings()
+
+
+def static_zero(positions: np.ndarray, window: int, resolution: float | None = None) -> float:
+    """
+    Median of the ``window`` consecutive samples of ``positions`` with the least peak-to-peak
+    travel. With a ``resolution`` the zero is snapped to the sensor step, so displacement stays
+    on the same grid as the position.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    if not len(positions):
+        return 0.0
+    zero = float(np.median(positions[quietest_window([positions], window)]))
+    if resolution:
+        zero = float(np.rint(zero / resolution) * resolution)
+    return zero
+
+
+def shock_devices(devices: list[device_data]) -> list[device_data]:
+    """Derived displacement and velocity devices for the shock channels in ``devices``."""
+    names = {device.name: device for device in devices}
+    if not any(name.strip().lower() == "ts" for name in names):
+        return []
+
+    derived: list[device_data] = []
+    for corner, channel in SHOCK_CHANNELS.items():
+        source = names.get(channel)
+        if source is None:
+            continue
+        resolution = getattr(source.conversion_factor, "resolution", None)
+        units = source.units or "mm"
+        derived.append(
+            device_data(
+                f"{corner}_SHOCK_DISP",
+                len(devices) + len(derived),
+                0,
+                conversion_factor=Scale(factor=resolution) if resolution else 1.0,
+                units=units,
+                display_name=f"{corner} Shock Disp",
+                short_name=f"{corner}_Disp",
+                decimals=source.decimals,
+            )
+        )
+        derived.append(
+            device_data(
+                f"{corner}_SHOCK_VEL",
+                len(devices) + len(derived),
+                0,
+                units=f"{units}/s",
+                display_name=f"{corner} Shock Vel",
+                short_name=f"{corner}_Vel",
+                decimals=source.decimals,
+            )
+        )
+    return derived
+
+
+def _shifted(values: np.ndarray, offset: int) -> np.ndarray:
+    """``values[i + offset]`` for every ``i``, repeating the edge values past either end."""
+    index = np.clip(np.arange(len(values)) + offset, 0, len(values) - 1)
+    return values[index]
+
+
+def _moving_average(values: np.ndarray, half_width: int) -> np.ndarray:
+    if half_width <= 0:
+        return values
+    # Summed shift by shift (not a cumulative sum) so every sample gets the same arithmetic
+    # whichever block it falls in.
+    total = values.copy()
+    for offset in range(1, half_width + 1):
+        total += _shifted(values, -offset)
+        total += _shifted(values, offset)
+    return total / (2 * half_width + 1)
+
+
+def _velocity(
+    displacement: np.ndarray,
+    times: np.ndarray,
+    start: int,
+    stop: int,
+    settings: ShockSettings,
+    period: float,
+) -> np.ndarray:
+    """Velocity of rows ``start:stop``; the rows around them are only there as neighbours."""
+    # Each side of the central difference, clipped to the data there is (only at the ends).
+    last = len(times) - 1
+    index = np.arange(start, stop)
+    behind = np.maximum(index - settings.span, 0)
+    ahead = np.minimum(index + settings.span, last)
+    elapsed = times[ahead] - times[behind]
+    elapsed = np.where(elapsed > 0, elapsed, (ahead - behind) * period)
+
+    smoothed = _moving_average(displacement, settings.smoothing)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        velocity = (smoothed[ahead] - smoothed[behind]) / elapsed
+    return np.where(np.isfinite(velocity), velocity, 0.0)
+
+
+def shock_displacement(
+    positions: np.ndarray,
+    settings: ShockSettings = DEFAULT_SHOCK_SETTINGS,
+    resolution: float | None = None,
+) -> np.ndarray:
+    """Whole-log displacement: ``positions`` minus their static zero (see ``static_zero``)."""
+    positions = np.asarray(positions, dtype=np.float64)
+    return positions - static_zero(positions[: settings.zero_search], settings.zero_window, resolution)
+
+
+def shock_velocity(
+    displacement: np.ndarray,
+    timestamps: np.ndarray,
+    settings: ShockSettings = DEFAULT_SHOCK_SETTINGS,
+) -> np.ndarray:
+    """Whole-log velocity of ``displacement``, the same values ``ShockDerivation`` adds."""
+    times = np.asarray(timestamps, dtype=np.float64)
+    period = nominal_period(times[: settings.zero_search])
+    return _velocity(np.asarray(displacement, dtype=np.float64), times, 0, len(times), settings, period)
+
+
+class ShockDerivation(DerivedStage):
+    """
+    Derived-channel stage adding ``<corner>_SHOCK_DISP`` (position minus the static zero) and
+    ``<corner>_SHOCK_VEL`` to decoded blocks, so both outputs get them from the same arrays.
+    Rows are held back until the static zero is known, see ``DerivedStage``.
+
+    A step where the timestamps do not move forward uses the nominal sample period instead, so
+    duplicate or backwards timestamps do not blow up the velocity.
+    """
+
+    def __init__(self, devices: list[device_data], settings: ShockSettings = DEFAULT_SHOCK_SETTINGS):
+        super().__init__(shock_devices(devices))
+        self.settings = settings
+        self.warmup = settings.zero_search
+        self.lookback = self.lookahead = settings.lookahead
+        sources = {device.name: device for device in devices}
+        self._time_name = next((device.name for device in devices if device.name.strip().lower() == "ts"), None)
+        # (displacement name, velocity name, source channel, source resolution)
+        self._corners = [
+            (
+                f"{corner}_SHOCK_DISP",
+                f"{corner}_SHOCK_VEL",
+                channel,
+                getattr(sources[channel].conversion_factor, "resolution", None),
+            )
+            for corner, channel in SHOCK_CHANNELS.items()
+            if channel in sources
+        ]
+        self.zeros: dict[str, float] | None = None
+        self._period = 0.0
+
+    def _prepare(self, head: dict[str, np.ndarray]) -> None:
+        self.zeros = {
+            channel: static_zero(head[channel], self.settings.zero_window, resolution)
+            for _, _, channel, resolution in self._corners
+        }
+        self._period = nominal_period(head[self._time_name])
+
+    def _derive(self, work: dict[str, np.ndarray], start: int, stop: int) -> dict[str, np.ndarray]:
+        times = np.asarray(work[self._time_name], dtype=np.float64)
+        derived = {}
+        for displacement_name, velocity_name, channel, _ in self._corners:
+            displacement = np.asarray(work[channel], dtype=np.float64) - self.zeros[channel]
+            derived[displacement_name] = displacement[start:stop]
+            derived[velocity_name] = _velocity(displacement, times, start, stop, self.settings, self._period)
+        return derived
+
+
+def derive_shock_columns(
+    columns: dict[str, np.ndarray],
+    devices: list[device_data],
+    settings: ShockSettings = DEFAULT_SHOCK_SETTINGS,
+) -> dict[str, np.ndarray]:
+    """Whole-column form of ``ShockDerivation``: ``columns`` plus the derived shock channels."""
+    return derive_columns(columns, [ShockDerivation(devices, settings)])
+
+
+__all__ = [
+    "DEFAULT_SHOCK_SETTINGS",
+    "SHOCK_CHANNELS",
+    "ShockDerivation",
+    "ShockSettings",
+    "derive_shock_columns",
+    "shock_devices",
+    "shock_displacement",
+    "shock_velocity",
+    "static_zero",
+]
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The SDM26 modules are imported flat, as the scripts next to them do.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
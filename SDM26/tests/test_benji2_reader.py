@@ -0,0 +1,56 @@
+import io
+
+import numpy as np
+import pytest
+
+from benji2_reader import decode_records, decode_records_reference, filter_duplicate_headers
+from devices import configure_devices, create_devices, device_data
+
+
+def _clipped(value):
+    # Python control flow: only works on scalars, so decode_records falls back to a per-value call.
+    return min(value, 1000) / 10
+
+
+def _odd_devices():
+    return [
+        device_data("TS", 0, 4, conversion_factor=1e-6),
+        device_data("COUNTER", 1, 3),
+        device_data("SIGNED_BE", 2, 3, signed=True, byte_order="big"),
+        device_data("SIGNED_LE", 3, 3, signed=True, conversion_factor=lambda value: value * 0.5 - 3),
+        device_data("PRESSURE", 4, 2, conversion_factor=0.01, signed=True, byte_order="big"),
+        device_data("WIDE_BE", 5, 8, byte_order="big"),
+        device_data("FLAG", 6, 1, signed=True),
+        device_data("CLIPPED", 7, 2, conversion_factor=_clipped),
+        device_data("CH_COUNT", 8, 1),
+        device_data("NEVER_LOGGED", 9, 2),
+    ]
+
+
+def _logger_devices():
+    # The real calibration table over the header the logger writes.
+    header, sizes = filter_duplicate_headers(
+        "TS,TS1,TS2,TS3,FLSHOCK,FLSHOCK1,IMU_X_ACCEL,IMU_X_ACCEL1,IMU_Z_GYRO,IMU_Z_GYRO1,"
+        "GPS_LAT,GPS_LAT1,GPS_LAT2,GPS_LAT3,ODDBALL,ODDBALL1,ODDBALL2,DRS,CH_COUNT,FR_Wheel_Speed,FR_Wheel_Speed1"
+    )
+    devices = create_devices(header.split(","), sizes)
+    configure_devices(devices)
+    return devices
+
+
+@pytest.mark.parametrize("make_devices", [_odd_devices, _logger_devices])
+@pytest.mark.parametrize("records, partial", [(0, 0), (1, 0), (257, 0), (257, 5)])
+def test_decode_records_matches_the_reference_decoder(make_devices, records, partial):
+    devices = make_devices()
+    record_size = sum(device.byte_size for device in devices[: [device.name for device in devices].index("CH_COUNT")])
+    rng = np.random.default_rng(records + partial)
+    payload = rng.integers(0, 256, records * record_size + partial, dtype=np.uint8).tobytes()
+
+    decoded = decode_records(payload, devices)
+    reference = decode_records_reference(io.BytesIO(payload), devices)
+
+    assert list(decoded) == list(reference)
+    assert "NEVER_LOGGED" not in decoded
+    for name, values in reference.items():
+        assert len(decoded[name]) == records, name
+        np.testing.assert_array_equal(decoded[name], np.asarray(values, dtype=np.float64), err_msg=name)
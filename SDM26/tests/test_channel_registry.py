@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from channel_registry import ChannelRegistry, DerivedChannel, RunChannels
+
+
+def _registry(calls):
+    def counted(name, function):
+        def compute(*inputs):
+            calls.append(name)
+            return function(*inputs)
+
+        return compute
+
+    return ChannelRegistry(
+        [
+            DerivedChannel("DOUBLE", ("X",), counted("DOUBLE", lambda x: 2 * x)),
+            DerivedChannel("QUAD", ("DOUBLE",), counted("QUAD", lambda doubled: 2 * doubled)),
+            DerivedChannel("SUM", ("X", "Y"), counted("SUM", lambda x, y: x + y)),
+        ]
+    )
+
+
+def test_invalidate_drops_what_depends_on_a_channel():
+    calls = []
+    run = RunChannels({"X": np.arange(3.0), "Y": np.ones(3)}, _registry(calls))
+    run.select(["QUAD", "SUM"])
+    assert run.computed == ["DOUBLE", "QUAD", "SUM"]
+
+    run.invalidate(["DOUBLE"])
+    assert run.computed == ["SUM"]
+    run.invalidate(["X"])
+    assert run.computed == []
+
+    calls.clear()
+    np.testing.assert_array_equal(run["QUAD"], [0.0, 4.0, 8.0])
+    assert calls == ["DOUBLE", "QUAD"]
+    run.invalidate()
+    assert run.computed == []
+
+
+def test_recalibrate_replaces_columns_and_drops_derived_values():
+    calls = []
+    run = RunChannels({"X": np.arange(3.0), "Y": np.ones(3)}, _registry(calls), calibration="v1")
+    run.select(["QUAD"])
+
+    assert not run.recalibrate("v1")
+    assert run.computed == ["DOUBLE", "QUAD"]
+    assert run.recalibrate("v2", {"X": np.full(3, 10.0), "Y": np.zeros(3)})
+    assert run.calibration == "v2"
+    assert run.computed == []
+    np.testing.assert_array_equal(run["QUAD"], [40.0, 40.0, 40.0])
+
+
+def test_recalibrate_reads_the_columns_again_through_the_loader():
+    scale = {"factor": 1.0}
+    loads = []
+
+    def load(names):
+        loads.append(names)
+        return {name: np.arange(3.0) * scale["factor"] for name in names}
+
+    run = RunChannels(registry=_registry([]), calibration="v1", loader=load, recorded=["X", "Y"])
+    np.testing.assert_array_equal(run["DOUBLE"], [0.0, 2.0, 4.0])
+    scale["factor"] = 3.0
+    assert run.recalibrate("v2")
+    np.testing.assert_array_equal(run["DOUBLE"], [0.0, 6.0, 12.0])
+    assert loads == [["X"], ["X"]]
+
+
+def test_recalibrate_without_a_loader_needs_columns():
+    run = RunChannels({"X": np.arange(3.0)}, _registry([]), calibration="v1")
+    run.select(["DOUBLE"])
+    with pytest.raises(ValueError, match="loader"):
+        run.recalibrate("v2")
+    assert run.calibration == "v1"
+    np.testing.assert_array_equal(run["X"], np.arange(3.0))
+    assert run.computed == ["DOUBLE"]
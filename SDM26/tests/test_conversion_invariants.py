@@ -0,0 +1,164 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import conversion_pipeline
+import motec_ld
+from conversion_pipeline import convert_benji2_inputs_to_csv, convert_benji2_inputs_to_outputs, follow_benji2_file
+from csv_columns import read_csv_columns, read_csv_header
+from imu_displacement import ImuSettings
+from shocks import ShockSettings
+
+# Logged channels and their byte sizes; the header names every byte, records stop at CH_COUNT.
+FIELDS = [
+    ("TS", 4), ("F_BRAKEPRESSURE", 2), ("R_BRAKEPRESSURE", 2), ("STEERING", 2),
+    ("FLSHOCK", 2), ("FRSHOCK", 2), ("RRSHOCK", 2), ("RLSHOCK", 2), ("CURRENT", 2), ("BATTERY", 2),
+    ("IMU_X_ACCEL", 2), ("IMU_Y_ACCEL", 2), ("IMU_Z_ACCEL", 2), ("IMU_X_GYRO", 2), ("IMU_Y_GYRO", 2), ("IMU_Z_GYRO", 2),
+    ("FL_SG", 4), ("FLW_AMB", 2), ("FLW_RPM", 2), ("DRS", 1), ("GPS_LON", 4), ("GPS_LAT", 4), ("GPS_SPD", 2),
+    ("GPS_FIX", 1), ("ECT", 1), ("ENG_IMU_X", 2), ("TESTNO", 1), ("DTC_FLW", 1), ("ODDBALL", 3),
+    ("CH_COUNT", 1), ("FR_Wheel_Speed", 2),
+]
+
+# Short warmups, so a few hundred records cross every derived stage's warmup and block edges.
+SHOCKS = ShockSettings(zero_search=40, zero_window=8, smoothing=2)
+IMU = ImuSettings(level=True, level_search=60, level_window=12)
+
+RECORDS = {"header_only": 0, "one_record": 1, "short": 300, "long": 1300}
+CHUNKS = [None, 1, 7, 1 << 20]
+
+
+class _FixedDatetime(datetime):
+    """The LD header carries the conversion date; pinned so whole files can be compared."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 3, 11, 12, 0, 0)
+
+
+def _write_benji2(path, records, seed=0):
+    names = [f"{name}{index or ''}" for name, size in FIELDS for index in range(size)]
+    header = ",".join(names).encode()
+    record_size = sum(size for _, size in FIELDS[: [name for name, _ in FIELDS].index("CH_COUNT")])
+    rng = np.random.default_rng(seed)
+    payload = rng.integers(0, 256, (records, record_size), dtype=np.uint8)
+    # A steady 500 Hz logger clock in microseconds.
+    payload[:, :4] = (np.arange(records, dtype="<u4") * 2000 + 40).view(np.uint8).reshape(records, 4)
+    path.write_bytes((len(header) + 1).to_bytes(4, "little") + header + b"\x00" + payload.tobytes())
+
+
+@pytest.fixture
+def logs(tmp_path, monkeypatch):
+    monkeypatch.setattr(conversion_pipeline, "datetime", _FixedDatetime)
+    source = tmp_path / "logs"
+    source.mkdir()
+    for seed, (name, records) in enumerate(RECORDS.items()):
+        _write_benji2(source / f"{name}.benji2", records, seed)
+    (source / "empty.benji2").write_bytes(b"")
+    return source
+
+
+def _outputs(directory):
+    return {path.relative_to(directory).as_posix(): path.read_bytes() for path in sorted(directory.rglob("*.*"))}
+
+
+def _csv(path):
+    header = read_csv_header(path)
+    return dict(zip(header, read_csv_columns(path, range(len(header)))))
+
+
+def test_conversion_does_not_depend_on_the_block_size(logs, tmp_path):
+    converted = {}
+    for chunk in CHUNKS:
+        out = tmp_path / f"out_{chunk}"
+        convert_benji2_inputs_to_outputs(logs, out, chunk_records=chunk, shocks=SHOCKS, imu=IMU, catalog=None)
+        converted[chunk] = {
+            name: data for name, data in _outputs(out).items() if name.endswith((".csv", ".ld", ".envelope"))
+        }
+
+    stems = {name.rsplit("/", 1)[-1].split(".")[0] for name in converted[None]}
+    assert stems == set(RECORDS)
+    for chunk in CHUNKS[1:]:
+        assert converted[chunk].keys() == converted[None].keys()
+        for name, data in converted[None].items():
+            assert converted[chunk][name] == data, f"{name} with blocks of {chunk}"
+
+
+@pytest.mark.parametrize("derived", [False, True])
+def test_follow_does_not_depend_on_the_block_size(logs, tmp_path, monkeypatch, derived):
+    # A tiny copy buffer, so growing the LD moves every channel block in several pieces.
+    monkeypatch.setattr(motec_ld, "COPY_BUFFER_SIZE", 5)
+    for name in RECORDS:
+        followed = []
+        for chunk, capacity in ((1 << 20, 1 << 20), (1, 1), (7, 16)):
+            out = tmp_path / f"follow_{name}_{chunk}"
+            count = follow_benji2_file(
+                logs / f"{name}.benji2",
+                out / f"{name}.csv",
+                out / f"{name}.ld",
+                poll_interval=0,
+                idle_timeout=0,
+                chunk_records=chunk,
+                ld_capacity=capacity,
+                derived=derived,
+                shocks=SHOCKS,
+                imu=IMU,
+            )
+            assert count == RECORDS[name]
+            followed.append(_outputs(out))
+        assert all(outputs == followed[0] for outputs in followed[1:]), name
+        assert bool(followed[0]) == bool(RECORDS[name])
+
+
+@pytest.mark.parametrize("chunk", [0, -1])
+def test_blocks_need_at_least_one_record(logs, tmp_path, chunk):
+    with pytest.raises(ValueError, match="chunk_records"):
+        convert_benji2_inputs_to_outputs(logs, tmp_path / "out", chunk_records=chunk, catalog=None)
+    with pytest.raises(ValueError, match="chunk_records"):
+        follow_benji2_file(logs / "short.benji2", tmp_path / "short.csv", idle_timeout=0, chunk_records=chunk)
+
+
+def test_follow_with_derived_channels_matches_the_conversion_csv(logs, tmp_path):
+    out = tmp_path / "converted"
+    convert_benji2_inputs_to_outputs(logs, out, chunk_records=7, shocks=SHOCKS, imu=IMU, catalog=None)
+    converted = {name.rsplit("/", 1)[-1]: data for name, data in _outputs(out).items() if name.endswith(".csv")}
+    for name in ("one_record", "long"):
+        followed = tmp_path / f"{name}.csv"
+        follow_benji2_file(
+            logs / f"{name}.benji2", followed, poll_interval=0, idle_timeout=0, derived=True, shocks=SHOCKS, imu=IMU
+        )
+        assert followed.read_bytes() == converted[f"{name}.csv"]
+
+
+def test_selected_channels_match_the_full_conversion(logs, tmp_path):
+    full = tmp_path / "full"
+    convert_benji2_inputs_to_csv(logs, full, shocks=SHOCKS, imu=IMU, catalog=None, envelopes=False)
+    selected = tmp_path / "selected"
+    names = ["FL_SHOCK_VEL", "CG_X_ACCEL", "FRONT_SHOCK_VEL"]
+    convert_benji2_inputs_to_csv(logs, selected, shocks=SHOCKS, imu=IMU, catalog=None, envelopes=False, channels=names)
+
+    full_csv = _csv(full / "long.csv")
+    selected_csv = _csv(selected / "long.csv")
+    assert list(selected_csv) == ["SAMPLE", "TS"] + names
+    for name in ("SAMPLE", "TS", "FL_SHOCK_VEL", "CG_X_ACCEL"):
+        np.testing.assert_array_equal(selected_csv[name], full_csv[name])
+    front = (full_csv["FL_SHOCK_VEL"] + full_csv["FR_SHOCK_VEL"]) / 2
+    np.testing.assert_allclose(selected_csv["FRONT_SHOCK_VEL"], front, atol=0.01)
+
+    with pytest.raises(ValueError, match="chunk_records"):
+        convert_benji2_inputs_to_csv(logs, selected, chunk_records=7, channels=names)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_a_failing_file_keeps_the_manifest_entries_of_earlier_ones(logs, tmp_path, jobs):
+    (logs / "zz_broken.benji2").write_bytes(b"\x01\x02")
+    out = tmp_path / "out"
+    with pytest.raises(ValueError):
+        convert_benji2_inputs_to_outputs(logs, out, jobs=jobs, shocks=SHOCKS, imu=IMU, envelopes=False)
+
+    (logs / "zz_broken.benji2").unlink()
+    messages = []
+    convert_benji2_inputs_to_outputs(logs, out, shocks=SHOCKS, imu=IMU, envelopes=False, logger=messages.append)
+    assert sorted(message for message in messages if message.startswith("Up to date")) == [
+        f"Up to date: {name}.benji2" for name in sorted(RECORDS)
+    ]
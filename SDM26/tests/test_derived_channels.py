@@ -0,0 +1,44 @@
+import numpy as np
+
+from derived_channels import DerivedStage, derive_columns
+from devices import device_data
+
+
+class RunningTotal(DerivedStage):
+    """Needs the first rows for its offset and one row either side of each sum."""
+
+    warmup = 4
+    lookback = 1
+    lookahead = 1
+
+    def __init__(self):
+        super().__init__([device_data("TOTAL", 1, 0)])
+        self.prepared_with = None
+
+    def _prepare(self, head):
+        self.prepared_with = len(head["X"])
+        self.offset = float(head["X"].mean()) if len(head["X"]) else 0.0
+
+    def _derive(self, work, start, stop):
+        # padded[i + 1] is work[i]: each row summed with its neighbours, the log's ends repeated.
+        padded = np.pad(work["X"], 1, mode="edge")
+        total = padded[start:stop] + padded[start + 1 : stop + 1] + padded[start + 2 : stop + 2]
+        return {"TOTAL": total - self.offset}
+
+
+def test_no_rows_are_never_prepared():
+    stage = RunningTotal()
+    assert stage.update({"X": np.empty(0)})["TOTAL"].size == 0
+    assert stage.finish() == {}
+    assert stage.prepared_with is None
+
+
+def test_blocks_give_the_whole_log_result():
+    values = np.arange(23, dtype=np.float64) ** 2
+    whole = derive_columns({"X": values}, [RunningTotal()])
+
+    for size in (1, 3, 7):
+        stage = RunningTotal()
+        blocks = [stage.update({"X": values[start : start + size]}) for start in range(0, len(values), size)]
+        blocks.append(stage.finish())
+        np.testing.assert_array_equal(np.concatenate([block["TOTAL"] for block in blocks if block]), whole["TOTAL"])
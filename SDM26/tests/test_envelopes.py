@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from envelopes import EnvelopeWriter, RunEnvelope
+
+
+def _columns(rows: int) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(0)
+    return {
+        "TS": np.arange(rows) * 0.002 + 0.5,
+        "A": rng.normal(size=rows),
+        "B": rng.integers(0, 100, rows),
+    }
+
+
+def _write(path, columns, block_rows, build_bins=None):
+    writer = EnvelopeWriter(path)
+    if build_bins is not None:
+        writer.build_bins = build_bins
+    rows = len(columns["TS"])
+    for start in range(0, rows, block_rows):
+        writer.write({name: values[start : start + block_rows] for name, values in columns.items()})
+    writer.close()
+    return path.read_bytes()
+
+
+@pytest.mark.parametrize("rows", [1, 15, 16, 17, 1000, 4099])
+def test_blocks_give_the_same_file(tmp_path, rows):
+    columns = _columns(rows)
+    whole = _write(tmp_path / "whole.envelope", columns, rows)
+    for block_rows in (1, 7, 64):
+        assert _write(tmp_path / f"{block_rows}.envelope", columns, block_rows) == whole
+    # Levels built from the finest bins read back a few at a time, leaving bins unpaired in between.
+    for build_bins in (1, 3):
+        assert _write(tmp_path / f"build{build_bins}.envelope", columns, rows, build_bins) == whole
+    assert [path.name for path in tmp_path.iterdir() if path.suffix != ".envelope"] == []
+
+
+def test_bins_hold_min_max_and_mean(tmp_path):
+    columns = _columns(4099)
+    _write(tmp_path / "run.envelope", columns, 500)
+    with RunEnvelope(tmp_path / "run.envelope") as envelope:
+        assert envelope.channels == ["A", "B"]
+        assert envelope.start == 0.5 and envelope.end == columns["TS"][-1]
+        for level in envelope.levels:
+            window = envelope.window("A", level=level)
+            size = 1 << level
+            bins = [columns["A"][start : start + size] for start in range(0, 4099, size)]
+            np.testing.assert_array_equal(window.minimum, np.float32([values.min() for values in bins]))
+            np.testing.assert_array_equal(window.maximum, np.float32([values.max() for values in bins]))
+            np.testing.assert_allclose(window.mean, [values.mean() for values in bins], rtol=1e-6, atol=1e-7)
+            np.testing.assert_array_equal(window.times[:-1], columns["TS"][::size])
+        assert len(envelope.window("A", level=envelope.levels[-1]).mean) == 1
+
+
+def test_level_follows_the_pixel_width(tmp_path):
+    _write(tmp_path / "run.envelope", _columns(100_000), 4096)
+    with RunEnvelope(tmp_path / "run.envelope") as envelope:
+        overview = envelope.window("B", width=1000)
+        assert 1000 <= len(overview.mean) < 2000
+        zoom = envelope.window("B", 10.0, 20.0, width=1000)
+        assert zoom.level == envelope.base_level
+        assert zoom.times[0] <= 10.0 and zoom.times[-1] >= 20.0
+
+
+def test_a_log_without_rows_has_no_levels(tmp_path):
+    writer = EnvelopeWriter(tmp_path / "empty.envelope")
+    writer.write({"TS": np.empty(0), "A": np.empty(0)})
+    writer.close()
+    with RunEnvelope(tmp_path / "empty.envelope") as envelope:
+        assert envelope.rows == 0 and envelope.levels == [] and envelope.start is None
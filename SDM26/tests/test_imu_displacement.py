@@ -0,0 +1,76 @@
+import math
+
+import numpy as np
+import pytest
+
+from calibration import load_calibration_table
+from devices import device_data
+from imu_displacement import (
+    IMU_ACCEL_CHANNELS,
+    IMU_GYRO_CHANNELS,
+    PERIOD_SEARCH,
+    STANDARD_GRAVITY,
+    CgTransform,
+    ImuSettings,
+    cg_accelerations,
+)
+
+
+def test_gyro_calibration_is_in_degrees_per_second():
+    # LSM6 at +-500 dps: 17.5 mdps per count.
+    calibration = load_calibration_table().channels["IMU_Z_GYRO"].calibration
+    assert calibration(np.array([1000]))[0] == pytest.approx(17.5)
+
+
+def test_steady_yaw_moves_acceleration_to_the_cg():
+    rate = 30.0
+    lever_arm = (0.5, 0.0, 0.0)
+    timestamps = np.arange(1000) * 0.002
+    accel = np.zeros((3, len(timestamps)))
+    gyro = np.zeros((3, len(timestamps)))
+    gyro[2] = rate
+
+    cg = cg_accelerations(timestamps, accel, gyro, ImuSettings(lever_arm=lever_arm))
+
+    # The IMU ahead of the CG sees the centripetal w^2 r towards the centre of the turn.
+    expected = math.radians(rate) ** 2 * lever_arm[0] / STANDARD_GRAVITY
+    assert expected == pytest.approx(0.01398, abs=1e-5)
+    np.testing.assert_allclose(cg[0], expected)
+    np.testing.assert_allclose(cg[1:], 0.0, atol=1e-12)
+
+
+def test_yaw_acceleration_moves_lateral_acceleration_to_the_cg():
+    lever_arm = (0.5, 0.0, 0.0)
+    timestamps = np.arange(1000) * 0.002
+    accel = np.zeros((3, len(timestamps)))
+    gyro = np.zeros((3, len(timestamps)))
+    # Yaw rate ramping at 100 deg/s^2.
+    gyro[2] = 100.0 * timestamps
+
+    cg = cg_accelerations(timestamps, accel, gyro, ImuSettings(lever_arm=lever_arm))
+
+    centripetal = np.radians(gyro[2]) ** 2 * lever_arm[0] / STANDARD_GRAVITY
+    tangential = math.radians(100.0) * lever_arm[0] / STANDARD_GRAVITY
+    np.testing.assert_allclose(cg[0], centripetal, atol=1e-12)
+    np.testing.assert_allclose(cg[1], -tangential, rtol=1e-9)
+
+
+def test_cg_rows_follow_the_first_rows_unless_levelling():
+    names = ("TS",) + IMU_ACCEL_CHANNELS + IMU_GYRO_CHANNELS
+    devices = [device_data(name, index, 2) for index, name in enumerate(names)]
+    timestamps = np.arange(2 * PERIOD_SEARCH) * 0.002
+    columns = {name: np.zeros(len(timestamps)) for name in names}
+    columns["TS"] = timestamps
+    columns["IMU_Z_GYRO"] = 100.0 * timestamps
+    block = {name: values[:PERIOD_SEARCH] for name, values in columns.items()}
+
+    stage = CgTransform(devices, ImuSettings())
+    assert stage.warmup == PERIOD_SEARCH
+    emitted = stage.update(block)["CG_Y_ACCEL"]
+    assert len(emitted) == PERIOD_SEARCH - stage.lookahead
+    expected = cg_accelerations(timestamps, [columns[name] for name in IMU_ACCEL_CHANNELS],
+                                [columns[name] for name in IMU_GYRO_CHANNELS])
+    np.testing.assert_allclose(emitted, expected[1, : len(emitted)])
+
+    levelling = CgTransform(devices, ImuSettings(level=True))
+    assert levelling.update(block)["CG_Y_ACCEL"].size == 0
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from run_catalog import RunStatistics
+
+
+def _record(blocks):
+    statistics = RunStatistics()
+    for block in blocks:
+        statistics.write(block)
+    return statistics.record("run.ld", "run.benji2", None, "session", {"sha256": ""}, {})
+
+
+def test_statistics_do_not_depend_on_which_blocks_carry_a_channel():
+    rows = np.arange(12)
+    times = rows * 0.002
+    speed = np.linspace(10.0, 32.0, 12)
+    late = rows - 4.0
+    # SPEED stops after row 9 and LATE starts at row 5; the whole log has NaN where they are missing.
+    blocks = [
+        {"TS": times[:5], "SPEED": speed[:5]},
+        {"TS": times[5:9], "SPEED": speed[5:9], "LATE": late[5:9]},
+        {"TS": times[9:], "LATE": late[9:]},
+    ]
+    whole = {"TS": times, "SPEED": np.where(rows < 9, speed, np.nan), "LATE": np.where(rows < 5, np.nan, late)}
+
+    split, joined = _record(blocks), _record([whole])
+
+    assert split.channels == joined.channels == ["TS", "SPEED", "LATE"]
+    assert split.samples == joined.samples == 12
+    assert split.duration == joined.duration
+    for name, expected in joined.stats.items():
+        stats = split.stats[name]
+        assert (stats.minimum, stats.maximum, stats.nulls) == (expected.minimum, expected.maximum, expected.nulls)
+        assert stats.mean == pytest.approx(expected.mean)
+    assert (split.stats["SPEED"].nulls, split.stats["LATE"].nulls) == (3, 5)
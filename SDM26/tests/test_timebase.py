@@ -0,0 +1,58 @@
+from dataclasses import astuple
+
+import numpy as np
+import pytest
+
+from resample import grid_length, resampled_length
+from timebase import TimebaseTracker, analyze_timebase
+
+
+def _logged_timestamps():
+    """A 500 Hz loop with jitter, overruns, two gaps, a duplicate and a step backwards."""
+    rng = np.random.default_rng(7)
+    steps = np.round(0.002 + rng.normal(0.0, 2e-5, 5000), 6)
+    steps[::97] += 0.0004
+    steps[[1200, 3100]] = [0.006, 0.0101]
+    steps[2000] = 0.0
+    steps[4000] = -0.001
+    return np.cumsum(np.concatenate(([4.2e-5], steps)))
+
+
+def _fields(report):
+    return [value.tolist() if isinstance(value, np.ndarray) else value for value in astuple(report)]
+
+
+def _tracked(timestamps, size):
+    tracker = TimebaseTracker()
+    for start in range(0, len(timestamps), size):
+        tracker.update(timestamps[start : start + size])
+    return tracker
+
+
+def test_tracker_matches_the_whole_column_analysis():
+    timestamps = _logged_timestamps()
+    whole = analyze_timebase(timestamps)
+    tracker = _tracked(timestamps, 7)
+    tracked = tracker.report()
+
+    for name in ("count", "first", "last", "mean_dt", "missing_samples", "longest_step", "overruns", "positive_steps"):
+        assert getattr(tracked, name) == getattr(whole, name), name
+    for name in ("gaps", "duplicates", "backwards"):
+        np.testing.assert_array_equal(getattr(tracked, name), getattr(whole, name))
+    for p, value in whole.percentiles.items():
+        assert tracked.percentiles[p] == pytest.approx(value, abs=tracked.median_dt * 1e-4)
+    assert tracked.sample_rate()[0] == whole.sample_rate()[0]
+    assert tracked.summary()[1:] == whole.summary()[1:]
+    assert grid_length(tracker.start, tracker.end, 500) == resampled_length(timestamps, 500)
+
+
+@pytest.mark.parametrize("size", [1, 3, 999, 100000])
+def test_tracker_does_not_depend_on_the_blocks(size):
+    timestamps = _logged_timestamps()
+    assert _fields(_tracked(timestamps, size).report()) == _fields(_tracked(timestamps, 64).report())
+
+
+@pytest.mark.parametrize("timestamps", [[], [1.0], [1.0, 1.0], [2.0, 1.0, 1.5]])
+def test_short_columns_match_the_whole_column_analysis(timestamps):
+    timestamps = np.array(timestamps)
+    assert _fields(_tracked(timestamps, 1).report()) == _fields(analyze_timebase(timestamps))
@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# A step longer than this many nominal periods has lost at least one sample.
+DEFAULT_GAP_FACTOR = 1.5
+
+# A step more than this fraction over the nominal period is a loop overrun (late sample).
+DEFAULT_OVERRUN_TOLERANCE = 0.1
+
+# Percentiles of the positive steps kept in the report.
+DT_PERCENTILES = (1, 5, 50, 95, 99)
+
+# Locations listed per problem in the summary.
+_SUMMARY_LOCATIONS = 3
+
+# Positive steps ``TimebaseTracker`` takes its reference period from, before judging any step.
+REFERENCE_STEPS = 1000
+
+# ``TimebaseTracker`` step histogram: up to this many reference periods, in this many bins.
+HISTOGRAM_SPAN = 4
+HISTOGRAM_BINS = 40000
+
+
+@dataclass(frozen=True)
+class TimebaseReport:
+    """
+    Quality of one timestamp column. Steps are ``t[i + 1] - t[i]``; index arrays hold the ``i``
+    of each problem step. The nominal period is the median positive step.
+
+    ``mean_dt`` (duration over sample count) is what the sample rate is derived from, as it
+    always has been; the median and percentiles describe the logger loop. ``location_times``
+    holds the timestamp of the first few steps of each problem, for the summary.
+    """
+
+    count: int
+    first: float | None
+    last: float | None
+    mean_dt: float | None
+    median_dt: float | None
+    percentiles: dict[int, float]
+    gaps: np.ndarray
+    missing_samples: int
+    longest_step: float | None
+    duplicates: np.ndarray
+    backwards: np.ndarray
+    overruns: int
+    positive_steps: int
+    location_times: dict[int, float] = field(repr=False, compare=False)
+
+    @property
+    def duration(self) -> float | None:
+        return None if self.first is None else self.last - self.first
+
+    @property
+    def overrun_rate(self) -> float:
+        """Fraction of loop iterations that ran over the nominal period."""
+        return self.overruns / self.positive_steps if self.positive_steps else 0.0
+
+    def sample_rate(self, default_freq: int = 500) -> tuple[int, float | None, float | None]:
+        """``(freq, mean dt, median dt)``; ``default_freq`` when the column has no usable span."""
+        if self.mean_dt is None or self.median_dt is None:
+            return default_freq, None, None
+        return max(1, int(round(1.0 / self.mean_dt))), self.mean_dt, self.median_dt
+
+    @property
+    def clean(self) -> bool:
+        return not (len(self.gaps) or len(self.duplicates) or len(self.backwards))
+
+    def summary(self) -> list[str]:
+        """Log lines describing the timebase, with the first few locations of each problem."""
+        if self.median_dt is None:
+            return [f"Timebase: {self.count} samples, no usable timestamp steps"]
+
+        percentiles = "/".join(f"{self.percentiles[p] * 1e3:.3f}" for p in (1, 50, 99))
+        lines = [
+            f"Timebase: {self.count} samples over {self.duration:.3f} s, "
+            f"dt p1/p50/p99 {percentiles} ms, "
+            f"overruns {100.0 * self.overrun_rate:.2f}% of steps"
+        ]
+        if len(self.gaps):
+            lines.append(
+                f"  {len(self.gaps)} gaps, {self.missing_samples} samples missing, "
+                f"longest step {self.longest_step * 1e3:.3f} ms"
+                + self._locations(self.gaps)
+            )
+        if len(self.duplicates):
+            lines.append(f"  {len(self.duplicates)} duplicate timestamps" + self._locations(self.duplicates))
+        if len(self.backwards):
+            lines.append(f"  {len(self.backwards)} timestamps going backwards" + self._locations(self.backwards))
+        return lines
+
+    def _locations(self, indices: np.ndarray) -> str:
+        shown = ", ".join(
+            f"sample {index + 1} ({self.location_times[index] - self.first:.3f} s)"
+            for index in indices[:_SUMMARY_LOCATIONS].tolist()
+        )
+        more = ", ..." if len(indices) > _SUMMARY_LOCATIONS else ""
+        return f" at {shown}{more}"
+
+
+def analyze_timebase(
+    timestamps: np.ndarray,
+    gap_factor: float = DEFAULT_GAP_FACTOR,
+    overrun_tolerance: float = DEFAULT_OVERRUN_TOLERANCE,
+    max_deltas: int | None = None,
+) -> TimebaseReport:
+    """
+    Analyse a timestamp column (seconds) in a few array passes. ``max_deltas`` limits the
+    median and percentiles to the first positive steps (the old sample-rate behaviour); by
+    default every step is used.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    count = len(timestamps)
+    empty = np.empty(0, dtype=np.int64)
+    if count < 2:
+        first = float(timestamps[0]) if count else None
+        return TimebaseReport(count, first, first, None, None, {}, empty, 0, None, empty, empty, 0, 0, {})
+
+    first, last = float(timestamps[0]), float(timestamps[-1])
+    steps = np.diff(timestamps)
+    positive = steps[steps > 0]
+    duplicates = np.flatnonzero(steps == 0)
+    backwards = np.flatnonzero(steps < 0)
+
+    if not len(positive) or last <= first:
+        times = _location_times(timestamps, duplicates, backwards)
+        return TimebaseReport(
+            count, first, last, None, None, {}, empty, 0, None, duplicates, backwards, 0, len(positive), times
+        )
+
+    sampled = positive if max_deltas is None else positive[:max_deltas]
+    percentile_values = np.percentile(sampled, DT_PERCENTILES)
+    percentiles = {p: float(value) for p, value in zip(DT_PERCENTILES, percentile_values)}
+    median_dt = percentiles[50]
+
+    gaps = np.flatnonzero(steps > gap_factor * median_dt)
+    missing = int(np.sum(np.rint(steps[gaps] / median_dt) - 1)) if len(gaps) else 0
+    overruns = int(np.count_nonzero(positive > (1.0 + overrun_tolerance) * median_dt))
+
+    return TimebaseReport(
+        count=count,
+        first=first,
+        last=last,
+        mean_dt=(last - first) / (count - 1),
+        median_dt=median_dt,
+        percentiles=percentiles,
+        gaps=gaps,
+        missing_samples=missing,
+        longest_step=float(positive.max()),
+        duplicates=duplicates,
+        backwards=backwards,
+        overruns=overruns,
+        positive_steps=len(positive),
+        location_times=_location_times(timestamps, gaps, duplicates, backwards),
+    )
+
+
+def _location_times(timestamps: np.ndarray, *problems: np.ndarray) -> dict[int, float]:
+    """Timestamps at the steps of ``problems`` the summary lists."""
+    return {index: float(timestamps[index]) for steps in problems for index in steps[:_SUMMARY_LOCATIONS].tolist()}
+
+
+class TimebaseTracker:
+    """
+    ``analyze_timebase`` for a timestamp column that arrives block by block, in memory that does
+    not grow with the log: the last timestamp is carried over to the next block's first step,
+    and only counts, the problem positions and a histogram of the positive steps are kept.
+
+    Gaps and overruns are judged against a reference period, the median of the first
+    ``REFERENCE_STEPS`` positive steps, rather than the median of the whole log; the percentiles
+    come from ``HISTOGRAM_BINS`` bins up to ``HISTOGRAM_SPAN`` reference periods (longer steps
+    are kept as they are). Both only depend on the timestamps, not on how they were split up.
+    ``start`` and ``end`` are the first and the latest timestamp, NaNs skipped: the span a
+    ``Resampler`` grid covers.
+    """
+
+    def __init__(self, gap_factor: float = DEFAULT_GAP_FACTOR, overrun_tolerance: float = DEFAULT_OVERRUN_TOLERANCE):
+        self.gap_factor = gap_factor
+        self.overrun_tolerance = overrun_tolerance
+        self.count = 0
+        self.first: float | None = None
+        self.last: float | None = None
+        self.start: float | None = None
+        self.end: float | None = None
+        self.reference: float | None = None
+        self.positive_steps = 0
+        self.overruns = 0
+        self.longest_step: float | None = None
+        # Positive steps (position, step, timestamp) waiting for the reference period.
+        self._waiting: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._waiting_steps = 0
+        self._histogram = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        self._long_steps: list[np.ndarray] = []
+        self._gaps: list[np.ndarray] = []
+        self._gap_steps: list[np.ndarray] = []
+        self._duplicates: list[np.ndarray] = []
+        self._backwards: list[np.ndarray] = []
+        self._times: dict[int, float] = {}
+
+    def update(self, timestamps: np.ndarray) -> None:
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if not len(timestamps):
+            return
+        if self.last is None:
+            self.first = float(timestamps[0])
+            joined, base = timestamps, 0
+        else:
+            joined, base = np.concatenate(([self.last], timestamps)), self.count - 1
+        steps = np.diff(joined)
+        duplicates, backwards = np.flatnonzero(steps == 0), np.flatnonzero(steps < 0)
+        self._note(self._duplicates, duplicates + base, joined[duplicates])
+        self._note(self._backwards, backwards + base, joined[backwards])
+        forward = np.flatnonzero(steps > 0)
+        waiting = (forward + base, steps[forward], joined[forward])
+        if self.reference is None:
+            self._waiting.append(waiting)
+            self._waiting_steps += len(forward)
+            if self._waiting_steps >= REFERENCE_STEPS:
+                self._settle()
+        else:
+            self._judge(*waiting)
+
+        finite = timestamps[~np.isnan(timestamps)]
+        if len(finite):
+            self.start = float(finite[0]) if self.start is None else self.start
+            self.end = float(finite.max()) if self.end is None else max(self.end, float(finite.max()))
+        self.count += len(timestamps)
+        self.last = float(timestamps[-1])
+
+    def report(self) -> TimebaseReport:
+        if self.reference is None and self._waiting_steps:
+            self._settle()
+        empty = np.empty(0, dtype=np.int64)
+        duplicates = np.concatenate(self._duplicates) if self._duplicates else empty
+        backwards = np.concatenate(self._backwards) if self._backwards else empty
+        if self.count < 2:
+            first = self.first
+            return TimebaseReport(self.count, first, first, None, None, {}, empty, 0, None, empty, empty, 0, 0, {})
+        if not self.positive_steps or self.last <= self.first:
+            return TimebaseReport(
+                self.count, self.first, self.last, None, None, {}, empty, 0, None,
+                duplicates, backwards, 0, self.positive_steps, dict(self._times),
+            )
+
+        percentiles = self._percentiles()
+        median_dt = percentiles[50]
+        gaps = np.concatenate(self._gaps) if self._gaps else empty
+        gap_steps = np.concatenate(self._gap_steps) if self._gap_steps else np.empty(0)
+        missing = int(np.sum(np.rint(gap_steps / median_dt) - 1)) if len(gap_steps) else 0
+        return TimebaseReport(
+            count=self.count,
+            first=self.first,
+            last=self.last,
+            mean_dt=(self.last - self.first) / (self.count - 1),
+            median_dt=median_dt,
+            percentiles=percentiles,
+            gaps=gaps,
+            missing_samples=missing,
+            longest_step=self.longest_step,
+            duplicates=duplicates,
+            backwards=backwards,
+            overruns=self.overruns,
+            positive_steps=self.positive_steps,
+            location_times=dict(self._times),
+        )
+
+    def sample_rate(self, default_freq: int = 500) -> tuple[int, float | None, float | None]:
+        return self.report().sample_rate(default_freq)
+
+    def _note(self, found: list[np.ndarray], positions: np.ndarray, times: np.ndarray) -> None:
+        """Keep the step ``positions`` of one problem, and the timestamps of the first few."""
+        if not len(positions):
+            return
+        listed = sum(len(earlier) for earlier in found[:_SUMMARY_LOCATIONS])
+        for index in range(min(len(positions), max(0, _SUMMARY_LOCATIONS - listed))):
+            self._times[int(positions[index])] = float(times[index])
+        found.append(positions)
+
+    def _settle(self) -> None:
+        """Fix the reference period and judge the steps that were waiting for it."""
+        steps = np.concatenate([waiting[1] for waiting in self._waiting])
+        self.reference = float(np.median(steps[:REFERENCE_STEPS]))
+        for waiting in self._waiting:
+            self._judge(*waiting)
+        self._waiting = []
+
+    def _judge(self, positions: np.ndarray, steps: np.ndarray, times: np.ndarray) -> None:
+        """Count positive ``steps`` against the reference period and add them to the histogram."""
+        if not len(steps):
+            return
+        gaps = np.flatnonzero(steps > self.gap_factor * self.reference)
+        if len(gaps):
+            self._note(self._gaps, positions[gaps], times[gaps])
+            self._gap_steps.append(steps[gaps])
+        self.overruns += int(np.count_nonzero(steps > (1.0 + self.overrun_tolerance) * self.reference))
+        self.positive_steps += len(steps)
+        longest = float(steps.max())
+        self.longest_step = longest if self.longest_step is None else max(self.longest_step, longest)
+
+        bins = np.floor(steps / self._bin_width()).astype(np.int64)
+        inside = bins < HISTOGRAM_BINS
+        self._histogram += np.bincount(bins[inside], minlength=HISTOGRAM_BINS)
+        if not inside.all():
+            self._long_steps.append(steps[~inside])
+
+    def _bin_width(self) -> float:
+        return HISTOGRAM_SPAN * self.reference / HISTOGRAM_BINS
+
+    def _percentiles(self) -> dict[int, float]:
+        """``DT_PERCENTILES`` interpolated between ranks as ``np.percentile`` does, bins at their centres."""
+        cumulative = np.cumsum(self._histogram)
+        binned = int(cumulative[-1])
+        long_steps = np.sort(np.concatenate(self._long_steps)) if self._long_steps else np.empty(0)
+
+        def ranked(rank: int) -> float:
+            if rank >= binned:
+                return float(long_steps[rank - binned])
+            return (int(np.searchsorted(cumulative, rank, side="right")) + 0.5) * self._bin_width()
+
+        percentiles = {}
+        for p in DT_PERCENTILES:
+            rank = p / 100.0 * (self.positive_steps - 1)
+            below = int(np.floor(rank))
+            above = min(below + 1, self.positive_steps - 1)
+            low = ranked(below)
+            percentiles[p] = low + (rank - below) * (ranked(above) - low)
+        return percentiles
+
+
+__all__ = [
+    "DEFAULT_GAP_FACTOR",
+    "DEFAULT_OVERRUN_TOLERANCE",
+    "DT_PERCENTILES",
+    "HISTOGRAM_BINS",
+    "HISTOGRAM_SPAN",
+    "REFERENCE_STEPS",
+    "TimebaseReport",
+    "TimebaseTracker",
+    "analyze_timebase",
+]